@@ -0,0 +1,46 @@
+"""
+APIView for coroutine handlers.
+
+DRF's dispatch is synchronous, so under ASGI every view runs in Django's
+single sync thread and one slow query holds up the rest. AsyncAPIView
+keeps DRF's request wrapping, authentication, permissions, exception
+handling and response finalization, but awaits the handler on the event
+loop. The checks in `initial` (the session lookup in particular) may touch
+the database and run in the sync thread; handlers use the async ORM.
+
+All handlers on a subclass must be `async def` (Django's View requires it);
+write paths can delegate to their sync code with `sync_to_async`.
+"""
+import inspect
+
+from asgiref.sync import sync_to_async
+from rest_framework.views import APIView
+
+
+class AsyncAPIView(APIView):
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+            else:
+                handler = self.http_method_not_allowed
+
+            response = handler(request, *args, **kwargs)
+            # OPTIONS and the not-allowed handler stay synchronous
+            if inspect.isawaitable(response):
+                response = await response
+
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
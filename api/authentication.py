@@ -0,0 +1,85 @@
+import copy
+import threading
+
+from django.conf import settings
+from rest_framework.authentication import BaseAuthentication
+from rest_framework.exceptions import AuthenticationFailed
+
+from api import versions
+from api.lru import LRUCache
+from api.models import Member
+
+# Per-worker cache of authenticated members, keyed by session id. Each entry
+# holds the member's versions.MEMBER counter from before the row was read;
+# saving or deleting a member bumps it (api/signals.py), so every worker
+# misses on its next lookup. Writes that bypass the signals (queryset
+# updates) show up once the TTL runs out.
+member_cache = LRUCache(
+    maxsize=settings.AUTH_MEMBER_CACHE_SIZE,
+    ttl=settings.AUTH_MEMBER_CACHE_TTL,
+)
+
+
+# Lookups that found an entry with an old MEMBER counter; the LRU counts
+# them as hits
+_stale = {'lookups': 0}
+_stale_lock = threading.Lock()
+
+
+def invalidate_member(member_id):
+    member_cache.delete(member_id)
+
+
+def stats():
+    cache_stats = member_cache.stats()
+    with _stale_lock:
+        stale = _stale['lookups']
+    return {
+        'hits': cache_stats['hits'] - stale,
+        'misses': cache_stats['misses'],
+        'stale': stale,
+        'entries': cache_stats['size'],
+        'evictions': cache_stats['evictions'],
+    }
+
+
+class CookieAuthentication(BaseAuthentication):
+    """
+    Custom authentication class that reads member_id from HttpOnly cookie 'session_id'
+    """
+    use_cache = True
+
+    def authenticate(self, request):
+        session_id = request.COOKIES.get('session_id')
+        if not session_id:
+            return None
+
+        try:
+            member_id = int(session_id)
+        except ValueError:
+            raise AuthenticationFailed('Invalid session')
+
+        version = versions.get(versions.MEMBER, member_id)
+        entry = member_cache.get(member_id) if self.use_cache else None
+        if entry is not None and entry[1] == version:
+            member = entry[0]
+        else:
+            if entry is not None:
+                with _stale_lock:
+                    _stale['lookups'] += 1
+            try:
+                member = Member.objects.get(id=member_id)
+            except Member.DoesNotExist:
+                raise AuthenticationFailed('Invalid session')
+            member_cache.set(member_id, (member, version))
+
+        # Views may mutate request.user; never hand out the cached instance
+        return (copy.copy(member), None)
+
+
+class FreshCookieAuthentication(CookieAuthentication):
+    """
+    Cookie authentication that always reads the member row, for views whose
+    response is the row itself; the row read replaces the cached entry
+    """
+    use_cache = False
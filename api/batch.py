@@ -0,0 +1,105 @@
+"""
+Several GET requests answered by one HTTP request.
+
+On page load the SPA needs the member, the feed, the inbox and the pending
+friend requests. Sent separately, each of those pays for the nginx hop, a
+gunicorn worker slot, the middleware stack and cookie authentication.
+POST /api/batch/ takes the relative paths instead and runs them here: each
+path is resolved against api/urls.py and its view is called directly with
+a GET request cloned from the batch request. The member authenticated for
+the batch is handed to every item, so authentication runs once.
+
+Items get no middleware of their own. Their conditional headers are
+dropped (one If-None-Match cannot apply to every item), and each item is
+counted in api.metrics under its own route as well as the batch under
+`batch`. Items run one after another in this worker; their bodies are
+rendered once, as part of the batch response.
+"""
+import copy
+import inspect
+import logging
+from time import perf_counter
+from urllib.parse import urlsplit
+
+from asgiref.sync import async_to_sync
+from django.http import QueryDict
+from django.urls import Resolver404, resolve
+from rest_framework import status
+
+from api import metrics
+
+logger = logging.getLogger('django.request')
+
+PREFIX = '/api/'
+URLCONF = 'api.urls'
+
+# Response headers that carry information about the body
+BATCHED_HEADERS = ('ETag', 'Link')
+
+# Request headers that only make sense for the batch request itself
+DROPPED_HEADERS = ('HTTP_IF_NONE_MATCH', 'HTTP_IF_MATCH', 'HTTP_IF_MODIFIED_SINCE', 'HTTP_IF_UNMODIFIED_SINCE')
+
+
+async def _wait(awaitable):
+    return await awaitable
+
+
+def _error(path, status_code, detail):
+    return {'path': path, 'status': status_code, 'duration_ms': 0.0, 'headers': {}, 'body': {'detail': detail}}
+
+
+def _subrequest(request, path, query, match):
+    """A GET for `path` carrying the cookies, headers and member of `request`"""
+    sub = copy.copy(request._request)
+    sub.__dict__.pop('_resource_tags', None)
+    sub.method = 'GET'
+    sub.path = sub.path_info = path
+    sub.META = {key: value for key, value in sub.META.items() if key not in DROPPED_HEADERS}
+    sub.META.update(REQUEST_METHOD='GET', PATH_INFO=path, QUERY_STRING=query)
+    sub.GET = QueryDict(query)
+    sub.resolver_match = match
+    # Read by rest_framework.request.Request in place of the authenticators.
+    # Views may mutate request.user, so every item gets its own copy.
+    sub._force_auth_user = copy.copy(request.user)
+    return sub
+
+
+def run(request, target):
+    """One batch item: `target` is relative to /api/ (or starts with /api/)"""
+    parts = urlsplit(target)
+    path = parts.path
+    if parts.scheme or parts.netloc:
+        return _error(target, status.HTTP_400_BAD_REQUEST, 'Only paths under /api/ can be batched')
+    if path.startswith(PREFIX):
+        path = path[len(PREFIX):]
+    elif path.startswith('/'):
+        return _error(target, status.HTTP_400_BAD_REQUEST, 'Only paths under /api/ can be batched')
+
+    try:
+        match = resolve('/' + path, urlconf=URLCONF)
+    except Resolver404:
+        return _error(target, status.HTTP_404_NOT_FOUND, 'Not found.')
+    if match.url_name == 'batch':
+        return _error(target, status.HTTP_400_BAD_REQUEST, 'Batch requests cannot be nested')
+
+    started = perf_counter()
+    try:
+        response = match.func(_subrequest(request, PREFIX + path, parts.query, match), *match.args, **match.kwargs)
+        if inspect.isawaitable(response):
+            response = async_to_sync(_wait)(response)
+        status_code = response.status_code
+        headers = {name: response[name] for name in BATCHED_HEADERS if name in response}
+        body = getattr(response, 'data', None)
+    except Exception:
+        logger.exception('Batch item failed: GET %s', target)
+        status_code, headers, body = status.HTTP_500_INTERNAL_SERVER_ERROR, {}, {'detail': 'Internal server error'}
+    seconds = perf_counter() - started
+
+    metrics.observe(match.url_name, 'GET', status_code, seconds)
+    return {
+        'path': target,
+        'status': status_code,
+        'duration_ms': round(seconds * 1000, 2),
+        'headers': headers,
+        'body': body,
+    }
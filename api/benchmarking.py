@@ -0,0 +1,79 @@
+"""
+Helpers shared by the benchmark commands that drive a real server.
+"""
+import os
+import socket
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import CommandError
+
+
+def percentile(values, fraction):
+    """`fraction` percentile of already sorted `values` (nearest rank)"""
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+@contextmanager
+def gunicorn(config, app, workers=None, environ=None):
+    """
+    Run gunicorn with `config` on a free local port, with `environ` added to
+    this process's environment; yields (port, master pid)
+    """
+    port = free_port()
+    command = [sys.executable, '-m', 'gunicorn', '--config', config, '--bind', f'127.0.0.1:{port}']
+    if workers:
+        command += ['--workers', str(workers)]
+    server = subprocess.Popen(
+        [*command, app], cwd=settings.BASE_DIR, env={**os.environ, **(environ or {})},
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_until_listening(port, server)
+        yield port, server.pid
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def wait_until_listening(port, server):
+    for _ in range(300):
+        if server.poll() is not None:
+            raise CommandError(f"gunicorn exited with status {server.returncode}")
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            # Give every worker time to boot, not just the first
+            time.sleep(1)
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise CommandError("gunicorn did not start listening")
+
+
+def tree_rss(pid):
+    """Resident memory of `pid` and its direct children (gunicorn's master and workers)"""
+    total = 0
+    for entry in Path('/proc').iterdir():
+        if not entry.name.isdigit():
+            continue
+        try:
+            status = dict(
+                line.split(':', 1) for line in (entry / 'status').read_text().splitlines() if ':' in line
+            )
+        except OSError:
+            continue
+        if int(entry.name) == pid or int(status['PPid']) == pid:
+            total += int(status.get('VmRSS', '0 kB').split()[0]) * 1024
+    return total
@@ -0,0 +1,65 @@
+"""
+Maintenance of Conversation rows, the per-pair summary behind the inbox.
+
+The writers run inside the caller's transaction so the summary never
+disagrees with the messages it describes, and bump the INBOX versions of
+the members whose inbox changed. The recipient's total unread count
+(api.member_counters) moves with the per-conversation one.
+"""
+from django.db import transaction
+from django.db.models import F
+
+from api import member_counters, versions
+from api.models import Conversation, Message
+
+
+def record_message(message):
+    """Point the pair's conversation at `message` and bump the recipient's unread count"""
+    user1_id, user2_id = Conversation.ordered_pair(message.sender_id, message.recipient_id)
+    unread_field = Conversation.unread_field(message.recipient_id, message.sender_id)
+
+    updated = Conversation.objects.filter(user1_id=user1_id, user2_id=user2_id).update(
+        last_message=message,
+        last_message_at=message.created_at,
+        **{unread_field: F(unread_field) + 1},
+    )
+    if not updated:
+        Conversation.objects.create(
+            user1_id=user1_id,
+            user2_id=user2_id,
+            last_message=message,
+            last_message_at=message.created_at,
+            **{unread_field: 1},
+        )
+    member_counters.add(message.recipient_id, member_counters.UNREAD_MESSAGES, 1)
+    versions.bump(versions.INBOX, message.sender_id, message.recipient_id)
+
+
+def mark_read(member, partner, message_id):
+    """
+    Move `member`'s read cursor with `partner` up to `message_id` and
+    recount their unread messages past it. A cursor already there is left
+    alone, so reading a read thread writes nothing.
+    """
+    user1_id, user2_id = Conversation.ordered_pair(member.id, partner.id)
+    cursor_field = Conversation.last_read_field(member.id, partner.id)
+    unread_field = Conversation.unread_field(member.id, partner.id)
+    with transaction.atomic():
+        thread = Conversation.objects.filter(
+            user1_id=user1_id, user2_id=user2_id, **{f'{cursor_field}__lt': message_id},
+        ).values('id', 'last_message_id', unread_field).first()
+        if thread is None:
+            return
+        unread = 0
+        if thread['last_message_id'] is None or thread['last_message_id'] > message_id:
+            unread = Message.objects.filter(sender_id=partner.id, recipient_id=member.id, id__gt=message_id).count()
+        Conversation.objects.filter(id=thread['id']).update(**{cursor_field: message_id, unread_field: unread})
+        member_counters.add(member.id, member_counters.UNREAD_MESSAGES, unread - thread[unread_field])
+        versions.bump(versions.INBOX, member.id)
+
+
+def partner_ids(member_id):
+    """Ids of everyone `member_id` has a conversation with"""
+    as_user1 = Conversation.objects.filter(user1_id=member_id).values_list('user2_id', flat=True)
+    as_user2 = Conversation.objects.filter(user2_id=member_id).values_list('user1_id', flat=True)
+    return list(as_user1.union(as_user2, all=True))
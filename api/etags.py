@@ -0,0 +1,118 @@
+"""
+Conditional GET for the endpoints the SPA refetches on navigation and poll.
+
+Each ETag is built from api.versions counters (plus the requesting member
+and the full path, which carries cursor and limit), so computing it needs
+no serialization and at most an index probe or the friend-id lookup the
+view itself would do. A matching If-None-Match returns 304 before the view
+runs.
+
+The same tags key the response cache (api.response_cache); `resource_tag`
+remembers each tag on the request so stacking both decorators computes it
+once.
+
+Coroutine handlers (api.async_views) get their tag computed in the sync
+thread, since tag functions may query the database.
+"""
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.db.models import Q
+from django.utils.cache import patch_cache_control
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
+
+from api import friend_graph, timeline, versions
+from api.models import FriendRequest, Post
+
+
+def conditional(etag_func):
+    """
+    Method decorator for APIView handlers: answer If-None-Match from
+    `etag_func(request, *args, **kwargs)` and make browsers revalidate
+    instead of reusing a response without asking.
+    """
+    def decorator(handler):
+        conditional_handler = condition(
+            etag_func=lambda request, *args, **kwargs: resource_tag(etag_func, request, *args, **kwargs)
+        )(handler)
+
+        if iscoroutinefunction(handler):
+            async def wrapper(request, *args, **kwargs):
+                # Memoize the tag first so condition() never queries on the loop
+                await sync_to_async(resource_tag)(etag_func, request, *args, **kwargs)
+                response = await conditional_handler(request, *args, **kwargs)
+                patch_cache_control(response, private=True, no_cache=True)
+                return response
+            return wrapper
+
+        def wrapper(request, *args, **kwargs):
+            response = conditional_handler(request, *args, **kwargs)
+            patch_cache_control(response, private=True, no_cache=True)
+            return response
+        return wrapper
+    return method_decorator(decorator)
+
+
+def resource_tag(etag_func, request, *args, **kwargs):
+    tags = request.__dict__.setdefault('_resource_tags', {})
+    if etag_func not in tags:
+        tags[etag_func] = etag_func(request, *args, **kwargs)
+    return tags[etag_func]
+
+
+def feed(request):
+    member_id = request.user.id
+    author_ids = sorted([member_id, *friend_graph.friend_ids(member_id)])
+    return versions.tag(
+        'feed', member_id, request.get_full_path(), timeline.is_enabled(),
+        author_ids,
+        versions.get_many(versions.POSTS, author_ids),
+        versions.get_many(versions.MEMBER, author_ids),
+    )
+
+
+def profile(request, id):
+    # Friend requests change the profile's friend_request_status but are
+    # not versioned; one probe of the request indexes covers them
+    pending = FriendRequest.objects.filter(
+        Q(from_user_id=request.user.id, to_user_id=id) | Q(from_user_id=id, to_user_id=request.user.id),
+        status='pending',
+    ).values_list('id', flat=True)
+    return versions.tag(
+        'profile', request.user.id, id,
+        versions.get(versions.MEMBER, id),
+        versions.get(versions.FRIENDS, id),
+        list(pending),
+    )
+
+
+def post(request, id):
+    author_id = Post.objects.filter(id=id).values_list('author_id', flat=True).first()
+    return versions.tag(
+        'post', request.user.id, id,
+        versions.get(versions.POST, id),
+        author_id,
+        versions.get(versions.MEMBER, author_id) if author_id else None,
+    )
+
+
+def user_posts(request, user_id):
+    return versions.tag(
+        'user_posts', request.user.id, request.get_full_path(),
+        versions.get(versions.POSTS, user_id),
+        versions.get(versions.MEMBER, user_id),
+    )
+
+
+def friends(request):
+    member_id = request.user.id
+    friend_ids = sorted(friend_graph.friend_ids(member_id))
+    return versions.tag(
+        'friends', member_id, request.get_full_path(),
+        friend_ids,
+        versions.get_many(versions.MEMBER, friend_ids),
+    )
+
+
+def inbox(request):
+    member_id = request.user.id
+    return versions.tag('inbox', member_id, request.get_full_path(), versions.get(versions.INBOX, member_id))
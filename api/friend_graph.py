@@ -0,0 +1,105 @@
+"""
+Per-worker cache of the friendship graph.
+
+Each entry holds a member's friend ids as a frozenset, stamped with that
+member's FRIENDS version (api.versions). Accepting or removing a friendship
+bumps both members' versions, so every worker drops its stale entry on the
+next read without a database round trip. The cache is bounded both by
+entry count and by the total number of ids held. are_friends() never loads
+a whole friend set: without a cached one it probes the pair's row.
+"""
+import sys
+import threading
+
+from django.conf import settings
+from django.db import connection
+
+from api import versions
+from api.lru import LRUCache
+from api.models import Friendship
+
+_cache = LRUCache(
+    maxsize=settings.FRIEND_GRAPH_CACHE_SIZE,
+    maxweight=settings.FRIEND_GRAPH_CACHE_MAX_IDS,
+    weigher=lambda entry: len(entry[1]) + 1,
+)
+
+_stats = {'hits': 0, 'misses': 0, 'stale': 0}
+_stats_lock = threading.Lock()
+
+
+def _load(member_id):
+    # Friendship rows are canonical (user1 < user2): one range scan per side
+    as_user1 = Friendship.objects.filter(user1_id=member_id).values_list('user2_id', flat=True)
+    as_user2 = Friendship.objects.filter(user2_id=member_id).values_list('user1_id', flat=True)
+    return frozenset(as_user1.union(as_user2, all=True))
+
+
+def _cached(member_id, version):
+    entry = _cache.get(member_id)
+    if entry is not None and entry[0] == version:
+        return entry[1]
+    return None
+
+
+def friend_ids(member_id):
+    """Frozen set of the ids of `member_id`'s friends"""
+    # Read the version before the rows so a concurrent bump forces a reload
+    version = versions.get(versions.FRIENDS, member_id)
+    entry = _cache.get(member_id)
+    result = 'misses' if entry is None else 'hits' if entry[0] == version else 'stale'
+    with _stats_lock:
+        _stats[result] += 1
+    if result == 'hits':
+        return entry[1]
+
+    ids = _load(member_id)
+    # Inside a transaction the rows may include uncommitted changes that a
+    # rollback would discard without bumping any version; don't keep them.
+    if not connection.in_atomic_block:
+        _cache.set(member_id, (version, ids))
+    return ids
+
+
+def are_friends(member_id, other_id):
+    """Answer from a cached friend set if there is one, else probe the pair's row"""
+    ids = _cached(member_id, versions.get(versions.FRIENDS, member_id))
+    if ids is not None:
+        return other_id in ids
+    user1_id, user2_id = Friendship.ordered_pair(member_id, other_id)
+    return Friendship.objects.filter(user1_id=user1_id, user2_id=user2_id).exists()
+
+
+def invalidate(*member_ids):
+    """Drop cached friend sets for `member_ids` in every worker"""
+    versions.bump(versions.FRIENDS, *member_ids)
+    for member_id in member_ids:
+        _cache.delete(member_id)
+
+
+def clear():
+    """Drop every cached friend set in this worker"""
+    _cache.clear()
+
+
+def stats():
+    cache_stats = _cache.stats()
+    with _stats_lock:
+        counts = dict(_stats)
+    lookups = sum(counts.values())
+    return {
+        **counts,
+        'hit_rate': counts['hits'] / lookups if lookups else 0.0,
+        'entries': cache_stats['size'],
+        'cached_ids': cache_stats['weight'] - cache_stats['size'],
+        'evictions': cache_stats['evictions'],
+        'memory_bytes': memory_footprint(),
+    }
+
+
+def memory_footprint():
+    """Approximate bytes held by cached friend sets (sets and their ints)"""
+    total = 0
+    for _version, ids in _cache.values():
+        total += sys.getsizeof(ids) + sum(sys.getsizeof(friend_id) for friend_id in ids)
+    return total
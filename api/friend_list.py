@@ -0,0 +1,107 @@
+"""
+A member's friends list, read in one query.
+
+Friendship rows are canonical (user1 < user2), so the friends of a member
+are the user2 side of the rows where they are user1 plus the user1 side of
+the rows where they are user2. Each side is an index range scan joined to
+the other member's row by primary key. The two sides are combined with
+UNION ALL, then sorted and limited in the same statement. Rows carry the
+MemberSerializer fields under `friend_` names (api.row_serializers) plus
+the friendship's `since`.
+
+Pages are keyset ranges over the sort key, so a page never costs more
+than its own rows.
+"""
+import base64
+import json
+from datetime import datetime
+
+from django.db.models import F, Q
+from rest_framework.exceptions import ParseError
+
+from api.models import Friendship
+from api.row_serializers import friend_rows
+
+# Sort name -> keyset columns and whether it runs newest first. The last
+# column is always the friend's id, so every key is unique.
+SORTS = {
+    'id': (('friend_id',), False),
+    'name': (('friend_first_name', 'friend_last_name', 'friend_id'), False),
+    'date': (('since', 'friend_id'), True),
+}
+
+
+def _paths(side):
+    """Row column -> field path from Friendship, reading the friend from `side`"""
+    paths = {column: f'{side}__{column[len(friend_rows.prefix):]}' for column in friend_rows.columns}
+    paths['since'] = 'created_at'
+    return paths
+
+
+_PATHS = {side: _paths(side) for side in ('user1', 'user2')}
+
+
+def _side(member_id, side, query, sort, position):
+    """Friends on one side of the member's friendships, filtered and past `position`"""
+    paths = _PATHS[side]
+    other = 'user1' if side == 'user2' else 'user2'
+    friendships = Friendship.objects.filter(**{f'{other}_id': member_id})
+
+    if query:
+        friendships = friendships.filter(
+            Q(**{f'{side}__username__icontains': query})
+            | Q(**{f'{side}__first_name__icontains': query})
+            | Q(**{f'{side}__last_name__icontains': query})
+        )
+
+    if position is not None:
+        columns, descending = SORTS[sort]
+        after = Q()
+        # (a, b, c) > (x, y, z) as (a > x) or (a = x and b > y) or ...
+        for index, column in enumerate(columns):
+            step = Q(**{f'{paths[column]}__{"lt" if descending else "gt"}': position[index]})
+            for previous, value in zip(columns[:index], position):
+                step &= Q(**{paths[previous]: value})
+            after |= step
+        friendships = friendships.filter(after)
+
+    return friendships.values(**{column: F(path) for column, path in paths.items()})
+
+
+def page(member_id, sort='id', query='', position=None, limit=None):
+    """Rows of the member's friends in `sort` order after `position`, at most `limit`"""
+    columns, descending = SORTS[sort]
+    friends = _side(member_id, 'user2', query, sort, position).union(
+        _side(member_id, 'user1', query, sort, position), all=True,
+    ).order_by(*(f'-{column}' if descending else column for column in columns))
+    if limit is not None:
+        friends = friends[:limit]
+    return list(friends)
+
+
+def encode_cursor(row, sort):
+    columns, _ = SORTS[sort]
+    values = [row[column].isoformat() if isinstance(row[column], datetime) else row[column] for column in columns]
+    return base64.urlsafe_b64encode(json.dumps([sort, *values]).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, sort):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        cursor_sort, *values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        columns, _ = SORTS[sort]
+        if cursor_sort != sort or len(values) != len(columns):
+            raise ValueError(cursor_sort)
+        return [_decode_value(column, value) for column, value in zip(columns, values)]
+    except (TypeError, ValueError, UnicodeDecodeError):
+        raise ParseError('Invalid cursor')
+
+
+def _decode_value(column, value):
+    """A cursor value checked against its column: ids are ints, names strings"""
+    if column == 'since':
+        return datetime.fromisoformat(value)
+    # type() rather than isinstance(): JSON true/false would pass as ints
+    if type(value) is not (int if column == 'friend_id' else str):
+        raise ValueError(column)
+    return value
@@ -0,0 +1,172 @@
+"""
+Per-request timing: SQL queries, duplicate queries and the time spent in
+the database, in serializers and in rendering.
+
+A sampled request (settings.REQUEST_TIMING_SAMPLE_RATE) carries a Timings
+object in a context variable. Every database connection gets `record_query`
+as an execute wrapper when it is opened (api/signals.py), so queries are
+seen in whichever thread runs them, including the sync_to_async threads of
+the async views; outside a sampled request a query pays one context
+variable lookup. Serializers add their to_representation time through
+TimedSerializerMixin (or serializer_phase() around other serialization code)
+and DRF's JSON renderer its render time.
+
+The totals go out as a Server-Timing header (settings.REQUEST_TIMING_HEADER)
+and as one `api.timing` log record per request, with the fields both in
+the message as key=value pairs and in `record.timing` for structured
+formatters.
+"""
+import logging
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+from time import perf_counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from rest_framework.renderers import JSONRenderer
+
+logger = logging.getLogger('api.timing')
+
+_current = ContextVar('request_timings', default=None)
+
+
+class Timings:
+    __slots__ = ('started', 'queries', 'duplicates', 'db', 'serializer', 'render', 'statements', 'serializing')
+
+    def __init__(self):
+        self.started = perf_counter()
+        self.queries = 0
+        self.duplicates = 0
+        self.db = 0.0
+        self.serializer = 0.0
+        self.render = 0.0
+        self.statements = set()
+        self.serializing = False
+
+
+def record_query(execute, sql, params, many, context):
+    timings = _current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+
+    started = perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.db += perf_counter() - started
+        timings.queries += 1
+        statement = (sql, repr(params))
+        if statement in timings.statements:
+            timings.duplicates += 1
+        else:
+            timings.statements.add(statement)
+
+
+@contextmanager
+def serializer_phase():
+    """Count the block toward the serializer phase unless already inside it"""
+    timings = _current.get()
+    if timings is None or timings.serializing:
+        yield
+        return
+
+    timings.serializing = True
+    started = perf_counter()
+    try:
+        yield
+    finally:
+        timings.serializer += perf_counter() - started
+        timings.serializing = False
+
+
+class TimedSerializerMixin:
+    """Count to_representation toward the serializer phase (nested serializers once)"""
+
+    def to_representation(self, instance):
+        timings = _current.get()
+        if timings is None or timings.serializing:
+            return super().to_representation(instance)
+
+        timings.serializing = True
+        started = perf_counter()
+        try:
+            return super().to_representation(instance)
+        finally:
+            timings.serializer += perf_counter() - started
+            timings.serializing = False
+
+
+class TimedJSONRenderer(JSONRenderer):
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        timings = _current.get()
+        if timings is None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        started = perf_counter()
+        try:
+            return super().render(data, accepted_media_type, renderer_context)
+        finally:
+            timings.render += perf_counter() - started
+
+
+class RequestTimingMiddleware:
+    """Time sampled requests; put first in MIDDLEWARE so the total covers the rest"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if random.random() >= settings.REQUEST_TIMING_SAMPLE_RATE:
+            return self.get_response(request)
+
+        timings = Timings()
+        token = _current.set(timings)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        self.report(request, response, timings)
+        return response
+
+    async def __acall__(self, request):
+        if random.random() >= settings.REQUEST_TIMING_SAMPLE_RATE:
+            return await self.get_response(request)
+
+        timings = Timings()
+        token = _current.set(timings)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        self.report(request, response, timings)
+        return response
+
+    def report(self, request, response, timings):
+        total = perf_counter() - timings.started
+        fields = {
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'total_ms': round(total * 1000, 2),
+            'db_ms': round(timings.db * 1000, 2),
+            'queries': timings.queries,
+            'duplicate_queries': timings.duplicates,
+            'serializer_ms': round(timings.serializer * 1000, 2),
+            'render_ms': round(timings.render * 1000, 2),
+        }
+        if settings.REQUEST_TIMING_HEADER:
+            response.headers['Server-Timing'] = (
+                f"total;dur={fields['total_ms']}, db;dur={fields['db_ms']}, "
+                f"serializer;dur={fields['serializer_ms']}, render;dur={fields['render_ms']}, "
+                f'queries;desc="{timings.queries}", duplicate-queries;desc="{timings.duplicates}"'
+            )
+        logger.info(' '.join(f'{key}={value}' for key, value in fields.items()), extra={'timing': fields})
@@ -0,0 +1,112 @@
+import http.client
+import random
+import socket
+import threading
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.benchmarking import gunicorn, percentile, tree_rss
+from api.models import Member
+
+SERVERS = {
+    'wsgi': ('gunicorn.conf.py', 'config.wsgi:application'),
+    'asgi': ('gunicorn.asgi.conf.py', 'config.asgi:application'),
+}
+
+# The async read endpoints; {partner} is another member
+PATHS = ['/api/auth/me/', '/api/posts/', '/api/conversations/', '/api/conversations/{partner}/']
+
+
+class Command(BaseCommand):
+    help = (
+        "Start gunicorn with the WSGI and the ASGI configuration at the same "
+        "worker count (the same memory budget), drive the async read endpoints "
+        "with concurrent clients while slow clients trickle their requests in "
+        "(as nginx passes them on unbuffered), and report throughput, latency "
+        "and the servers' resident memory"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=2)
+        parser.add_argument('--clients', default='8,32,128', help="Comma-separated concurrency levels")
+        parser.add_argument('--slow-clients', type=int, default=2)
+        parser.add_argument('--duration', type=float, default=10.0, help="Seconds per concurrency level")
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        member_ids = list(Member.objects.order_by('id').values_list('id', flat=True)[:1000])
+        if len(member_ids) < 2:
+            raise CommandError("Need at least two members; seed the database first")
+        levels = [int(level) for level in options['clients'].split(',')]
+
+        self.stdout.write(
+            f"{options['workers']} workers, {options['slow_clients']} slow clients, "
+            f"{options['duration']:.0f}s per level"
+        )
+        self.stdout.write(
+            f"{'server':<8}{'clients':>8}{'req/s':>9}{'p50 ms':>9}{'p99 ms':>9}{'errors':>8}{'RSS MiB':>9}"
+        )
+        for name, (config, app) in SERVERS.items():
+            with gunicorn(config, app, options['workers']) as (port, pid):
+                for clients in levels:
+                    rng = random.Random(options['seed'])
+                    latencies, errors = self.run_level(port, clients, options, member_ids, rng)
+                    latencies.sort()
+                    self.stdout.write(
+                        f"{name:<8}{clients:>8}{len(latencies) / options['duration']:>9.0f}"
+                        f"{percentile(latencies, 0.50):>9.1f}{percentile(latencies, 0.99):>9.1f}"
+                        f"{errors:>8}{tree_rss(pid) / 1024 / 1024:>9.0f}"
+                    )
+
+    def run_level(self, port, clients, options, member_ids, rng):
+        deadline = time.monotonic() + options['duration']
+        latencies, errors = [], [0]
+        lock = threading.Lock()
+
+        def client(seed):
+            rng = random.Random(seed)
+            while time.monotonic() < deadline:
+                member_id, partner_id = rng.sample(member_ids, 2)
+                path = rng.choice(PATHS).format(partner=partner_id)
+                started = time.monotonic()
+                try:
+                    # One connection per request, like nginx's upstream
+                    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+                    connection.request('GET', path, headers={
+                        'Cookie': f'session_id={member_id}', 'Connection': 'close',
+                    })
+                    response = connection.getresponse()
+                    response.read()
+                    connection.close()
+                    ok = response.status == 200
+                except OSError:
+                    ok = False
+                with lock:
+                    if ok:
+                        latencies.append((time.monotonic() - started) * 1000)
+                    else:
+                        errors[0] += 1
+
+        def slow_client():
+            # Dribble a request head out over a couple of seconds, repeatedly
+            while time.monotonic() < deadline:
+                try:
+                    with socket.create_connection(('127.0.0.1', port), timeout=30) as sock:
+                        for byte in b'GET /api/auth/me/ HTTP/1.1\r\nHost: bench\r\n':
+                            if time.monotonic() >= deadline:
+                                break
+                            sock.sendall(bytes([byte]))
+                            time.sleep(0.05)
+                        sock.sendall(b'Connection: close\r\n\r\n')
+                        sock.recv(65536)
+                except OSError:
+                    pass
+
+        threads = [threading.Thread(target=client, args=(rng.random(),)) for _ in range(clients)]
+        threads += [threading.Thread(target=slow_client) for _ in range(options['slow_clients'])]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return latencies, errors[0]
@@ -0,0 +1,470 @@
+import http.client
+import json
+import random
+import re
+import subprocess
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import Client
+from django.urls import reverse
+
+from api import urls
+from api.benchmarking import gunicorn, percentile
+from api.models import Comment, Conversation, FriendRequest, Friendship, Like, Member, Message, Post
+
+
+class Call:
+    """One request: who sends it (a member id or None), where, and the JSON body"""
+
+    def __init__(self, member_id, path, data=None, record=None):
+        self.member_id = member_id
+        self.path = path
+        self.data = data
+        # Called with the decoded response body of a successful call
+        self.record = record
+
+
+class Workload:
+    """
+    A sample of the seeded data plus the pools each phase fills for later
+    ones: posts created by one phase are deleted by another, sent friend
+    requests are accepted or rejected, and so on.
+    """
+
+    def __init__(self, rng, run_id, sample):
+        self.rng = rng
+        self.run_id = run_id
+        member_ids = list(Member.objects.values_list('id', flat=True))
+        if len(member_ids) < 2:
+            raise CommandError("Need at least two members; run `manage.py seed_social_graph` first")
+        self.member_ids = rng.sample(member_ids, min(sample, len(member_ids)))
+        sampled = set(self.member_ids)
+        self.friends = {member_id: [] for member_id in self.member_ids}
+        for user1_id, user2_id in Friendship.objects.filter(user1_id__in=sampled).values_list('user1_id', 'user2_id'):
+            self.friends[user1_id].append(user2_id)
+        for user1_id, user2_id in Friendship.objects.filter(user2_id__in=sampled).values_list('user1_id', 'user2_id'):
+            self.friends[user2_id].append(user1_id)
+        self.post_ids = list(Post.objects.order_by('-id').values_list('id', flat=True)[:sample])
+        self.threads = list(
+            Conversation.objects.filter(user1_id__in=sampled).values_list('user1_id', 'user2_id')[:sample]
+        )
+        self.lock = threading.Lock()
+        self.pools = {name: deque() for name in ('registered', 'posts', 'comments', 'requests', 'accepted')}
+        self.requested_pairs = set()
+        self.counter = 0
+
+    def member(self):
+        return self.rng.choice(self.member_ids)
+
+    def friend_of(self, member_id):
+        return self.rng.choice(self.friends[member_id]) if self.friends[member_id] else self.member()
+
+    def post(self):
+        return self.rng.choice(self.post_ids) if self.post_ids else 0
+
+    def thread(self):
+        if self.threads:
+            return self.rng.sample(self.rng.choice(self.threads), 2)
+        member_id = self.member()
+        return member_id, self.friend_of(member_id)
+
+    def next_number(self):
+        with self.lock:
+            self.counter += 1
+            return self.counter
+
+    def add(self, pool, item):
+        self.pools[pool].append(item)
+
+    def take(self, pool):
+        try:
+            return self.pools[pool].popleft()
+        except IndexError:
+            return None
+
+    def stranger_pair(self):
+        """Two sampled members who are not friends and have no request yet this run"""
+        for _ in range(100):
+            member_id, other_id = self.rng.sample(self.member_ids, 2)
+            pair = Friendship.ordered_pair(member_id, other_id)
+            if other_id not in self.friends[member_id] and pair not in self.requested_pairs:
+                with self.lock:
+                    self.requested_pairs.add(pair)
+                return member_id, other_id
+        return None
+
+
+def register(w):
+    username = f'bench{w.run_id}_{w.next_number()}'
+    return Call(None, reverse('register'), {
+        'username': username, 'email': f'{username}@example.com', 'password': 'password',
+        'first_name': 'Bench', 'last_name': 'Member',
+    }, record=lambda data: w.add('registered', username))
+
+
+def login(w):
+    username = w.take('registered')
+    return username and Call(None, reverse('login'), {'username': username, 'password': 'password'})
+
+
+def update_profile(w):
+    member_id = w.member()
+    return Call(member_id, reverse('user-detail', kwargs={'id': member_id}), {'bio': f'Updated {w.next_number()}'})
+
+
+def list_users(w):
+    # Browsing the directory, and now and then searching it
+    if w.rng.random() < 0.25:
+        return Call(w.member(), reverse('users-list') + '?search=' + w.rng.choice(['an', 'iva', 'pet', 'ol']))
+    return Call(w.member(), reverse('users-list'))
+
+
+def create_post(w):
+    member_id = w.member()
+    return Call(member_id, reverse('posts-list'), {'content': 'Benchmark post'},
+                record=lambda data: w.add('posts', (member_id, data['id'])))
+
+
+def delete_post(w):
+    created = w.take('posts')
+    return created and Call(created[0], reverse('post-detail', kwargs={'id': created[1]}))
+
+
+def create_comment(w):
+    member_id = w.member()
+    return Call(member_id, reverse('comments-list', kwargs={'post_id': w.post()}), {'content': 'Benchmark comment'},
+                record=lambda data: w.add('comments', (member_id, data['id'])))
+
+
+def delete_comment(w):
+    created = w.take('comments')
+    return created and Call(created[0], reverse('comment-delete', kwargs={'id': created[1]}))
+
+
+def send_friend_request(w):
+    pair = w.stranger_pair()
+    if pair is None:
+        return None
+    member_id, other_id = pair
+    return Call(member_id, reverse('send-friend-request', kwargs={'user_id': other_id}),
+                record=lambda data: w.add('requests', (other_id, member_id, data['id'])))
+
+
+def accept_friend_request(w):
+    sent = w.take('requests')
+    if sent is None:
+        return None
+    to_user_id, from_user_id, request_id = sent
+    return Call(to_user_id, reverse('accept-friend-request', kwargs={'request_id': request_id}),
+                record=lambda data: w.add('accepted', (to_user_id, from_user_id)))
+
+
+def reject_friend_request(w):
+    sent = w.take('requests')
+    return sent and Call(sent[0], reverse('reject-friend-request', kwargs={'request_id': sent[2]}))
+
+
+def remove_friend(w):
+    pair = w.take('accepted')
+    return pair and Call(pair[0], reverse('remove-friend', kwargs={'user_id': pair[1]}))
+
+
+def read_conversation(w):
+    member_id, partner_id = w.thread()
+    return Call(member_id, reverse('conversation-messages', kwargs={'user_id': partner_id}))
+
+
+def send_message(w):
+    member_id, partner_id = w.thread()
+    return Call(member_id, reverse('send-message'), {'recipient_id': partner_id, 'content': 'Benchmark message'})
+
+
+# What the SPA fetches on page load, as one /api/batch/ request
+PAGE_LOAD = ['auth/me/', 'posts/?limit=20', 'conversations/', 'friends/requests/']
+
+# Run in this order: phases that create rows come before those that use them
+SCENARIOS = [
+    ('POST', 'register', register),
+    ('POST', 'login', login),
+    ('POST', 'logout', lambda w: Call(w.member(), reverse('logout'))),
+    ('GET', 'me', lambda w: Call(w.member(), reverse('me'))),
+    ('GET', 'me-counters', lambda w: Call(w.member(), reverse('me-counters'))),
+    ('GET', 'users-list', list_users),
+    ('GET', 'user-detail', lambda w: Call(w.member(), reverse('user-detail', kwargs={'id': w.member()}))),
+    ('PUT', 'user-detail', update_profile),
+    ('GET', 'posts-list', lambda w: Call(w.member(), reverse('posts-list'))),
+    ('POST', 'posts-list', create_post),
+    ('GET', 'post-detail', lambda w: Call(w.member(), reverse('post-detail', kwargs={'id': w.post()}))),
+    ('DELETE', 'post-detail', delete_post),
+    ('GET', 'user-posts', lambda w: Call(w.member(), reverse('user-posts', kwargs={'user_id': w.member()}))),
+    ('GET', 'comments-list', lambda w: Call(w.member(), reverse('comments-list', kwargs={'post_id': w.post()}))),
+    ('POST', 'comments-list', create_comment),
+    ('DELETE', 'comment-delete', delete_comment),
+    ('POST', 'like-toggle', lambda w: Call(w.member(), reverse('like-toggle', kwargs={'post_id': w.post()}))),
+    ('GET', 'friends-list', lambda w: Call(w.member(), reverse('friends-list'))),
+    ('GET', 'friend-requests', lambda w: Call(w.member(), reverse('friend-requests'))),
+    ('GET', 'friend-sent', lambda w: Call(w.member(), reverse('friend-sent'))),
+    ('POST', 'send-friend-request', send_friend_request),
+    ('POST', 'accept-friend-request', accept_friend_request),
+    ('POST', 'reject-friend-request', reject_friend_request),
+    ('DELETE', 'remove-friend', remove_friend),
+    ('GET', 'conversations-list', lambda w: Call(w.member(), reverse('conversations-list'))),
+    ('GET', 'conversation-messages', read_conversation),
+    ('POST', 'send-message', send_message),
+    ('POST', 'batch', lambda w: Call(w.member(), reverse('batch'), {'requests': PAGE_LOAD})),
+]
+
+# Phases that consume what earlier ones created: (pool, share of it to use)
+POOLS = {
+    ('POST', 'login'): ('registered', 1.0),
+    ('DELETE', 'post-detail'): ('posts', 1.0),
+    ('DELETE', 'comment-delete'): ('comments', 1.0),
+    ('POST', 'accept-friend-request'): ('requests', 0.5),
+    ('POST', 'reject-friend-request'): ('requests', 1.0),
+    ('DELETE', 'remove-friend'): ('accepted', 1.0),
+}
+
+
+def api_routes():
+    """(method, route name) for every handler of every view in api/urls.py"""
+    routes = set()
+    for route in urls.urlpatterns:
+        view = route.callback.view_class
+        for method in view.http_method_names:
+            if method not in ('head', 'options') and hasattr(view, method):
+                routes.add((method.upper(), route.name))
+    return routes
+
+
+class AppClient:
+    """Drives the WSGI app in this process; counts SQL queries per request"""
+
+    def __init__(self):
+        self.client = Client(raise_request_exception=False)
+
+    def request(self, method, call):
+        queries = 0
+
+        def count(execute, sql, params, many, context):
+            nonlocal queries
+            queries += 1
+            return execute(sql, params, many, context)
+
+        extra = {'HTTP_COOKIE': f'session_id={call.member_id}'} if call.member_id else {}
+        body = json.dumps(call.data) if call.data is not None else ''
+        # Only the session of `call` counts, not cookies set by earlier responses
+        self.client.cookies.clear()
+        with connection.execute_wrapper(count):
+            response = self.client.generic(method, call.path, body, content_type='application/json', **extra)
+        return response.status_code, response.content, queries
+
+    def close(self):
+        connections.close_all()
+
+
+SERVER_TIMING_QUERIES = re.compile(r'(?:^|, )queries;desc="(\d+)"')
+
+
+class HTTPClient:
+    """Drives a local server over HTTP, one connection per request like nginx"""
+
+    def __init__(self, port):
+        self.port = port
+
+    def request(self, method, call):
+        headers = {'Content-Type': 'application/json', 'Connection': 'close'}
+        if call.member_id:
+            headers['Cookie'] = f'session_id={call.member_id}'
+        body = json.dumps(call.data) if call.data is not None else None
+        connection = http.client.HTTPConnection('127.0.0.1', self.port, timeout=60)
+        try:
+            connection.request(method, call.path, body, headers)
+            response = connection.getresponse()
+            # Sampled requests report their query count (api/instrumentation.py)
+            queries = SERVER_TIMING_QUERIES.search(response.getheader('Server-Timing') or '')
+            return response.status, response.read(), int(queries[1]) if queries else None
+        finally:
+            connection.close()
+
+    def close(self):
+        pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Drive every route in api/urls.py with concurrent clients, through "
+        "the WSGI app in this process or a local gunicorn, and report latency "
+        "percentiles, throughput and SQL queries per endpoint. Writes go to "
+        "the configured database: run it against seeded data "
+        "(`manage.py seed_social_graph`), not production"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--via', choices=['app', 'gunicorn'], default='app')
+        parser.add_argument('--config', default='gunicorn.conf.py', help="Gunicorn config for --via gunicorn")
+        parser.add_argument('--app', default='config.wsgi:application', help="Application for --via gunicorn")
+        parser.add_argument('--workers', type=int, help="Override the gunicorn config's worker count")
+        parser.add_argument('--clients', type=int, default=8)
+        parser.add_argument('--requests', type=int, default=200, help="Requests per endpoint")
+        parser.add_argument('--only', help="Comma-separated route names to run")
+        parser.add_argument('--sample', type=int, default=1000, help="Members and posts to draw requests from")
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--output', help="Write results as JSON to this file")
+        parser.add_argument('--baseline', help="Compare with the JSON results of an earlier run")
+
+    def handle(self, *args, **options):
+        covered = {(method, route) for method, route, _ in SCENARIOS}
+        missing = api_routes() - covered
+        if missing:
+            raise CommandError(f"No scenario for {', '.join(sorted(' '.join(route) for route in missing))}")
+
+        scenarios = SCENARIOS
+        if options['only']:
+            only = set(options['only'].split(','))
+            scenarios = [scenario for scenario in SCENARIOS if scenario[1] in only]
+
+        rng = random.Random(options['seed'])
+        workload = Workload(rng, f'{int(time.time())}', options['sample'])
+        meta = {
+            'started_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'revision': self.revision(),
+            'via': options['via'],
+            'clients': options['clients'],
+            'requests': options['requests'],
+            'seed': options['seed'],
+            'feed_fanout': settings.FEED_FANOUT,
+            'response_cache': settings.RESPONSE_CACHE,
+            'dataset': {
+                model.__name__: model.objects.count()
+                for model in (Member, Friendship, Post, Like, Comment, FriendRequest, Message, Conversation)
+            },
+        }
+        connections.close_all()
+
+        if options['via'] == 'gunicorn':
+            meta.update(config=options['config'], app=options['app'])
+            # Every request reports its query count, which production leaves off
+            timing = {'REQUEST_TIMING_SAMPLE_RATE': '1.0', 'REQUEST_TIMING_HEADER': '1'}
+            with gunicorn(options['config'], options['app'], options['workers'], timing) as (port, _):
+                results = self.run(scenarios, workload, lambda: HTTPClient(port), options)
+        else:
+            results = self.run(scenarios, workload, AppClient, options)
+
+        self.report(results)
+        if options['baseline']:
+            with open(options['baseline']) as baseline:
+                self.compare(results, json.load(baseline)['endpoints'])
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump({'meta': meta, 'endpoints': results}, output, indent=2)
+            self.stdout.write(f"Wrote {options['output']}")
+
+    def run(self, scenarios, workload, make_client, options):
+        results = {}
+        for method, route, build in scenarios:
+            total = options['requests']
+            if (method, route) in POOLS:
+                pool, share = POOLS[method, route]
+                total = min(total, int(len(workload.pools[pool]) * share))
+            results[f'{method} {route}'] = self.run_phase(method, build, workload, make_client, total, options)
+        return results
+
+    def run_phase(self, method, build, workload, make_client, total, options):
+        remaining = [total]
+        samples, statuses = [], Counter()
+        lock = threading.Lock()
+
+        def client():
+            api = make_client()
+            try:
+                while True:
+                    with lock:
+                        if remaining[0] <= 0:
+                            return
+                        remaining[0] -= 1
+                        call = build(workload)
+                    if not call:
+                        continue
+                    started = time.perf_counter()
+                    status, body, queries = api.request(method, call)
+                    elapsed = (time.perf_counter() - started) * 1000
+                    if status < 400 and call.record:
+                        call.record(json.loads(body))
+                    with lock:
+                        statuses[status] += 1
+                        samples.append((elapsed, queries))
+            finally:
+                api.close()
+
+        threads = [threading.Thread(target=client) for _ in range(min(options['clients'], max(total, 1)))]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        latencies = sorted(latency for latency, _ in samples)
+        queries = [count for _, count in samples if count is not None]
+        return {
+            'requests': len(samples),
+            'errors': sum(count for status, count in statuses.items() if status >= 400),
+            'statuses': {str(status): count for status, count in sorted(statuses.items())},
+            'throughput': len(samples) / elapsed if samples else 0.0,
+            'latency_ms': {
+                'p50': percentile(latencies, 0.50),
+                'p95': percentile(latencies, 0.95),
+                'p99': percentile(latencies, 0.99),
+                'mean': sum(latencies) / len(latencies) if latencies else 0.0,
+                'max': latencies[-1] if latencies else 0.0,
+            },
+            'queries': {
+                'mean': sum(queries) / len(queries),
+                'max': max(queries),
+            } if queries else None,
+        }
+
+    def report(self, results):
+        self.stdout.write(
+            f"{'endpoint':<36}{'n':>6}{'err':>5}{'req/s':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'queries':>9}"
+        )
+        for endpoint, result in results.items():
+            latency = result['latency_ms']
+            queries = f"{result['queries']['mean']:.1f}" if result['queries'] else '-'
+            self.stdout.write(
+                f"{endpoint:<36}{result['requests']:>6}{result['errors']:>5}{result['throughput']:>8.0f}"
+                f"{latency['p50']:>9.1f}{latency['p95']:>9.1f}{latency['p99']:>9.1f}{queries:>9}"
+            )
+
+    def compare(self, results, baseline):
+        self.stdout.write(f"\n{'change vs baseline':<36}{'req/s':>8}{'p50':>9}{'p99':>9}{'queries':>9}")
+        for endpoint, result in results.items():
+            before = baseline.get(endpoint)
+            if not before or not before['requests'] or not result['requests']:
+                continue
+            queries = '-'
+            if result['queries'] and before['queries']:
+                queries = f"{result['queries']['mean'] - before['queries']['mean']:+.1f}"
+            self.stdout.write(
+                f"{endpoint:<36}{self.change(result['throughput'], before['throughput']):>8}"
+                f"{self.change(result['latency_ms']['p50'], before['latency_ms']['p50']):>9}"
+                f"{self.change(result['latency_ms']['p99'], before['latency_ms']['p99']):>9}{queries:>9}"
+            )
+
+    def change(self, now, before):
+        return f"{(now - before) / before:+.0%}" if before else '-'
+
+    def revision(self):
+        try:
+            return subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+                capture_output=True, text=True, check=True,
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
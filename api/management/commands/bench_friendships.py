@@ -0,0 +1,130 @@
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+
+BATCH_SIZE = 100_000
+
+LAYOUTS = {
+    # As created by AcceptFriendRequestView before canonical rows: either
+    # order, single-column FK indexes, OR lookups
+    'any order': {
+        'indexes': [
+            "CREATE INDEX friendship_user1 ON api_friendship (user1_id)",
+            "CREATE INDEX friendship_user2 ON api_friendship (user2_id)",
+        ],
+        'probe': (
+            "SELECT 1 FROM api_friendship WHERE (user1_id = ? AND user2_id = ?) "
+            "OR (user1_id = ? AND user2_id = ?) LIMIT 1"
+        ),
+        'friends': "SELECT user1_id, user2_id FROM api_friendship WHERE user1_id = ? OR user2_id = ?",
+    },
+    'canonical': {
+        'indexes': [
+            "CREATE INDEX friendship_user2_idx ON api_friendship (user2_id, user1_id)",
+        ],
+        'probe': "SELECT 1 FROM api_friendship WHERE user1_id = ? AND user2_id = ? LIMIT 1",
+        'friends': (
+            "SELECT user2_id FROM api_friendship WHERE user1_id = ? "
+            "UNION ALL SELECT user1_id FROM api_friendship WHERE user2_id = ?"
+        ),
+    },
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark friendship lookups with pairs stored in any order (OR "
+        "queries) against canonical user1 < user2 rows, on scratch SQLite "
+        "databases holding the same random graph"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--edges', type=int, default=10_000_000)
+        parser.add_argument('--members', type=int, default=200_000)
+        parser.add_argument('--lookups', type=int, default=10_000)
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        members = options['members']
+
+        with tempfile.TemporaryDirectory() as directory:
+            dbs = {}
+            for name in LAYOUTS:
+                db = sqlite3.connect(os.path.join(directory, f"{name.replace(' ', '_')}.sqlite3"))
+                db.execute("PRAGMA journal_mode = OFF")
+                db.execute("PRAGMA synchronous = OFF")
+                db.execute(
+                    "CREATE TABLE api_friendship (id INTEGER PRIMARY KEY, "
+                    "user1_id INTEGER NOT NULL, user2_id INTEGER NOT NULL, UNIQUE (user1_id, user2_id))"
+                )
+                dbs[name] = db
+
+            # Same edges in both databases; the legacy layout keeps whichever
+            # direction the request happened to go in
+            started = time.perf_counter()
+            known_pairs = []
+            remaining = options['edges']
+            while remaining:
+                batch = []
+                for _ in range(min(BATCH_SIZE, remaining)):
+                    a = rng.randint(1, members)
+                    b = rng.randint(1, members - 1)
+                    b = b + 1 if b >= a else b
+                    batch.append((a, b))
+                remaining -= len(batch)
+                known_pairs.append(batch[0])
+                dbs['any order'].executemany(
+                    "INSERT OR IGNORE INTO api_friendship (user1_id, user2_id) VALUES (?, ?)", batch
+                )
+                dbs['canonical'].executemany(
+                    "INSERT OR IGNORE INTO api_friendship (user1_id, user2_id) VALUES (?, ?)",
+                    [(a, b) if a < b else (b, a) for a, b in batch],
+                )
+            self.stdout.write(f"Inserted {options['edges']} edges in {time.perf_counter() - started:.1f}s")
+
+            for name, db in dbs.items():
+                started = time.perf_counter()
+                for statement in LAYOUTS[name]['indexes']:
+                    db.execute(statement)
+                db.commit()
+                rows = db.execute("SELECT COUNT(*) FROM api_friendship").fetchone()[0]
+                pages = db.execute("PRAGMA page_count").fetchone()[0] * db.execute("PRAGMA page_size").fetchone()[0]
+                self.stdout.write(
+                    f"{name}: {rows} rows, indexed in {time.perf_counter() - started:.1f}s, "
+                    f"{pages / 1024 / 1024:.0f} MiB"
+                )
+
+            lookups = options['lookups']
+            probes = [rng.choice(known_pairs) for _ in range(lookups // 2)]
+            probes += [(rng.randint(1, members), rng.randint(1, members)) for _ in range(lookups - len(probes))]
+            rng.shuffle(probes)
+            friend_lists = [rng.randint(1, members) for _ in range(lookups)]
+
+            self.stdout.write(
+                f"{'layout':<12}{'are_friends us':>16}{'friend_ids us':>15}{'friends/member':>16}"
+            )
+            for name, db in dbs.items():
+                layout = LAYOUTS[name]
+                probe_us = self.time_lookups(
+                    db, layout['probe'], [self.probe_params(name, a, b) for a, b in probes]
+                )
+                friends_us = self.time_lookups(db, layout['friends'], [(m, m) for m in friend_lists])
+                found = sum(len(db.execute(layout['friends'], (m, m)).fetchall()) for m in friend_lists[:100])
+                self.stdout.write(f"{name:<12}{probe_us:>16.1f}{friends_us:>15.1f}{found / 100:>16.1f}")
+                db.close()
+
+    def probe_params(self, layout, a, b):
+        if layout == 'canonical':
+            return (a, b) if a < b else (b, a)
+        return (a, b, b, a)
+
+    def time_lookups(self, db, sql, params_list):
+        started = time.perf_counter()
+        for params in params_list:
+            db.execute(sql, params).fetchall()
+        return (time.perf_counter() - started) * 1_000_000 / len(params_list)
@@ -0,0 +1,100 @@
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.search import CREATE_FTS_SQL, FTS_TABLE, match_expression
+
+SYLLABLES = ['an', 'na', 'iv', 'ov', 'pet', 'ro', 'ser', 'gei', 'ma', 'ri', 'ya', 'ol', 'ga', 'dmi', 'try', 'ka', 'te', 'lena', 'mi', 'kh', 'al', 'ex', 'sa', 'sha']
+
+QUERIES = ['an', 'ivo', 'petro', 'serg', 'marika', 'dmitry', 'zzz']
+
+
+def synthetic_name(rng, parts):
+    return ''.join(rng.choice(SYLLABLES) for _ in range(parts)).capitalize()
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark LIKE scans against the FTS5 member index on a scratch "
+        "SQLite database with synthetic members"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--members', type=int, default=1_000_000)
+        parser.add_argument('--limit', type=int, default=20)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        limit = options['limit']
+
+        with tempfile.TemporaryDirectory() as directory:
+            db = sqlite3.connect(os.path.join(directory, 'bench.sqlite3'))
+            db.execute(
+                "CREATE TABLE api_member (id INTEGER PRIMARY KEY, username TEXT UNIQUE, "
+                "first_name TEXT, last_name TEXT)"
+            )
+
+            started = time.perf_counter()
+            batch = []
+            for member_id in range(1, options['members'] + 1):
+                first, last = synthetic_name(rng, 2), synthetic_name(rng, 3)
+                batch.append((member_id, f'{first.lower()}{member_id}', first, last))
+                if len(batch) == 10_000:
+                    db.executemany("INSERT INTO api_member VALUES (?, ?, ?, ?)", batch)
+                    batch = []
+            db.executemany("INSERT INTO api_member VALUES (?, ?, ?, ?)", batch)
+            db.commit()
+            self.stdout.write(f"Inserted {options['members']} members in {time.perf_counter() - started:.1f}s")
+
+            started = time.perf_counter()
+            for statement in CREATE_FTS_SQL:
+                db.execute(statement)
+            db.commit()
+            self.stdout.write(f"Built {FTS_TABLE} in {time.perf_counter() - started:.1f}s")
+
+            # The old view returned every match; a LIMITed LIKE is shown too,
+            # although it only stops early when matches are dense.
+            like_sql = (
+                "SELECT * FROM api_member WHERE username LIKE ? OR first_name LIKE ? "
+                "OR last_name LIKE ? ORDER BY id LIMIT ?"
+            )
+            fts_sql = (
+                f"SELECT api_member.* FROM {FTS_TABLE} JOIN api_member "
+                f"ON api_member.id = {FTS_TABLE}.rowid WHERE {FTS_TABLE} MATCH ? "
+                f"ORDER BY {FTS_TABLE}.rank, api_member.id LIMIT ?"
+            )
+
+            self.stdout.write(
+                f"{'query':<10}{'like all ms':>13}{'like rows':>11}{'like page ms':>14}{'fts page ms':>13}"
+            )
+            totals = [0.0, 0.0, 0.0]
+            for query in QUERIES:
+                pattern = f'%{query}%'
+                like_params = (pattern, pattern, pattern)
+                like_all_ms = self.time_query(db, like_sql, like_params + (-1,), options['repeat'])
+                like_rows = len(db.execute(like_sql, like_params + (-1,)).fetchall())
+                like_page_ms = self.time_query(db, like_sql, like_params + (limit,), options['repeat'])
+                fts_ms = self.time_query(db, fts_sql, (match_expression(query), limit), options['repeat'])
+                for index, value in enumerate((like_all_ms, like_page_ms, fts_ms)):
+                    totals[index] += value
+                self.stdout.write(
+                    f"{query:<10}{like_all_ms:>13.2f}{like_rows:>11}{like_page_ms:>14.2f}{fts_ms:>13.2f}"
+                )
+            means = [total / len(QUERIES) for total in totals]
+            self.stdout.write(f"{'mean':<10}{means[0]:>13.2f}{'':>11}{means[1]:>14.2f}{means[2]:>13.2f}")
+            db.close()
+
+    def time_query(self, db, sql, params, repeat):
+        best = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            db.execute(sql, params).fetchall()
+            elapsed = (time.perf_counter() - started) * 1000
+            best = elapsed if best is None else min(best, elapsed)
+        return best
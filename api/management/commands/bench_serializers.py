@@ -0,0 +1,62 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+
+from api.models import FriendRequest, Member, Message
+from api.row_serializers import friend_request_rows, member_rows, member_short_rows, message_rows
+from api.serializers import FriendRequestSerializer, MemberSerializer, MemberShortSerializer, MessageSerializer
+
+# (label, DRF serializer, row serializer, queryset)
+CASES = [
+    ('MemberSerializer', MemberSerializer, member_rows, Member.objects.all()),
+    ('MemberShortSerializer', MemberShortSerializer, member_short_rows, Member.objects.all()),
+    (
+        'MessageSerializer', MessageSerializer, message_rows,
+        Message.objects.select_related('sender', 'recipient').with_read_state({}),
+    ),
+    (
+        'FriendRequestSerializer', FriendRequestSerializer, friend_request_rows,
+        FriendRequest.objects.select_related('from_user', 'to_user'),
+    ),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Serialize the same rows with each DRF serializer and with its "
+        "values()-based row serializer (api/row_serializers.py), check the "
+        "rendered JSON is identical and report rows serialized per second"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=2000, help="Rows per serializer")
+        parser.add_argument('--repeat', type=int, default=5, help="Timed runs; the best one counts")
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"{'serializer':<26}{'rows':>7}{'DRF rows/s':>13}{'row rows/s':>13}{'speedup':>9}")
+        for label, serializer_class, rows, queryset in CASES:
+            queryset = queryset.order_by('id')[:options['rows']]
+            instances = list(queryset)
+            values = list(queryset.values(*rows.columns))
+            if not instances:
+                raise CommandError("No rows to serialize; seed the database first (manage.py seed_social_graph)")
+
+            renderer = JSONRenderer()
+            if renderer.render(rows.many(values)) != renderer.render(serializer_class(instances, many=True).data):
+                raise CommandError(f"{label}: row serializer output differs from DRF")
+
+            drf = self.best(lambda: serializer_class(instances, many=True).data, options['repeat'])
+            fast = self.best(lambda: rows.many(values), options['repeat'])
+            self.stdout.write(
+                f"{label:<26}{len(instances):>7}{len(instances) / drf:>13,.0f}"
+                f"{len(values) / fast:>13,.0f}{drf / fast:>8.1f}x"
+            )
+
+    def best(self, func, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - started)
+        return min(timings)
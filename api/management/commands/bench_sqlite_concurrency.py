@@ -0,0 +1,187 @@
+import multiprocessing
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api.sqlite import pragma_statements
+
+SCHEMA = [
+    "CREATE TABLE api_post (id INTEGER PRIMARY KEY, author_id INTEGER, content TEXT, "
+    "likes_count INTEGER NOT NULL DEFAULT 0, created_at TEXT)",
+    "CREATE TABLE api_like (id INTEGER PRIMARY KEY, post_id INTEGER, user_id INTEGER, UNIQUE (post_id, user_id))",
+    "CREATE TABLE api_message (id INTEGER PRIMARY KEY, sender_id INTEGER, recipient_id INTEGER, "
+    "content TEXT, created_at TEXT)",
+    "CREATE INDEX message_pair_idx ON api_message (sender_id, recipient_id, id)",
+]
+
+# Connection settings before (Django defaults) and after the tuned profile
+PROFILES = {
+    'default': {'pragmas': [], 'begin': 'BEGIN', 'timeout': 5.0},
+    'tuned': {
+        'pragmas': pragma_statements(),
+        'begin': f"BEGIN {settings.DATABASES['default']['OPTIONS']['transaction_mode']}",
+        'timeout': settings.DATABASES['default']['OPTIONS']['timeout'],
+    },
+}
+
+MEMBERS = 1000
+POSTS = 5000
+
+
+def connect(path, profile):
+    db = sqlite3.connect(path, timeout=profile['timeout'], isolation_level=None)
+    for statement in profile['pragmas']:
+        db.execute(statement)
+    return db
+
+
+def like_toggle(db, rng, begin):
+    """
+    The LikeToggleView transaction. Like Django's delete collector it reads
+    the rows before deleting them, so a deferred BEGIN must upgrade its lock.
+    """
+    post_id, user_id = rng.randint(1, POSTS), rng.randint(1, MEMBERS)
+    db.execute(begin)
+    try:
+        like_ids = db.execute(
+            "SELECT id FROM api_like WHERE post_id = ? AND user_id = ?", (post_id, user_id)
+        ).fetchall()
+        deleted = like_ids and db.execute("DELETE FROM api_like WHERE id = ?", like_ids[0]).rowcount
+        if not deleted:
+            db.execute("INSERT INTO api_like (post_id, user_id) VALUES (?, ?)", (post_id, user_id))
+        db.execute(
+            "UPDATE api_post SET likes_count = likes_count + ? WHERE id = ?", (-1 if deleted else 1, post_id)
+        )
+        db.execute("SELECT likes_count FROM api_post WHERE id = ?", (post_id,)).fetchone()
+        db.execute("COMMIT")
+    except sqlite3.OperationalError:
+        if db.in_transaction:
+            db.execute("ROLLBACK")
+        raise
+
+
+def send_message(db, rng, begin):
+    sender, recipient = rng.randint(1, MEMBERS), rng.randint(1, MEMBERS)
+    db.execute(begin)
+    try:
+        db.execute(
+            "INSERT INTO api_message (sender_id, recipient_id, content, created_at) "
+            "VALUES (?, ?, 'hello', datetime('now'))",
+            (sender, recipient),
+        )
+        db.execute("COMMIT")
+    except sqlite3.OperationalError:
+        if db.in_transaction:
+            db.execute("ROLLBACK")
+        raise
+
+
+def read_feed(db, rng):
+    author_ids = [rng.randint(1, MEMBERS) for _ in range(50)]
+    db.execute(
+        f"SELECT * FROM api_post WHERE author_id IN ({','.join('?' * len(author_ids))}) "
+        "ORDER BY created_at DESC, id DESC LIMIT 20",
+        author_ids,
+    ).fetchall()
+    db.execute(
+        "SELECT * FROM api_message WHERE sender_id = ? AND recipient_id = ? ORDER BY id DESC LIMIT 50",
+        (rng.randint(1, MEMBERS), rng.randint(1, MEMBERS)),
+    ).fetchall()
+
+
+def worker(path, profile_name, role, seed, deadline, results):
+    profile = PROFILES[profile_name]
+    rng = random.Random(seed)
+    db = connect(path, profile)
+    done = errors = 0
+    while time.time() < deadline:
+        try:
+            if role == 'writer':
+                if rng.random() < 0.5:
+                    like_toggle(db, rng, profile['begin'])
+                else:
+                    send_message(db, rng, profile['begin'])
+            else:
+                read_feed(db, rng)
+            done += 1
+        except sqlite3.OperationalError:
+            errors += 1
+    db.close()
+    results.put((role, done, errors))
+
+
+class Command(BaseCommand):
+    help = (
+        "Hammer a scratch SQLite database with concurrent like/message writers "
+        "and feed readers, once with Django's default connection settings and "
+        "once with the tuned profile, and report throughput and lock errors"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=8)
+        parser.add_argument('--readers', type=int, default=8)
+        parser.add_argument('--duration', type=float, default=10.0, help="Seconds per profile")
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f"{options['writers']} writers, {options['readers']} readers, {options['duration']:.0f}s per profile"
+        )
+        self.stdout.write(
+            f"{'profile':<10}{'writes/s':>10}{'write err':>11}{'reads/s':>10}{'read err':>10}"
+        )
+        with tempfile.TemporaryDirectory() as directory:
+            for profile_name in PROFILES:
+                path = os.path.join(directory, f'{profile_name}.sqlite3')
+                self.seed(path, options['seed'])
+                totals = self.run(path, profile_name, options)
+                writes, write_errors = totals['writer']
+                reads, read_errors = totals['reader']
+                self.stdout.write(
+                    f"{profile_name:<10}{writes / options['duration']:>10.0f}"
+                    f"{self.rate(write_errors, writes):>11.1%}"
+                    f"{reads / options['duration']:>10.0f}{self.rate(read_errors, reads):>10.1%}"
+                )
+
+    def seed(self, path, seed):
+        rng = random.Random(seed)
+        db = sqlite3.connect(path, isolation_level=None)
+        for statement in SCHEMA:
+            db.execute(statement)
+        db.execute("BEGIN")
+        db.executemany(
+            "INSERT INTO api_post (id, author_id, content, created_at) VALUES (?, ?, 'post', datetime('now', ?))",
+            [(post_id, rng.randint(1, MEMBERS), f'-{post_id} minutes') for post_id in range(1, POSTS + 1)],
+        )
+        db.execute("COMMIT")
+        db.close()
+
+    def run(self, path, profile_name, options):
+        results = multiprocessing.Queue()
+        deadline = time.time() + options['duration']
+        roles = ['writer'] * options['writers'] + ['reader'] * options['readers']
+        processes = [
+            multiprocessing.Process(
+                target=worker, args=(path, profile_name, role, options['seed'] + index, deadline, results)
+            )
+            for index, role in enumerate(roles)
+        ]
+        for process in processes:
+            process.start()
+        totals = {'writer': [0, 0], 'reader': [0, 0]}
+        for _ in processes:
+            role, done, errors = results.get()
+            totals[role][0] += done
+            totals[role][1] += errors
+        for process in processes:
+            process.join()
+        return totals
+
+    def rate(self, errors, done):
+        attempts = errors + done
+        return errors / attempts if attempts else 0.0
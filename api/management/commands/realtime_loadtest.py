@@ -0,0 +1,94 @@
+import asyncio
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api import realtime
+from api.models import Member
+
+
+class FakeSocket:
+    """In-memory ASGI WebSocket peer: feeds events in and records frames out"""
+
+    def __init__(self, member_id):
+        self.member_id = member_id
+        self.incoming = asyncio.Queue()
+        self.accepted = asyncio.Event()
+        self.frames = []
+
+    async def receive(self):
+        return await self.incoming.get()
+
+    async def send(self, event):
+        if event['type'] == 'websocket.accept':
+            self.accepted.set()
+        elif event['type'] == 'websocket.send':
+            self.frames.append((time.perf_counter(), event['text']))
+        elif event['type'] == 'websocket.close':
+            raise CommandError(f"Socket for member {self.member_id} closed with {event.get('code')}")
+
+
+class Command(BaseCommand):
+    help = (
+        "Hold N idle WebSocket clients open against the ASGI app, verify that "
+        "no frames flow while idle and measure push latency"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=1000)
+        parser.add_argument('--idle', type=float, default=5.0, help="Idle period in seconds")
+
+    def handle(self, *args, **options):
+        member_ids = list(Member.objects.order_by('id').values_list('id', flat=True)[:options['clients']])
+        if not member_ids:
+            raise CommandError("No members to connect as; seed the database first")
+        asyncio.run(self.run(member_ids, options['clients'], options['idle']))
+
+    async def run(self, member_ids, client_count, idle):
+        from config.asgi import application
+
+        tracemalloc.start()
+        baseline, _ = tracemalloc.get_traced_memory()
+
+        sockets = [FakeSocket(member_ids[i % len(member_ids)]) for i in range(client_count)]
+        scope_base = {'type': 'websocket', 'path': realtime.WEBSOCKET_PATH}
+        tasks = []
+        started = time.perf_counter()
+        for sock in sockets:
+            scope = dict(scope_base, headers=[(b'cookie', f'session_id={sock.member_id}'.encode())])
+            tasks.append(asyncio.create_task(application(scope, sock.receive, sock.send)))
+            sock.incoming.put_nowait({'type': 'websocket.connect'})
+        await asyncio.gather(*(sock.accepted.wait() for sock in sockets))
+        connect_time = time.perf_counter() - started
+
+        connected, _ = tracemalloc.get_traced_memory()
+        self.stdout.write(f"Connected {client_count} clients in {connect_time:.2f}s")
+        self.stdout.write(f"Memory per idle connection: {(connected - baseline) / client_count / 1024:.1f} KiB")
+        self.stdout.write(f"Broker subscriptions: {realtime.get_broker().subscriber_count()}")
+
+        await asyncio.sleep(idle)
+        idle_frames = sum(len(sock.frames) for sock in sockets)
+        idle_reads = sum(sock.incoming.qsize() for sock in sockets)
+        self.stdout.write(f"Frames sent during {idle:.1f}s idle: {idle_frames} out, {idle_reads} in")
+
+        # Push one event to every member and time delivery to all their sockets
+        started = time.perf_counter()
+        for member_id in set(sock.member_id for sock in sockets):
+            realtime.publish(member_id, 'loadtest', {'member_id': member_id})
+        while any(not sock.frames for sock in sockets):
+            await asyncio.sleep(0.001)
+        latencies = sorted(sock.frames[0][0] - started for sock in sockets)
+        self.stdout.write(
+            f"Push delivered to {client_count} sockets: "
+            f"p50 {latencies[len(latencies) // 2] * 1000:.1f}ms, "
+            f"max {latencies[-1] * 1000:.1f}ms"
+        )
+
+        for sock in sockets:
+            sock.incoming.put_nowait({'type': 'websocket.disconnect', 'code': 1000})
+        await asyncio.gather(*tasks)
+        tracemalloc.stop()
+        self.stdout.write(self.style.SUCCESS(
+            f"Disconnected; broker subscriptions left: {realtime.get_broker().subscriber_count()}"
+        ))
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api import timeline
+from api.models import Member, TimelineEntry
+
+
+class Command(BaseCommand):
+    help = "Rebuild materialized news-feed timelines from Friendship and Post"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--member', type=int, action='append', dest='members',
+            help="Rebuild only this member's timeline (repeatable)",
+        )
+
+    def handle(self, *args, **options):
+        member_ids = options['members']
+        if member_ids is None:
+            TimelineEntry.objects.all().delete()
+            member_ids = list(Member.objects.order_by('id').values_list('id', flat=True))
+
+        entries = 0
+        for member_id in member_ids:
+            with transaction.atomic():
+                entries += timeline.rebuild_member(member_id)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt {len(member_ids)} timelines with {entries} entries"
+        ))
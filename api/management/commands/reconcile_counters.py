@@ -0,0 +1,102 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+
+from api import member_counters
+from api.models import Comment, Like, Member, MemberCounters, Post
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute Post.likes_count, Post.comments_count and the MemberCounters "
+        "badge counts and repair drift"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help="Report drifted posts without writing",
+        )
+
+    def handle(self, *args, **options):
+        self.reconcile_posts(options)
+        self.reconcile_members(options)
+
+    def reconcile_posts(self, options):
+        chunk_size = options['chunk_size']
+        dry_run = options['dry_run']
+        checked = repaired = 0
+        last_id = 0
+
+        while True:
+            posts = list(
+                Post.objects.filter(id__gt=last_id)
+                .order_by('id')
+                .only('id', 'likes_count', 'comments_count')[:chunk_size]
+            )
+            if not posts:
+                break
+            last_id = posts[-1].id
+            ids = [post.id for post in posts]
+
+            likes = dict(
+                Like.objects.filter(post_id__in=ids).values('post_id')
+                .annotate(n=Count('id')).values_list('post_id', 'n')
+            )
+            comments = dict(
+                Comment.objects.filter(post_id__in=ids).values('post_id')
+                .annotate(n=Count('id')).values_list('post_id', 'n')
+            )
+
+            drifted = []
+            for post in posts:
+                actual = (likes.get(post.id, 0), comments.get(post.id, 0))
+                if (post.likes_count, post.comments_count) != actual:
+                    post.likes_count, post.comments_count = actual
+                    drifted.append(post)
+
+            if drifted and not dry_run:
+                with transaction.atomic():
+                    Post.objects.bulk_update(drifted, ['likes_count', 'comments_count'])
+
+            checked += len(posts)
+            repaired += len(drifted)
+
+        verb = "Found" if dry_run else "Repaired"
+        self.stdout.write(self.style.SUCCESS(
+            f"Checked {checked} posts. {verb} {repaired} with drifted counters"
+        ))
+
+    def reconcile_members(self, options):
+        chunk_size = options['chunk_size']
+        dry_run = options['dry_run']
+        checked = repaired = 0
+        last_id = 0
+
+        while True:
+            ids = list(Member.objects.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:chunk_size])
+            if not ids:
+                break
+            last_id = ids[-1]
+
+            stored = MemberCounters.objects.in_bulk(ids)
+            drifted = []
+            for member_id, counters in member_counters.actual(ids).items():
+                current = stored.get(member_id, MemberCounters(member_id=member_id))
+                if any(getattr(counters, field) != getattr(current, field) for field in member_counters.FIELDS):
+                    drifted.append(counters)
+
+            if drifted and not dry_run:
+                with transaction.atomic():
+                    MemberCounters.objects.bulk_create(
+                        drifted, update_conflicts=True, unique_fields=['member'], update_fields=member_counters.FIELDS,
+                    )
+
+            checked += len(ids)
+            repaired += len(drifted)
+
+        verb = "Found" if dry_run else "Repaired"
+        self.stdout.write(self.style.SUCCESS(
+            f"Checked {checked} members. {verb} {repaired} with drifted badge counters"
+        ))
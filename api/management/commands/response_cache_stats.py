@@ -0,0 +1,16 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api import response_cache
+
+
+class Command(BaseCommand):
+    help = "Show response-cache hits, misses and hit ratio per endpoint, summed over all workers"
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"Backend: {settings.RESPONSE_CACHE}")
+        self.stdout.write(f"{'endpoint':<16}{'hits':>10}{'misses':>10}{'hit rate':>10}")
+        for endpoint, counts in response_cache.stats().items():
+            self.stdout.write(
+                f"{endpoint:<16}{counts['hits']:>10}{counts['misses']:>10}{counts['hit_rate']:>10.1%}"
+            )
@@ -0,0 +1,265 @@
+import random
+import time
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from api import member_counters, timeline, versions
+from api.models import (
+    Comment, Conversation, FriendRequest, Friendship, Like, Member, MemberCounters, Message, Post, TimelineEntry,
+)
+
+FIRST_NAMES = [
+    'Anna', 'Ivan', 'Maria', 'Sergei', 'Olga', 'Dmitry', 'Elena', 'Alexei', 'Natalia', 'Pavel',
+    'Irina', 'Mikhail', 'Yulia', 'Andrei', 'Tatiana', 'Nikolai', 'Svetlana', 'Roman', 'Daria', 'Artem',
+]
+LAST_NAMES = [
+    'Ivanov', 'Petrova', 'Smirnov', 'Kuznetsova', 'Popov', 'Volkova', 'Sokolov', 'Lebedeva',
+    'Kozlov', 'Novikova', 'Morozov', 'Orlova', 'Pavlov', 'Semenova', 'Golubev', 'Vinogradova',
+]
+WORDS = (
+    'today weekend coffee photo trip city friends music book movie work project idea morning '
+    'evening sea mountains dinner birthday concert run park rain snow summer news game team'
+).split()
+
+PASSWORD = 'password'
+
+
+def heavy_tailed(rng, mean, cap):
+    """Pareto(alpha=2) draw scaled to `mean`: most values small, a few large"""
+    # Random rounding keeps the mean of the integer draws at `mean`
+    return min(cap, int(mean * rng.paretovariate(2) / 2 + rng.random()))
+
+
+def sentence(rng, words):
+    return ' '.join(rng.choice(WORDS) for _ in range(words)).capitalize() + '.'
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a synthetic social network for load testing: members, a "
+        "power-law friend graph (preferential attachment), posts with likes "
+        "and comments, pending friend requests and message threads. Every "
+        "member's password is 'password'"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--members', type=int, default=2000)
+        parser.add_argument('--friends', type=int, default=10, help="Friendships each new member makes")
+        parser.add_argument('--posts', type=float, default=5, help="Mean posts per member")
+        parser.add_argument('--likes', type=float, default=6, help="Mean likes per post")
+        parser.add_argument('--comments', type=float, default=2, help="Mean comments per post")
+        parser.add_argument('--requests', type=float, default=1, help="Mean pending friend requests per member")
+        parser.add_argument('--threads', type=float, default=3, help="Mean message threads per member")
+        parser.add_argument('--messages', type=float, default=12, help="Mean messages per thread")
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--clear', action='store_true', help="Delete all existing members and their data first")
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        if options['members'] <= options['friends']:
+            raise CommandError("--members must be larger than --friends")
+
+        if options['clear']:
+            self.clear()
+        elif Member.objects.exists():
+            raise CommandError("The database already has members; pass --clear to replace them")
+
+        started = time.perf_counter()
+        member_ids = self.step("members", self.create_members, options['members'])
+        friends = self.step("friendships", self.create_friendships, member_ids, options['friends'])
+        post_ids = self.step(
+            "posts, likes and comments", self.create_posts,
+            member_ids, friends, options['posts'], options['likes'], options['comments'],
+        )
+        self.step("friend requests", self.create_friend_requests, member_ids, friends, options['requests'])
+        self.step("message threads", self.create_threads, member_ids, friends, options['threads'], options['messages'])
+        self.step("badge counters", self.create_member_counters, member_ids)
+        if timeline.is_enabled():
+            self.step("timelines", self.rebuild_timelines, member_ids)
+
+        # Rows were written without signals; move every tag on
+        for space in (versions.FRIENDS, versions.MEMBER, versions.POSTS, versions.INBOX):
+            versions.bump(space, *member_ids)
+        versions.bump(versions.POST, *post_ids)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {len(member_ids)} members in {time.perf_counter() - started:.1f}s; "
+            f"log in as any of them with password '{PASSWORD}'"
+        ))
+
+    def step(self, label, func, *args):
+        started = time.perf_counter()
+        with transaction.atomic():
+            result = func(*args)
+        self.stdout.write(f"  {label}: {time.perf_counter() - started:.1f}s")
+        return result
+
+    def clear(self):
+        for model in (TimelineEntry, MemberCounters, Conversation, Message, FriendRequest, Friendship, Like, Comment, Post, Member):
+            model.objects.all().delete()
+
+    def create_members(self, count):
+        # Hashing is deliberately slow; one hash serves every member
+        password = make_password(PASSWORD)
+        members = []
+        for index in range(count):
+            first, last = self.rng.choice(FIRST_NAMES), self.rng.choice(LAST_NAMES)
+            members.append(Member(
+                username=f'{first.lower()}.{last.lower()}{index}',
+                email=f'{first.lower()}.{last.lower()}{index}@example.com',
+                password=password,
+                first_name=first,
+                last_name=last,
+                bio=sentence(self.rng, 8) if self.rng.random() < 0.5 else None,
+            ))
+        return [member.id for member in Member.objects.bulk_create(members, batch_size=self.batch_size)]
+
+    def create_friendships(self, member_ids, per_member):
+        """
+        Barabasi-Albert preferential attachment: each new member befriends
+        `per_member` existing ones chosen in proportion to their degree, which
+        gives a power-law degree distribution with a few very popular members.
+        """
+        friends = {member_id: set() for member_id in member_ids}
+        # Every endpoint of every edge, so a uniform pick is degree-weighted
+        endpoints = list(member_ids[:per_member])
+        rows = []
+        for member_id in member_ids[per_member:]:
+            chosen = set()
+            while len(chosen) < per_member:
+                chosen.add(self.rng.choice(endpoints))
+            for other_id in chosen:
+                friends[member_id].add(other_id)
+                friends[other_id].add(member_id)
+                user1_id, user2_id = Friendship.ordered_pair(member_id, other_id)
+                rows.append(Friendship(user1_id=user1_id, user2_id=user2_id))
+                endpoints += [member_id, other_id]
+        Friendship.objects.bulk_create(rows, batch_size=self.batch_size)
+        return friends
+
+    def create_posts(self, member_ids, friends, mean_posts, mean_likes, mean_comments):
+        authors = []
+        for member_id in member_ids:
+            authors += [member_id] * heavy_tailed(self.rng, mean_posts, 50 * max(1, int(mean_posts)))
+        # Interleave authors so feeds mix friends' posts over time
+        self.rng.shuffle(authors)
+
+        post_ids = []
+        for start in range(0, len(authors), self.batch_size):
+            plans = []
+            for author_id in authors[start:start + self.batch_size]:
+                # Mostly friends react; a few strangers do too
+                audience = list(friends[author_id])
+                audience += self.rng.sample(member_ids, min(len(member_ids), 5))
+                audience = [member_id for member_id in set(audience) if member_id != author_id]
+                likers = self.rng.sample(audience, min(len(audience), heavy_tailed(self.rng, mean_likes, 500)))
+                commenters = [
+                    self.rng.choice(audience) for _ in range(heavy_tailed(self.rng, mean_comments, 100))
+                ] if audience else []
+                plans.append((author_id, likers, commenters))
+
+            posts = Post.objects.bulk_create([
+                Post(
+                    author_id=author_id,
+                    content=sentence(self.rng, self.rng.randint(4, 30)),
+                    likes_count=len(likers),
+                    comments_count=len(commenters),
+                )
+                for author_id, likers, commenters in plans
+            ])
+            Like.objects.bulk_create([
+                Like(post_id=post.id, user_id=user_id)
+                for post, (_, likers, _) in zip(posts, plans)
+                for user_id in likers
+            ], batch_size=self.batch_size)
+            Comment.objects.bulk_create([
+                Comment(post_id=post.id, author_id=author_id, content=sentence(self.rng, self.rng.randint(2, 12)))
+                for post, (_, _, commenters) in zip(posts, plans)
+                for author_id in commenters
+            ], batch_size=self.batch_size)
+            post_ids += [post.id for post in posts]
+        return post_ids
+
+    def create_friend_requests(self, member_ids, friends, mean_requests):
+        pairs = set()
+        rows = []
+        for to_user_id in member_ids:
+            for _ in range(heavy_tailed(self.rng, mean_requests, 50)):
+                from_user_id = self.rng.choice(member_ids)
+                pair = Friendship.ordered_pair(from_user_id, to_user_id)
+                if from_user_id == to_user_id or from_user_id in friends[to_user_id] or pair in pairs:
+                    continue
+                pairs.add(pair)
+                rows.append(FriendRequest(from_user_id=from_user_id, to_user_id=to_user_id, status='pending'))
+        FriendRequest.objects.bulk_create(rows, batch_size=self.batch_size)
+
+    def create_threads(self, member_ids, friends, mean_threads, mean_messages):
+        pairs = set()
+        for member_id in member_ids:
+            for _ in range(heavy_tailed(self.rng, mean_threads / 2, 100)):
+                # Most people write to their friends
+                if friends[member_id] and self.rng.random() < 0.8:
+                    other_id = self.rng.choice(tuple(friends[member_id]))
+                else:
+                    other_id = self.rng.choice(member_ids)
+                if other_id != member_id:
+                    pairs.add(Conversation.ordered_pair(member_id, other_id))
+        pairs = sorted(pairs)
+        self.rng.shuffle(pairs)
+
+        # A thread holds many messages; take fewer of them per batch
+        threads_per_batch = max(1, self.batch_size // 10)
+        for start in range(0, len(pairs), threads_per_batch):
+            threads = []
+            for user1_id, user2_id in pairs[start:start + threads_per_batch]:
+                count = max(1, heavy_tailed(self.rng, mean_messages, 1000))
+                unread = min(count, self.rng.choice((0, 0, 1, 2, 3)))
+                senders = [self.rng.choice((user1_id, user2_id)) for _ in range(count)]
+                if unread:
+                    # The last few messages come from one side, not yet read by the other
+                    senders[count - unread:] = [senders[-1]] * unread
+                threads.append((user1_id, user2_id, senders, unread))
+
+            messages = Message.objects.bulk_create([
+                Message(
+                    sender_id=sender_id,
+                    recipient_id=user2_id if sender_id == user1_id else user1_id,
+                    content=sentence(self.rng, self.rng.randint(1, 15)),
+                )
+                for user1_id, user2_id, senders, unread in threads
+                for index, sender_id in enumerate(senders)
+            ], batch_size=self.batch_size)
+
+            conversations = []
+            offset = 0
+            for user1_id, user2_id, senders, unread in threads:
+                last = messages[offset + len(senders) - 1]
+                # The last message the recipient of the unread tail has read
+                read = messages[offset + len(senders) - unread - 1] if len(senders) > unread else None
+                offset += len(senders)
+                unread_field = Conversation.unread_field(last.recipient_id, last.sender_id)
+                conversations.append(Conversation(
+                    user1_id=user1_id,
+                    user2_id=user2_id,
+                    last_message=last,
+                    last_message_at=last.created_at,
+                    **{unread_field: unread},
+                    **{Conversation.last_read_field(last.sender_id, last.recipient_id): last.id},
+                    **{Conversation.last_read_field(last.recipient_id, last.sender_id): read.id if read else 0},
+                ))
+            Conversation.objects.bulk_create(conversations, batch_size=self.batch_size)
+
+    def create_member_counters(self, member_ids):
+        for start in range(0, len(member_ids), self.batch_size):
+            counters = member_counters.actual(member_ids[start:start + self.batch_size]).values()
+            MemberCounters.objects.bulk_create([
+                row for row in counters if any(getattr(row, field) for field in member_counters.FIELDS)
+            ])
+
+    def rebuild_timelines(self, member_ids):
+        for member_id in member_ids:
+            timeline.rebuild_member(member_id)
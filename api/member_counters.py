@@ -0,0 +1,51 @@
+"""
+Maintenance of MemberCounters rows, the badge counts behind
+/api/me/counters/.
+
+The writers run inside the caller's transaction, next to the row change
+they count: a message and its recipient's unread count (api.conversations),
+a friend request and its recipient's pending count (the friend request
+views). Rows removed by cascades (a deleted member's messages and requests)
+are not counted down; `manage.py reconcile_counters` repairs that drift.
+"""
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import Greatest
+
+from api.models import Conversation, FriendRequest, MemberCounters
+
+UNREAD_MESSAGES = 'unread_messages'
+PENDING_FRIEND_REQUESTS = 'pending_friend_requests'
+FIELDS = (UNREAD_MESSAGES, PENDING_FRIEND_REQUESTS)
+
+
+def add(member_id, field, delta):
+    """Move `member_id`'s `field` by `delta`, never below zero"""
+    if not delta:
+        return
+    value = F(field) + delta if delta > 0 else Greatest(F(field) + delta, 0)
+    updated = MemberCounters.objects.filter(member_id=member_id).update(**{field: value})
+    if not updated and delta > 0:
+        MemberCounters.objects.create(member_id=member_id, **{field: delta})
+
+
+async def aget(member_id):
+    """The member's counts as a dict of FIELDS, in one primary-key read"""
+    row = await MemberCounters.objects.filter(member_id=member_id).values(*FIELDS).afirst()
+    return row or dict.fromkeys(FIELDS, 0)
+
+
+def actual(member_ids):
+    """{member_id: MemberCounters} recomputed from conversations and friend requests"""
+    counters = {member_id: MemberCounters(member_id=member_id) for member_id in member_ids}
+    for side in ('user1', 'user2'):
+        unread = Conversation.objects.filter(**{f'{side}_id__in': member_ids}).values(f'{side}_id').annotate(
+            total=Sum(f'{side}_unread_count'),
+        ).values_list(f'{side}_id', 'total')
+        for member_id, total in unread:
+            counters[member_id].unread_messages += total
+    pending = FriendRequest.objects.filter(to_user_id__in=member_ids).values('to_user_id').annotate(
+        total=Count('id', filter=Q(status='pending')),
+    ).values_list('to_user_id', 'total')
+    for member_id, total in pending:
+        counters[member_id].pending_friend_requests = total
+    return counters
@@ -0,0 +1,282 @@
+"""
+Request metrics summed over every worker process on the host.
+
+Each process writes its own shard: an array of 64-bit counters in
+settings.METRICS_DIR, named after its pid and memory-mapped. A shard has a
+single writer, so recording a request is three unlocked increments in the
+mapping: no flock (unlike api.shared_counters, whose counters all workers
+bump) and no database write. The exporter sums every shard. Shards left by
+processes that have exited (max_requests recycling, restarts) are folded
+into a `retired` shard under an flock and deleted, so totals never go
+backwards and the directory does not grow.
+
+For every route name in api/urls.py and every HTTP method there are
+request counters per status class and a latency histogram with fixed
+buckets. Requests that match no API route count as route="other". Shard
+names include a digest of this layout, so after a deploy that changes the
+routes the old shards are ignored rather than misread.
+"""
+import fcntl
+import hashlib
+import mmap
+import os
+from array import array
+from bisect import bisect_left
+from itertools import product
+from pathlib import Path
+from time import perf_counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import HttpResponse
+
+from api import friend_graph, response_cache
+from api.authentication import stats as member_cache_stats
+
+METHODS = ('GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS', 'OTHER')
+STATUS_CLASSES = ('1xx', '2xx', '3xx', '4xx', '5xx')
+# Upper bounds in seconds; one more bucket counts everything slower
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Per (route, method): status classes, histogram buckets, duration sum in microseconds
+_BUCKETS_AT = len(STATUS_CLASSES)
+_SUM_AT = _BUCKETS_AT + len(BUCKETS) + 1
+_SERIES_SLOTS = _SUM_AT + 1
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+_layout = None
+_shard = {'key': None, 'counts': None}
+
+
+class Layout:
+    def __init__(self, routes):
+        self.routes = routes
+        self.series = {
+            series: index * _SERIES_SLOTS for index, series in enumerate(product(routes, METHODS))
+        }
+        self.slots = len(self.series) * _SERIES_SLOTS
+        description = repr((routes, METHODS, STATUS_CLASSES, BUCKETS)).encode()
+        self.digest = hashlib.blake2b(description, digest_size=4).hexdigest()
+
+
+def layout():
+    global _layout
+    if _layout is None:
+        # Imported here: api.urls imports the views, which are not ready
+        # when the middleware module is loaded
+        from api import urls
+        _layout = Layout(tuple(pattern.name for pattern in urls.urlpatterns) + ('other',))
+    return _layout
+
+
+def _directory():
+    return Path(settings.METRICS_DIR)
+
+
+def _counts():
+    """This process's shard as a memoryview of unsigned 64-bit counters"""
+    key = (os.getpid(), settings.METRICS_DIR)
+    if _shard['key'] != key:
+        current = layout()
+        directory = _directory()
+        directory.mkdir(parents=True, exist_ok=True)
+        size = current.slots * 8
+        fd = os.open(directory / f'{os.getpid()}-{current.digest}.metrics', os.O_RDWR | os.O_CREAT, 0o660)
+        try:
+            if os.fstat(fd).st_size < size:
+                os.ftruncate(fd, size)
+            mapping = mmap.mmap(fd, size)
+        finally:
+            os.close(fd)
+        _shard['counts'] = memoryview(mapping).cast('Q')
+        _shard['key'] = key
+    return _shard['counts']
+
+
+def observe(route, method, status_code, seconds):
+    current = layout()
+    if method not in METHODS:
+        method = 'OTHER'
+    base = current.series.get((route, method))
+    if base is None:
+        base = current.series[('other', method)]
+
+    counts = _counts()
+    counts[base + min(max(status_code // 100, 1), 5) - 1] += 1
+    counts[base + _BUCKETS_AT + bisect_left(BUCKETS, seconds)] += 1
+    counts[base + _SUM_AT] += int(seconds * 1_000_000)
+
+
+def _read(path, slots):
+    counts = array('Q', bytes(slots * 8))
+    with open(path, 'rb') as file:
+        data = file.read(slots * 8)
+    counts[:len(data) // 8] = array('Q', data[:len(data) // 8 * 8])
+    return counts
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def totals():
+    """Counters summed over the live shards and the retired one"""
+    current = layout()
+    directory = _directory()
+    directory.mkdir(parents=True, exist_ok=True)
+    retired_path = directory / f'retired-{current.digest}.metrics'
+    fd = os.open(retired_path, os.O_RDWR | os.O_CREAT, 0o660)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        retired = _read(retired_path, current.slots)
+        merged = False
+        live = []
+        for path in directory.glob(f'*-{current.digest}.metrics'):
+            pid = path.name.split('-', 1)[0]
+            if not pid.isdigit():
+                continue
+            try:
+                counts = _read(path, current.slots)
+            except FileNotFoundError:
+                continue
+            if int(pid) == os.getpid() or _alive(int(pid)):
+                live.append(counts)
+                continue
+            for index, value in enumerate(counts):
+                retired[index] += value
+            path.unlink()
+            merged = True
+        if merged:
+            os.pwrite(fd, retired.tobytes(), 0)
+    finally:
+        os.close(fd)
+
+    for counts in live:
+        for index, value in enumerate(counts):
+            retired[index] += value
+    return retired
+
+
+def _labels(**labels):
+    return '{' + ','.join(f'{name}="{value}"' for name, value in labels.items()) + '}'
+
+
+def render():
+    """All metrics in the Prometheus text exposition format"""
+    current = layout()
+    counts = totals()
+    requests = [
+        '# HELP api_requests_total HTTP requests by route name, method and status class.',
+        '# TYPE api_requests_total counter',
+    ]
+    durations = [
+        '# HELP api_request_duration_seconds Time from the first middleware to the response.',
+        '# TYPE api_request_duration_seconds histogram',
+    ]
+    for (route, method), base in current.series.items():
+        total = sum(counts[base:base + _BUCKETS_AT])
+        if not total:
+            continue
+        for index, status_class in enumerate(STATUS_CLASSES):
+            if counts[base + index]:
+                labels = _labels(route=route, method=method, status=status_class)
+                requests.append(f'api_requests_total{labels} {counts[base + index]}')
+        cumulative = 0
+        for index, bound in enumerate(BUCKETS):
+            cumulative += counts[base + _BUCKETS_AT + index]
+            labels = _labels(route=route, method=method, le=bound)
+            durations.append(f'api_request_duration_seconds_bucket{labels} {cumulative}')
+        labels = _labels(route=route, method=method)
+        durations += [
+            f'api_request_duration_seconds_bucket{_labels(route=route, method=method, le="+Inf")} {total}',
+            f'api_request_duration_seconds_sum{labels} {counts[base + _SUM_AT] / 1_000_000}',
+            f'api_request_duration_seconds_count{labels} {total}',
+        ]
+
+    lookups = [
+        '# HELP api_response_cache_lookups_total Response cache lookups by endpoint and result.',
+        '# TYPE api_response_cache_lookups_total counter',
+    ]
+    for endpoint, stats in response_cache.stats().items():
+        lookups += [
+            f'api_response_cache_lookups_total{_labels(endpoint=endpoint, result="hit")} {stats["hits"]}',
+            f'api_response_cache_lookups_total{_labels(endpoint=endpoint, result="miss")} {stats["misses"]}',
+        ]
+    return '\n'.join(requests + durations + lookups + _worker_caches()) + '\n'
+
+
+def _worker_caches():
+    """
+    Gauges for the per-worker caches of the process serving the scrape,
+    labelled with its pid; unlike the request counters they are not summed
+    over workers, since each worker holds its own cache.
+    """
+    worker = os.getpid()
+    lines = []
+    for name, description, stats in [
+        ('member_cache', 'Authenticated member cache (api/authentication.py)', member_cache_stats()),
+        ('friend_graph_cache', 'Friend-graph cache (api/friend_graph.py)', friend_graph.stats()),
+    ]:
+        lines += [
+            f'# HELP api_{name}_lookups {description} lookups by result in this worker.',
+            f'# TYPE api_{name}_lookups gauge',
+        ]
+        for result in ('hits', 'misses', 'stale'):
+            lines.append(f'api_{name}_lookups{_labels(worker=worker, result=result)} {stats[result]}')
+        for field in ('entries', 'evictions', 'hit_rate', 'cached_ids', 'memory_bytes'):
+            if field in stats:
+                lines += [
+                    f'# HELP api_{name}_{field} {description}: {field.replace("_", " ")} in this worker.',
+                    f'# TYPE api_{name}_{field} gauge',
+                    f'api_{name}_{field}{_labels(worker=worker)} {stats[field]}',
+                ]
+    return lines
+
+
+def metrics_view(request):
+    """
+    GET /metrics
+
+    Not under /api/: nginx only proxies /api/ and /admin/, so this is
+    reachable on the gunicorn port from inside the host, not from outside.
+    """
+    return HttpResponse(render(), content_type=CONTENT_TYPE)
+
+
+class MetricsMiddleware:
+    """Count and time every request; put first in MIDDLEWARE"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        started = perf_counter()
+        response = self.get_response(request)
+        self.record(request, response, perf_counter() - started)
+        return response
+
+    async def __acall__(self, request):
+        started = perf_counter()
+        response = await self.get_response(request)
+        self.record(request, response, perf_counter() - started)
+        return response
+
+    def record(self, request, response, seconds):
+        match = getattr(request, 'resolver_match', None)
+        # Only API routes: admin url names overlap with ours ("login")
+        route = match.url_name if match and match.route.startswith('api/') else 'other'
+        observe(route, request.method, response.status_code, seconds)
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.7 on 2026-10-17 18:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_post_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Conversation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_message_at', models.DateTimeField()),
+                ('user1_unread_count', models.PositiveIntegerField(default=0)),
+                ('user2_unread_count', models.PositiveIntegerField(default=0)),
+                ('last_message', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='api.message')),
+                ('user1', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='conversations_as_user1', to='api.member')),
+                ('user2', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='conversations_as_user2', to='api.member')),
+            ],
+            options={
+                'db_table': 'api_conversation',
+                'indexes': [models.Index(fields=['user1', '-last_message_at', '-id'], name='conversation_user1_recent_idx'), models.Index(fields=['user2', '-last_message_at', '-id'], name='conversation_user2_recent_idx')],
+                'constraints': [models.CheckConstraint(condition=models.Q(('user1__lt', models.F('user2'))), name='conversation_ordered_pair')],
+                'unique_together': {('user1', 'user2')},
+            },
+        ),
+    ]
@@ -0,0 +1,39 @@
+from django.db import migrations
+
+BATCH_SIZE = 1000
+
+
+def build_conversations(apps, schema_editor):
+    Message = apps.get_model('api', 'Message')
+    Conversation = apps.get_model('api', 'Conversation')
+
+    threads = {}
+    messages = Message.objects.order_by('id').values_list(
+        'id', 'sender_id', 'recipient_id', 'created_at', 'is_read'
+    )
+    for message_id, sender_id, recipient_id, created_at, is_read in messages.iterator(chunk_size=BATCH_SIZE):
+        if sender_id == recipient_id:
+            continue
+        pair = (sender_id, recipient_id) if sender_id < recipient_id else (recipient_id, sender_id)
+        thread = threads.setdefault(pair, Conversation(user1_id=pair[0], user2_id=pair[1]))
+        if thread.last_message_at is None or (created_at, message_id) >= (thread.last_message_at, thread.last_message_id):
+            thread.last_message_id = message_id
+            thread.last_message_at = created_at
+        if not is_read:
+            if recipient_id == pair[0]:
+                thread.user1_unread_count += 1
+            else:
+                thread.user2_unread_count += 1
+
+    Conversation.objects.bulk_create(threads.values(), batch_size=BATCH_SIZE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_conversation'),
+    ]
+
+    operations = [
+        migrations.RunPython(build_conversations, migrations.RunPython.noop),
+    ]
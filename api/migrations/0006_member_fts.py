@@ -0,0 +1,73 @@
+from django.db import migrations
+from django.db.utils import OperationalError
+
+# Frozen copies: later changes to api.search must not alter this migration
+CREATE_FTS_SQL = [
+    """
+    CREATE VIRTUAL TABLE api_member_fts USING fts5(
+        username, first_name, last_name,
+        content='api_member', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER api_member_fts_ai AFTER INSERT ON api_member BEGIN
+        INSERT INTO api_member_fts(rowid, username, first_name, last_name)
+        VALUES (new.id, new.username, new.first_name, new.last_name);
+    END
+    """,
+    """
+    CREATE TRIGGER api_member_fts_ad AFTER DELETE ON api_member BEGIN
+        INSERT INTO api_member_fts(api_member_fts, rowid, username, first_name, last_name)
+        VALUES ('delete', old.id, old.username, old.first_name, old.last_name);
+    END
+    """,
+    """
+    CREATE TRIGGER api_member_fts_au AFTER UPDATE OF username, first_name, last_name ON api_member BEGIN
+        INSERT INTO api_member_fts(api_member_fts, rowid, username, first_name, last_name)
+        VALUES ('delete', old.id, old.username, old.first_name, old.last_name);
+        INSERT INTO api_member_fts(rowid, username, first_name, last_name)
+        VALUES (new.id, new.username, new.first_name, new.last_name);
+    END
+    """,
+    "INSERT INTO api_member_fts(api_member_fts) VALUES ('rebuild')",
+]
+
+DROP_FTS_SQL = [
+    "DROP TRIGGER IF EXISTS api_member_fts_ai",
+    "DROP TRIGGER IF EXISTS api_member_fts_ad",
+    "DROP TRIGGER IF EXISTS api_member_fts_au",
+    "DROP TABLE IF EXISTS api_member_fts",
+]
+
+
+def create_member_fts(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    try:
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute("CREATE VIRTUAL TABLE temp.fts5_probe USING fts5(x)")
+            cursor.execute("DROP TABLE temp.fts5_probe")
+    except OperationalError:
+        # SQLite built without FTS5: search keeps using LIKE
+        return
+    for statement in CREATE_FTS_SQL:
+        schema_editor.execute(statement)
+
+
+def drop_member_fts(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for statement in DROP_FTS_SQL:
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_backfill_conversations'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_member_fts, drop_member_fts),
+    ]
@@ -0,0 +1,102 @@
+# Generated by Django 5.2.7 on 2026-10-17 19:06
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_member_fts'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['post', 'created_at'], name='comment_post_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='friendrequest',
+            index=models.Index(fields=['to_user', 'status', '-created_at'], name='friendrequest_incoming_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='friendrequest',
+            index=models.Index(fields=['from_user', 'status', '-created_at'], name='friendrequest_outgoing_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='member',
+            index=models.Index(fields=['-created_at', '-id'], name='member_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['sender', 'recipient', 'id'], name='message_pair_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['author', '-created_at', '-id'], name='post_author_recent_idx'),
+        ),
+        # These single-column FK indexes are prefixes of the composite indexes
+        # above (and of the conversation indexes from 0004), so they are
+        # dropped. AlterField alone would rebuild every table on SQLite.
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterField(
+                    model_name='comment',
+                    name='post',
+                    field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='comments', to='api.post'),
+                ),
+                migrations.AlterField(
+                    model_name='conversation',
+                    name='user1',
+                    field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='conversations_as_user1', to='api.member'),
+                ),
+                migrations.AlterField(
+                    model_name='conversation',
+                    name='user2',
+                    field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='conversations_as_user2', to='api.member'),
+                ),
+                migrations.AlterField(
+                    model_name='friendrequest',
+                    name='from_user',
+                    field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='sent_friend_requests', to='api.member'),
+                ),
+                migrations.AlterField(
+                    model_name='friendrequest',
+                    name='to_user',
+                    field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='received_friend_requests', to='api.member'),
+                ),
+                migrations.AlterField(
+                    model_name='message',
+                    name='sender',
+                    field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='sent_messages', to='api.member'),
+                ),
+                migrations.AlterField(
+                    model_name='post',
+                    name='author',
+                    field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='posts', to='api.member'),
+                ),
+            ],
+            database_operations=[
+                migrations.RunSQL(
+                    [
+                        'DROP INDEX IF EXISTS "api_comment_post_id_251fc0c3"',
+                        'DROP INDEX IF EXISTS "api_conversation_user1_id_4b8990bd"',
+                        'DROP INDEX IF EXISTS "api_conversation_user2_id_a66bba78"',
+                        'DROP INDEX IF EXISTS "api_friendrequest_from_user_id_3f131d59"',
+                        'DROP INDEX IF EXISTS "api_friendrequest_to_user_id_40db48db"',
+                        'DROP INDEX IF EXISTS "api_message_sender_id_fa6d8ff2"',
+                        'DROP INDEX IF EXISTS "api_post_author_id_2521e4a1"',
+                    ],
+                    reverse_sql=[
+                        'CREATE INDEX "api_comment_post_id_251fc0c3" ON "api_comment" ("post_id")',
+                        'CREATE INDEX "api_conversation_user1_id_4b8990bd" ON "api_conversation" ("user1_id")',
+                        'CREATE INDEX "api_conversation_user2_id_a66bba78" ON "api_conversation" ("user2_id")',
+                        'CREATE INDEX "api_friendrequest_from_user_id_3f131d59" ON "api_friendrequest" ("from_user_id")',
+                        'CREATE INDEX "api_friendrequest_to_user_id_40db48db" ON "api_friendrequest" ("to_user_id")',
+                        'CREATE INDEX "api_message_sender_id_fa6d8ff2" ON "api_message" ("sender_id")',
+                        'CREATE INDEX "api_post_author_id_2521e4a1" ON "api_post" ("author_id")',
+                    ],
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,70 @@
+# Generated by Django 5.2.7 on 2026-10-17 19:08
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Exists, F, OuterRef, Subquery
+from django.db.models.functions import Least
+
+
+def canonicalize_friendships(apps, schema_editor):
+    Friendship = apps.get_model('api', 'Friendship')
+
+    Friendship.objects.filter(user1=F('user2')).delete()
+
+    # A pair stored in both orders keeps its canonical row, dated from the
+    # earlier of the two
+    reversed_twin = Friendship.objects.filter(user1=OuterRef('user2'), user2=OuterRef('user1'))
+    Friendship.objects.filter(user1__lt=F('user2')).filter(Exists(reversed_twin)).update(
+        created_at=Least('created_at', Subquery(reversed_twin.values('created_at')[:1]))
+    )
+    Friendship.objects.filter(user1__gt=F('user2')).filter(Exists(reversed_twin)).delete()
+
+    Friendship.objects.filter(user1__gt=F('user2')).update(user1=F('user2'), user2=F('user1'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(canonicalize_friendships, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='friendship',
+            constraint=models.CheckConstraint(condition=models.Q(('user1__lt', models.F('user2'))), name='friendship_ordered_pair'),
+        ),
+        migrations.AddIndex(
+            model_name='friendship',
+            index=models.Index(fields=['user2', 'user1'], name='friendship_user2_idx'),
+        ),
+        # user1 lookups use the unique (user1, user2) index and user2
+        # lookups the index above, so the plain FK indexes are dropped.
+        # AlterField alone would rebuild the table on SQLite.
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterField(
+                    model_name='friendship',
+                    name='user1',
+                    field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='friendships_as_user1', to='api.member'),
+                ),
+                migrations.AlterField(
+                    model_name='friendship',
+                    name='user2',
+                    field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='friendships_as_user2', to='api.member'),
+                ),
+            ],
+            database_operations=[
+                migrations.RunSQL(
+                    [
+                        'DROP INDEX IF EXISTS "api_friendship_user1_id_18bfe1f6"',
+                        'DROP INDEX IF EXISTS "api_friendship_user2_id_2de6c17e"',
+                    ],
+                    reverse_sql=[
+                        'CREATE INDEX "api_friendship_user1_id_18bfe1f6" ON "api_friendship" ("user1_id")',
+                        'CREATE INDEX "api_friendship_user2_id_2de6c17e" ON "api_friendship" ("user2_id")',
+                    ],
+                ),
+            ],
+        ),
+    ]
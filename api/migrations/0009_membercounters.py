@@ -0,0 +1,25 @@
+# Generated by Django 5.2.7 on 2026-10-17 19:50
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_canonical_friendships'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MemberCounters',
+            fields=[
+                ('member', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='counters', serialize=False, to='api.member')),
+                ('unread_messages', models.PositiveIntegerField(default=0)),
+                ('pending_friend_requests', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'api_membercounters',
+            },
+        ),
+    ]
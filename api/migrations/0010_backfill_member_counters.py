@@ -0,0 +1,38 @@
+from django.db import migrations
+from django.db.models import Count, Sum
+
+BATCH_SIZE = 1000
+
+
+def build_member_counters(apps, schema_editor):
+    Conversation = apps.get_model('api', 'Conversation')
+    FriendRequest = apps.get_model('api', 'FriendRequest')
+    MemberCounters = apps.get_model('api', 'MemberCounters')
+
+    counters = {}
+    for side in ('user1', 'user2'):
+        unread = Conversation.objects.filter(**{f'{side}_unread_count__gt': 0}).values(f'{side}_id').annotate(
+            total=Sum(f'{side}_unread_count'),
+        ).values_list(f'{side}_id', 'total')
+        for member_id, total in unread:
+            row = counters.setdefault(member_id, MemberCounters(member_id=member_id))
+            row.unread_messages += total
+    pending = FriendRequest.objects.filter(status='pending').values('to_user_id').annotate(
+        total=Count('id'),
+    ).values_list('to_user_id', 'total')
+    for member_id, total in pending:
+        row = counters.setdefault(member_id, MemberCounters(member_id=member_id))
+        row.pending_friend_requests = total
+
+    MemberCounters.objects.bulk_create(counters.values(), batch_size=BATCH_SIZE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_membercounters'),
+    ]
+
+    operations = [
+        migrations.RunPython(build_member_counters, migrations.RunPython.noop),
+    ]
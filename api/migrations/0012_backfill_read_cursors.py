@@ -0,0 +1,96 @@
+from django.db import migrations
+from django.db.models import Max, Min, Sum
+
+BATCH_SIZE = 1000
+
+SIDES = (
+    ('user1', 'user1_id', 'user2_id'),
+    ('user2', 'user2_id', 'user1_id'),
+)
+
+
+def build_read_cursors(apps, schema_editor):
+    """
+    Each side reads up to just before the first message it has not read, or
+    to the last message it received. Messages read out of order after an
+    unread one count as unread again, so no unread message is lost; unread
+    counts are recomputed to match.
+    """
+    Conversation = apps.get_model('api', 'Conversation')
+    Message = apps.get_model('api', 'Message')
+    MemberCounters = apps.get_model('api', 'MemberCounters')
+
+    received = Message.objects.values('sender_id', 'recipient_id')
+    last_received = {
+        (sender_id, recipient_id): last
+        for sender_id, recipient_id, last in received.annotate(last=Max('id')).values_list(
+            'sender_id', 'recipient_id', 'last'
+        )
+    }
+    first_unread = {
+        (sender_id, recipient_id): first
+        for sender_id, recipient_id, first in received.filter(is_read=False).annotate(first=Min('id')).values_list(
+            'sender_id', 'recipient_id', 'first'
+        )
+    }
+
+    fields = [f'{side}_{name}' for side, _, _ in SIDES for name in ('last_read_message_id', 'unread_count')]
+    last_id = 0
+    while True:
+        threads = list(Conversation.objects.filter(id__gt=last_id).order_by('id')[:BATCH_SIZE])
+        if not threads:
+            break
+        last_id = threads[-1].id
+        for thread in threads:
+            for side, member_field, partner_field in SIDES:
+                pair = (getattr(thread, partner_field), getattr(thread, member_field))
+                if pair in first_unread:
+                    cursor = first_unread[pair] - 1
+                    unread = Message.objects.filter(sender_id=pair[0], recipient_id=pair[1], id__gt=cursor).count()
+                else:
+                    cursor, unread = last_received.get(pair, 0), 0
+                setattr(thread, f'{side}_last_read_message_id', cursor)
+                setattr(thread, f'{side}_unread_count', unread)
+        Conversation.objects.bulk_update(threads, fields, batch_size=BATCH_SIZE)
+
+    unread_messages = {}
+    for side, member_field, _ in SIDES:
+        totals = Conversation.objects.values(member_field).annotate(total=Sum(f'{side}_unread_count'))
+        for member_id, total in totals.values_list(member_field, 'total'):
+            unread_messages[member_id] = unread_messages.get(member_id, 0) + total
+    counters = MemberCounters.objects.in_bulk()
+    changed = []
+    for member_id, total in unread_messages.items():
+        row = counters.get(member_id)
+        if row is None and total:
+            changed.append(MemberCounters(member_id=member_id, unread_messages=total))
+        elif row is not None and row.unread_messages != total:
+            row.unread_messages = total
+            changed.append(row)
+    MemberCounters.objects.bulk_create(
+        changed, update_conflicts=True, unique_fields=['member'], update_fields=['unread_messages'],
+        batch_size=BATCH_SIZE,
+    )
+
+
+def restore_read_flags(apps, schema_editor):
+    Conversation = apps.get_model('api', 'Conversation')
+    Message = apps.get_model('api', 'Message')
+
+    threads = Conversation.objects.values_list(
+        'user1_id', 'user2_id', 'user1_last_read_message_id', 'user2_last_read_message_id'
+    )
+    for user1_id, user2_id, user1_cursor, user2_cursor in threads.iterator(chunk_size=BATCH_SIZE):
+        Message.objects.filter(sender_id=user2_id, recipient_id=user1_id, id__lte=user1_cursor).update(is_read=True)
+        Message.objects.filter(sender_id=user1_id, recipient_id=user2_id, id__lte=user2_cursor).update(is_read=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_conversation_read_cursors'),
+    ]
+
+    operations = [
+        migrations.RunPython(build_read_cursors, restore_read_flags),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models import Case, Exists, F, OuterRef, Q, Value, When
 from django.contrib.auth.hashers import make_password, check_password
 
 
@@ -14,6 +15,9 @@ class Member(models.Model):
 
     class Meta:
         db_table = 'api_member'
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='member_recent_idx'),
+        ]
 
     def __str__(self):
         return self.username
@@ -39,22 +43,43 @@ class Member(models.Model):
         return True
 
 
+class PostQuerySet(models.QuerySet):
+    def with_stats(self, member):
+        """
+        Load the author and precompute is_liked (for `member`) so
+        PostSerializer needs no per-post queries. Like and comment counts
+        are stored on the row itself.
+        """
+        return self.select_related('author').annotate(
+            is_liked=Exists(Like.objects.filter(post=OuterRef('pk'), user=member)),
+        )
+
+
 class Post(models.Model):
-    author = models.ForeignKey(Member, on_delete=models.CASCADE, related_name='posts')
+    author = models.ForeignKey(Member, on_delete=models.CASCADE, db_index=False, related_name='posts')
     content = models.TextField()
+    # Denormalized counters, kept in step with F() updates by the like and
+    # comment views; `manage.py reconcile_counters` repairs any drift.
+    likes_count = models.PositiveIntegerField(default=0)
+    comments_count = models.PositiveIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = PostQuerySet.as_manager()
+
     class Meta:
         db_table = 'api_post'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['author', '-created_at', '-id'], name='post_author_recent_idx'),
+        ]
 
     def __str__(self):
         return f"Post by {self.author.username} at {self.created_at}"
 
 
 class Comment(models.Model):
-    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='comments')
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, db_index=False, related_name='comments')
     author = models.ForeignKey(Member, on_delete=models.CASCADE, related_name='comments')
     content = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
@@ -62,6 +87,9 @@ class Comment(models.Model):
     class Meta:
         db_table = 'api_comment'
         ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['post', 'created_at'], name='comment_post_created_idx'),
+        ]
 
     def __str__(self):
         return f"Comment by {self.author.username} on post {self.post.id}"
@@ -87,42 +115,172 @@ class FriendRequest(models.Model):
         ('rejected', 'Rejected'),
     ]
 
-    from_user = models.ForeignKey(Member, on_delete=models.CASCADE, related_name='sent_friend_requests')
-    to_user = models.ForeignKey(Member, on_delete=models.CASCADE, related_name='received_friend_requests')
+    from_user = models.ForeignKey(Member, on_delete=models.CASCADE, db_index=False, related_name='sent_friend_requests')
+    to_user = models.ForeignKey(Member, on_delete=models.CASCADE, db_index=False, related_name='received_friend_requests')
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         db_table = 'api_friendrequest'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['to_user', 'status', '-created_at'], name='friendrequest_incoming_idx'),
+            models.Index(fields=['from_user', 'status', '-created_at'], name='friendrequest_outgoing_idx'),
+        ]
 
     def __str__(self):
         return f"{self.from_user.username} -> {self.to_user.username} ({self.status})"
 
 
 class Friendship(models.Model):
-    user1 = models.ForeignKey(Member, on_delete=models.CASCADE, related_name='friendships_as_user1')
-    user2 = models.ForeignKey(Member, on_delete=models.CASCADE, related_name='friendships_as_user2')
+    """
+    Friendship between two members, stored once per pair with
+    user1_id < user2_id. Checking a pair is one probe of the unique index;
+    a member's friends are the union of two index range scans.
+    """
+    user1 = models.ForeignKey(Member, on_delete=models.CASCADE, db_index=False, related_name='friendships_as_user1')
+    user2 = models.ForeignKey(Member, on_delete=models.CASCADE, db_index=False, related_name='friendships_as_user2')
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         db_table = 'api_friendship'
         unique_together = ('user1', 'user2')
+        indexes = [
+            models.Index(fields=['user2', 'user1'], name='friendship_user2_idx'),
+        ]
+        constraints = [
+            models.CheckConstraint(condition=Q(user1__lt=F('user2')), name='friendship_ordered_pair'),
+        ]
 
     def __str__(self):
         return f"{self.user1.username} <-> {self.user2.username}"
 
+    @staticmethod
+    def ordered_pair(member_id, other_id):
+        return (member_id, other_id) if member_id < other_id else (other_id, member_id)
+
+
+class MessageQuerySet(models.QuerySet):
+    def with_read_state(self, read_cursors):
+        """
+        Annotate is_read from read cursors, {recipient id: last read
+        message id} (Conversation.read_cursors): a message is read once
+        its recipient's cursor has reached it.
+        """
+        return self.annotate(is_read=Case(
+            *(When(recipient_id=member_id, id__lte=cursor, then=Value(True)) for member_id, cursor in read_cursors.items()),
+            default=Value(False),
+            output_field=models.BooleanField(),
+        ))
+
 
 class Message(models.Model):
-    sender = models.ForeignKey(Member, on_delete=models.CASCADE, related_name='sent_messages')
+    sender = models.ForeignKey(Member, on_delete=models.CASCADE, db_index=False, related_name='sent_messages')
     recipient = models.ForeignKey(Member, on_delete=models.CASCADE, related_name='received_messages')
     content = models.TextField()
-    is_read = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = MessageQuerySet.as_manager()
+
     class Meta:
         db_table = 'api_message'
         ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['sender', 'recipient', 'id'], name='message_pair_idx'),
+        ]
 
     def __str__(self):
         return f"Message from {self.sender.username} to {self.recipient.username}"
+
+
+class Conversation(models.Model):
+    """
+    Message thread between two members, stored once per pair with
+    user1_id < user2_id. Keeps a pointer to the latest message and each
+    side's unread count so the inbox needs no per-partner queries.
+
+    Each side also has a read cursor: the id of the last message it has
+    read. Every message up to the cursor counts as read, so reading a
+    thread moves one number instead of flagging message rows.
+    """
+    user1 = models.ForeignKey(Member, on_delete=models.CASCADE, db_index=False, related_name='conversations_as_user1')
+    user2 = models.ForeignKey(Member, on_delete=models.CASCADE, db_index=False, related_name='conversations_as_user2')
+    last_message = models.ForeignKey(Message, on_delete=models.SET_NULL, null=True, related_name='+')
+    last_message_at = models.DateTimeField()
+    user1_unread_count = models.PositiveIntegerField(default=0)
+    user2_unread_count = models.PositiveIntegerField(default=0)
+    user1_last_read_message_id = models.PositiveBigIntegerField(default=0)
+    user2_last_read_message_id = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        db_table = 'api_conversation'
+        unique_together = ('user1', 'user2')
+        indexes = [
+            models.Index(fields=['user1', '-last_message_at', '-id'], name='conversation_user1_recent_idx'),
+            models.Index(fields=['user2', '-last_message_at', '-id'], name='conversation_user2_recent_idx'),
+        ]
+        constraints = [
+            models.CheckConstraint(condition=Q(user1__lt=F('user2')), name='conversation_ordered_pair'),
+        ]
+
+    def __str__(self):
+        return f"Conversation {self.user1_id} <-> {self.user2_id}"
+
+    @staticmethod
+    def ordered_pair(member_id, other_id):
+        return (member_id, other_id) if member_id < other_id else (other_id, member_id)
+
+    @staticmethod
+    def unread_field(member_id, other_id):
+        """Name of the unread counter column belonging to `member_id`"""
+        return 'user1_unread_count' if member_id < other_id else 'user2_unread_count'
+
+    @staticmethod
+    def last_read_field(member_id, other_id):
+        """Name of the read cursor column belonging to `member_id`"""
+        return 'user1_last_read_message_id' if member_id < other_id else 'user2_last_read_message_id'
+
+    def read_cursors(self):
+        return {self.user1_id: self.user1_last_read_message_id, self.user2_id: self.user2_last_read_message_id}
+
+    def partner_of(self, member):
+        return self.user2 if self.user1_id == member.id else self.user1
+
+    def unread_count_for(self, member):
+        return self.user1_unread_count if self.user1_id == member.id else self.user2_unread_count
+
+
+class MemberCounters(models.Model):
+    """
+    A member's badge counts, kept by the writers that change them
+    (api.member_counters) so reading them is one primary-key lookup.
+    A member without a row has nothing to count.
+    """
+    member = models.OneToOneField(Member, on_delete=models.CASCADE, primary_key=True, related_name='counters')
+    unread_messages = models.PositiveIntegerField(default=0)
+    pending_friend_requests = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        db_table = 'api_membercounters'
+
+    def __str__(self):
+        return f"Counters of member {self.member_id}"
+
+
+class TimelineEntry(models.Model):
+    """Materialized feed row: `post` is visible in `owner`'s news feed"""
+    owner = models.ForeignKey(Member, on_delete=models.CASCADE, related_name='timeline_entries')
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='timeline_entries')
+    author = models.ForeignKey(Member, on_delete=models.CASCADE, related_name='+')
+    created_at = models.DateTimeField()
+
+    class Meta:
+        db_table = 'api_timelineentry'
+        unique_together = ('owner', 'post')
+        indexes = [
+            models.Index(fields=['owner', '-created_at', '-post'], name='timeline_owner_recent_idx'),
+            models.Index(fields=['owner', 'author'], name='timeline_owner_author_idx'),
+        ]
+
+    def __str__(self):
+        return f"Post {self.post_id} in timeline of member {self.owner_id}"
@@ -0,0 +1,267 @@
+import base64
+import json
+from datetime import datetime
+
+from django.db.models import Q
+from rest_framework.exceptions import ParseError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+from api import friend_list
+
+
+def parse_limit(request, param, default, maximum):
+    try:
+        limit = int(request.query_params.get(param, default))
+    except (TypeError, ValueError):
+        raise ParseError('Invalid limit')
+    if limit < 1:
+        raise ParseError('Invalid limit')
+    return min(limit, maximum)
+
+
+def parse_id(request, param):
+    value = request.query_params.get(param)
+    if value in (None, ''):
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise ParseError(f'Invalid {param}')
+
+
+class KeysetPagination(BasePagination):
+    """
+    Opaque cursor pagination over (created_at, id), newest first.
+
+    The cursor encodes the position of the last row of the previous page, so
+    every page is a bounded range read instead of an OFFSET scan. Subclasses
+    may key on other fields by overriding `ordering`.
+    """
+    ordering = ('created_at', 'id')
+    cursor_query_param = 'cursor'
+    limit_query_param = 'limit'
+    default_limit = 20
+    max_limit = 100
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self.finish_page(list(self.page_queryset(queryset, request)))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        return self.finish_page([obj async for obj in self.page_queryset(queryset, request)])
+
+    def page_queryset(self, queryset, request):
+        """The unevaluated query for the requested page plus one lookahead row"""
+        self.limit = self.get_limit(request)
+        position = self.decode_cursor(request.query_params.get(self.cursor_query_param))
+
+        time_field, id_field = self.ordering
+        queryset = self.after(queryset, position)
+        return queryset.order_by(f'-{time_field}', f'-{id_field}')[:self.limit + 1]
+
+    def after(self, queryset, position):
+        """`queryset` narrowed to the rows that sort after `position`"""
+        if position is None:
+            return queryset
+        time_field, id_field = self.ordering
+        created_at, pk = position
+        return queryset.filter(
+            Q(**{f'{time_field}__lt': created_at}) |
+            Q(**{time_field: created_at, f'{id_field}__lt': pk})
+        )
+
+    def finish_page(self, page):
+        self.has_next = len(page) > self.limit
+        page = page[:self.limit]
+        self.next_cursor = self.encode_cursor(page[-1]) if self.has_next else None
+        return page
+
+    def get_paginated_response(self, data):
+        return Response({
+            'results': data,
+            'next_cursor': self.next_cursor,
+        })
+
+    def get_limit(self, request):
+        return parse_limit(request, self.limit_query_param, self.default_limit, self.max_limit)
+
+    def encode_cursor(self, obj):
+        time_field, id_field = self.ordering
+        # Pages hold model instances or values() rows (api.row_serializers)
+        if isinstance(obj, dict):
+            created_at, pk = obj[time_field], obj[id_field]
+        else:
+            created_at, pk = getattr(obj, time_field), getattr(obj, id_field)
+        payload = json.dumps([created_at.isoformat(), pk])
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        if not cursor:
+            return None
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            created_at, pk = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            return datetime.fromisoformat(created_at), int(pk)
+        except (TypeError, ValueError, UnicodeDecodeError):
+            raise ParseError('Invalid cursor')
+
+
+class TimelinePagination(KeysetPagination):
+    """
+    Keyset pagination over TimelineEntry rows. Cursors carry the post's
+    (created_at, id), so they are interchangeable with feed cursors.
+    """
+    ordering = ('created_at', 'post_id')
+
+
+class ConversationPagination(KeysetPagination):
+    """
+    Keyset pagination over Conversation rows, most recently active first.
+
+    Takes one queryset per side of a member's threads (user1, user2) instead
+    of one OR query, which SQLite would read in full and sort: each side is
+    a range scan of its (user, -last_message_at, -id) index, and the sides
+    are combined with UNION ALL, then sorted and limited in one statement.
+    """
+    ordering = ('last_message_at', 'id')
+
+    def page_queryset(self, sides, request):
+        self.limit = self.get_limit(request)
+        position = self.decode_cursor(request.query_params.get(self.cursor_query_param))
+
+        time_field, id_field = self.ordering
+        first, *rest = (self.after(side, position) for side in sides)
+        return first.union(*rest, all=True).order_by(f'-{time_field}', f'-{id_field}')[:self.limit + 1]
+
+
+class MessageWindowPagination(BasePagination):
+    """
+    Id-keyed window over a message thread, returned oldest first.
+
+    Without parameters the latest `limit` messages are returned. `before_id`
+    pages back through history and `after_id` fetches only messages newer
+    than the last one the client holds; the two cannot be combined.
+    `has_more` tells whether further messages exist in the requested
+    direction.
+    """
+    limit_query_param = 'limit'
+    default_limit = 50
+    max_limit = 200
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self.finish_page(list(self.page_queryset(queryset, request)))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        return self.finish_page([obj async for obj in self.page_queryset(queryset, request)])
+
+    def page_queryset(self, queryset, request):
+        """The unevaluated query for the requested window plus one lookahead row"""
+        self.limit = parse_limit(request, self.limit_query_param, self.default_limit, self.max_limit)
+        before_id = parse_id(request, 'before_id')
+        after_id = parse_id(request, 'after_id')
+        if before_id is not None and after_id is not None:
+            raise ParseError('Use either before_id or after_id')
+
+        # Forward windows are read oldest first, backward ones newest first
+        self.forward = after_id is not None
+        if self.forward:
+            return queryset.filter(id__gt=after_id).order_by('id')[:self.limit + 1]
+        if before_id is not None:
+            queryset = queryset.filter(id__lt=before_id)
+        return queryset.order_by('-id')[:self.limit + 1]
+
+    def finish_page(self, page):
+        self.has_more = len(page) > self.limit
+        page = page[:self.limit]
+        return page if self.forward else page[::-1]
+
+    def get_paginated_response(self, data):
+        return Response({
+            'results': data,
+            'has_more': self.has_more,
+        })
+
+
+class OffsetCursorPagination(BasePagination):
+    """
+    Opaque cursor over an offset, for result sets ordered by relevance
+    where no keyset exists. Meant for shallow paging such as search.
+    """
+    cursor_query_param = 'cursor'
+    limit_query_param = 'limit'
+    default_limit = 20
+    max_limit = 100
+
+    def paginate_results(self, fetch, request):
+        """`fetch(limit, offset)` returns a list of rows"""
+        limit = parse_limit(request, self.limit_query_param, self.default_limit, self.max_limit)
+        offset = self.decode_cursor(request.query_params.get(self.cursor_query_param))
+        page = fetch(limit + 1, offset)
+        has_next = len(page) > limit
+        self.next_cursor = self.encode_cursor(offset + limit) if has_next else None
+        return page[:limit]
+
+    def get_paginated_response(self, data):
+        return Response({
+            'results': data,
+            'next_cursor': self.next_cursor,
+        })
+
+    def encode_cursor(self, offset):
+        return base64.urlsafe_b64encode(json.dumps(['o', offset]).encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        if not cursor:
+            return 0
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            kind, offset = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            if kind != 'o' or int(offset) < 0:
+                raise ValueError(offset)
+            return int(offset)
+        except (TypeError, ValueError, UnicodeDecodeError):
+            raise ParseError('Invalid cursor')
+
+
+class FriendListPagination(BasePagination):
+    """
+    Optional keyset pages over a member's friends (api.friend_list).
+
+    The body stays a plain array. Without `limit` or `cursor` it holds every
+    friend; with either it holds one page, and the next page's URL goes in
+    a `Link: <...>; rel="next"` header. `sort` picks the order: `id`
+    (default), `name` or `date` (newest friendships first).
+    """
+    cursor_query_param = 'cursor'
+    limit_query_param = 'limit'
+    sort_query_param = 'sort'
+    default_limit = 50
+    max_limit = 500
+
+    def paginate_friends(self, member_id, request, query=''):
+        self.request = request
+        self.next_cursor = None
+        self.sort = request.query_params.get(self.sort_query_param, 'id')
+        if self.sort not in friend_list.SORTS:
+            raise ParseError('Invalid sort')
+
+        cursor = request.query_params.get(self.cursor_query_param)
+        if not cursor and self.limit_query_param not in request.query_params:
+            return friend_list.page(member_id, self.sort, query)
+
+        limit = parse_limit(request, self.limit_query_param, self.default_limit, self.max_limit)
+        position = friend_list.decode_cursor(cursor, self.sort) if cursor else None
+        page = friend_list.page(member_id, self.sort, query, position, limit + 1)
+        if len(page) > limit:
+            page = page[:limit]
+            self.next_cursor = friend_list.encode_cursor(page[-1], self.sort)
+        return page
+
+    def get_paginated_response(self, data):
+        headers = {}
+        if self.next_cursor:
+            # Relative, so it holds behind any proxy and in the response cache
+            url = replace_query_param(self.request.get_full_path(), self.cursor_query_param, self.next_cursor)
+            headers['Link'] = f'<{url}>; rel="next"'
+        return Response(data, headers=headers)
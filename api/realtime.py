@@ -0,0 +1,207 @@
+"""
+Real-time delivery of new messages over WebSockets.
+
+config.asgi routes `websocket` connections on /api/ws/ to
+`websocket_application`. Each connection authenticates with the same
+`session_id` cookie as the REST API and subscribes to the broker under its
+member id; views publish JSON payloads to a member id and every open socket
+of that member receives them. Idle sockets cost nothing beyond their
+subscription: there is no polling on either side.
+
+The broker is chosen with settings.REALTIME_BROKER. InProcessBroker only
+reaches sockets held by the publishing process. UnixDatagramBroker relays
+every publish to all processes through datagram sockets in
+settings.REALTIME_SOCKET_DIR, so WSGI workers can publish to sockets held
+by a separate ASGI process on the same host.
+"""
+import asyncio
+import itertools
+import json
+import logging
+import os
+import socket
+import threading
+from collections import defaultdict
+from pathlib import Path
+
+from django.conf import settings
+from django.http.cookie import parse_cookie
+from django.utils.module_loading import import_string
+
+from api.models import Member
+
+logger = logging.getLogger('api.realtime')
+
+WEBSOCKET_PATH = '/api/ws/'
+
+# Application close codes, in the 4000-4999 range reserved for applications
+CLOSE_NOT_FOUND = 4404
+CLOSE_UNAUTHORIZED = 4401
+
+
+class InProcessBroker:
+    """Member-id keyed pub/sub between threads of one process"""
+
+    def __init__(self):
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def subscribe(self, member_id, callback):
+        with self._lock:
+            self._subscribers[member_id].add(callback)
+
+    def unsubscribe(self, member_id, callback):
+        with self._lock:
+            callbacks = self._subscribers.get(member_id)
+            if callbacks is not None:
+                callbacks.discard(callback)
+                if not callbacks:
+                    del self._subscribers[member_id]
+
+    def subscriber_count(self):
+        with self._lock:
+            return sum(len(callbacks) for callbacks in self._subscribers.values())
+
+    def publish(self, member_id, payload):
+        self.deliver(member_id, payload)
+
+    def deliver(self, member_id, payload):
+        with self._lock:
+            callbacks = list(self._subscribers.get(member_id, ()))
+        for callback in callbacks:
+            callback(payload)
+
+
+_listener_ids = itertools.count()
+
+
+class UnixDatagramBroker(InProcessBroker):
+    """
+    Cross-process stand-in for an external pub/sub server.
+
+    A broker that holds subscriptions binds `<pid>-<n>.sock` in the socket
+    directory and delivers what it receives locally. Publishing sends one
+    datagram to every socket in the directory, so processes that only
+    publish (e.g. WSGI workers) never bind anything.
+    """
+    max_datagram = 64 * 1024
+
+    def __init__(self, directory=None):
+        super().__init__()
+        self.directory = Path(directory or settings.REALTIME_SOCKET_DIR)
+        self._listener = None
+        self._listener_lock = threading.Lock()
+
+    def subscribe(self, member_id, callback):
+        self._ensure_listener()
+        super().subscribe(member_id, callback)
+
+    def publish(self, member_id, payload):
+        datagram = json.dumps([member_id, payload]).encode()
+        if len(datagram) > self.max_datagram:
+            return
+        if not self.directory.is_dir():
+            return
+        with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as sender:
+            for path in self.directory.glob('*.sock'):
+                try:
+                    sender.sendto(datagram, str(path))
+                except (ConnectionRefusedError, FileNotFoundError):
+                    # The owning process is gone; drop its stale socket
+                    path.unlink(missing_ok=True)
+                except OSError:
+                    pass
+
+    def _ensure_listener(self):
+        with self._listener_lock:
+            if self._listener is not None:
+                return
+            self.directory.mkdir(parents=True, exist_ok=True)
+            # One socket per broker, so brokers in one process do not collide
+            path = self.directory / f'{os.getpid()}-{next(_listener_ids)}.sock'
+            path.unlink(missing_ok=True)
+            listener = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+            listener.bind(str(path))
+            self._listener = listener
+            threading.Thread(target=self._listen, name='realtime-broker', daemon=True).start()
+
+    def _listen(self):
+        while True:
+            datagram = self._listener.recv(self.max_datagram)
+            try:
+                member_id, payload = json.loads(datagram)
+            except (TypeError, ValueError):
+                continue
+            # A failing subscriber must not stop delivery for the process
+            try:
+                self.deliver(member_id, payload)
+            except Exception:
+                logger.exception('Realtime delivery to member %s failed', member_id)
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    with _broker_lock:
+        if _broker is None:
+            _broker = import_string(settings.REALTIME_BROKER)()
+        return _broker
+
+
+def publish(member_id, event_type, data):
+    """Send `data` to every open socket of `member_id` as {"type", "data"}"""
+    get_broker().publish(member_id, json.dumps({'type': event_type, 'data': data}))
+
+
+async def authenticate(scope):
+    headers = dict(scope.get('headers', ()))
+    cookies = parse_cookie(headers.get(b'cookie', b'').decode('latin-1'))
+    try:
+        member_id = int(cookies.get('session_id', ''))
+    except ValueError:
+        return None
+    if await Member.objects.filter(id=member_id).aexists():
+        return member_id
+    return None
+
+
+async def websocket_application(scope, receive, send):
+    event = await receive()
+    if event['type'] != 'websocket.connect':
+        return
+
+    if scope['path'] != WEBSOCKET_PATH:
+        await send({'type': 'websocket.close', 'code': CLOSE_NOT_FOUND})
+        return
+
+    member_id = await authenticate(scope)
+    if member_id is None:
+        await send({'type': 'websocket.close', 'code': CLOSE_UNAUTHORIZED})
+        return
+
+    await send({'type': 'websocket.accept'})
+
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+
+    def deliver(payload):
+        # Publishers may run in any thread; hand over to this connection's loop
+        loop.call_soon_threadsafe(queue.put_nowait, payload)
+
+    async def pump():
+        while True:
+            await send({'type': 'websocket.send', 'text': await queue.get()})
+
+    broker = get_broker()
+    broker.subscribe(member_id, deliver)
+    pump_task = asyncio.create_task(pump())
+    try:
+        # Client frames carry nothing the server needs; wait for disconnect
+        while (await receive())['type'] != 'websocket.disconnect':
+            pass
+    finally:
+        broker.unsubscribe(member_id, deliver)
+        pump_task.cancel()
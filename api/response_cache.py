@@ -0,0 +1,80 @@
+"""
+Per-member cache of serialized GET responses.
+
+Entries live in the `responses` cache (settings.CACHES; local memory or
+files, chosen with RESPONSE_CACHE) under the endpoint's version tag from
+api.etags. The tag covers the requesting member, the full path and every
+api.versions counter the body depends on, so a write bumps the counters and
+later reads simply miss: nothing is deleted and no entry can be served
+after the write that changed it. Old entries age out by timeout and cull.
+
+Hits and misses per endpoint are counted in a SharedCounters file, so the
+numbers cover all workers (`manage.py response_cache_stats`).
+"""
+from django.conf import settings
+from django.core.cache import caches
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.decorators import method_decorator
+from rest_framework import status
+from rest_framework.response import Response
+
+from api.etags import resource_tag
+from api.shared_counters import SharedCounters
+
+ENDPOINTS = ['post-detail', 'user-posts', 'user-detail', 'friends-list']
+
+# Headers that belong to the body and are stored with it
+CACHED_HEADERS = ('Link',)
+
+# Entries are (data, headers). Change the prefix whenever that format
+# changes: entries under an old prefix are never read and simply age out.
+KEY_PREFIX = 'response:2'
+
+_stats = SharedCounters(settings.RESPONSE_CACHE_STATS_FILE, 2 * len(ENDPOINTS))
+
+
+@receiver(setting_changed)
+def _reopen_stats(setting, **kwargs):
+    # Tests move the file with override_settings
+    global _stats
+    if setting == 'RESPONSE_CACHE_STATS_FILE':
+        _stats.close()
+        _stats = SharedCounters(settings.RESPONSE_CACHE_STATS_FILE, 2 * len(ENDPOINTS))
+
+
+def cached(endpoint, etag_func):
+    """Method decorator for APIView GET handlers: serve 200 bodies from the response cache"""
+    slot = 2 * ENDPOINTS.index(endpoint)
+
+    def decorator(handler):
+        def wrapper(request, *args, **kwargs):
+            cache = caches[settings.RESPONSE_CACHE_ALIAS]
+            key = f'{KEY_PREFIX}:{endpoint}:{resource_tag(etag_func, request, *args, **kwargs)}'
+            entry = cache.get(key)
+            if entry is not None:
+                _stats.increment(slot)
+                data, headers = entry
+                return Response(data, status=status.HTTP_200_OK, headers=headers)
+
+            _stats.increment(slot + 1)
+            response = handler(request, *args, **kwargs)
+            if response.status_code == status.HTTP_200_OK:
+                headers = {name: response[name] for name in CACHED_HEADERS if name in response}
+                cache.set(key, (response.data, headers), settings.RESPONSE_CACHE_TIMEOUT)
+            return response
+        return wrapper
+    return method_decorator(decorator)
+
+
+def stats():
+    results = {}
+    for index, endpoint in enumerate(ENDPOINTS):
+        hits, misses = _stats.get(2 * index), _stats.get(2 * index + 1)
+        lookups = hits + misses
+        results[endpoint] = {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': hits / lookups if lookups else 0.0,
+        }
+    return results
@@ -0,0 +1,114 @@
+"""
+Serializers for hot read paths that build response dicts straight from
+`.values()` rows.
+
+A RowSerializer is compiled once from a DRF serializer class into one
+Python function that builds the response dict in a single expression:
+each readable field reads its values() column (`<source>__<field>` for
+nested serializers). Strings, numbers and booleans are copied as they
+are. Datetimes are converted the way DRF's DateTimeField does it (ISO 8601
+in the current timezone, `Z` for UTC), with the timezone looked up once
+per list instead of once per value. Any other field goes through the DRF
+field's own to_representation. The output equals
+`SerializerClass(instances, many=True).data` key for key, so the rendered
+JSON is byte-identical (api/tests/test_row_serializers.py).
+
+Views query `queryset.values(*rows.columns)` and call `rows.many(page)`:
+no model instances, no per-request field binding and no per-field
+attribute lookups. `manage.py bench_serializers` compares both paths.
+"""
+from datetime import datetime
+
+from django.conf import settings
+from django.utils import timezone
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
+
+from api.instrumentation import serializer_phase
+from api.serializers import FriendRequestSerializer, MemberSerializer, MemberShortSerializer, MessageSerializer
+
+# DRF fields whose to_representation returns the values() value unchanged
+PASSTHROUGH = (serializers.CharField, serializers.IntegerField, serializers.BooleanField)
+
+
+def _converter(field):
+    def convert(value, tz):
+        return None if value is None else field.to_representation(value)
+    return convert
+
+
+def _datetime_converter(field):
+    def convert(value, tz):
+        if value is None:
+            return None
+        if tz is None or not isinstance(value, datetime) or not timezone.is_aware(value):
+            return field.to_representation(value)
+        text = value.astimezone(tz).isoformat()
+        return text[:-6] + 'Z' if text.endswith('+00:00') else text
+    return convert
+
+
+def _is_iso_datetime(field):
+    return (
+        isinstance(field, serializers.DateTimeField)
+        and getattr(field, 'format', api_settings.DATETIME_FORMAT) == ISO_8601
+        and not hasattr(field, 'timezone')
+    )
+
+
+class RowSerializer:
+
+    def __init__(self, serializer_class, prefix=''):
+        """`prefix` is put before every column name, for rows whose fields are aliased"""
+        self.name = serializer_class.__name__
+        self.prefix = prefix
+        self.columns = []
+        self._namespace = {}
+        expression = self._compile(serializer_class(), prefix)
+        source = f'def to_representation(row, tz):\n    return {expression}\n'
+        exec(compile(source, f'<{self.name} rows>', 'exec'), self._namespace)
+        self._to_representation = self._namespace['to_representation']
+
+    def _compile(self, serializer, prefix):
+        items = []
+        for key, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            if isinstance(field, serializers.BaseSerializer):
+                pk_column = f'{prefix}{field.source}__id'
+                nested = self._compile(field, f'{prefix}{field.source}__')
+                items.append(f'{key!r}: None if row[{pk_column!r}] is None else {nested}')
+                continue
+            if isinstance(field, serializers.SerializerMethodField) or field.source == '*':
+                raise TypeError(f'{self.name}.{key} cannot be read from a values() row')
+
+            column = prefix + field.source.replace('.', '__')
+            self.columns.append(column)
+            if isinstance(field, PASSTHROUGH) and not isinstance(field, serializers.ChoiceField):
+                items.append(f'{key!r}: row[{column!r}]')
+                continue
+            name = f'convert_{len(self._namespace)}'
+            self._namespace[name] = _datetime_converter(field) if _is_iso_datetime(field) else _converter(field)
+            items.append(f'{key!r}: {name}(row[{column!r}], tz)')
+        return '{' + ', '.join(items) + '}'
+
+    def to_representation(self, row):
+        return self._to_representation(row, self.current_timezone())
+
+    def many(self, rows):
+        with serializer_phase():
+            tz = self.current_timezone()
+            represent = self._to_representation
+            return [represent(row, tz) for row in rows]
+
+    @staticmethod
+    def current_timezone():
+        return timezone.get_current_timezone() if settings.USE_TZ else None
+
+
+member_rows = RowSerializer(MemberSerializer)
+member_short_rows = RowSerializer(MemberShortSerializer)
+# Friends list rows (api.friend_list) read the member fields through a join
+friend_rows = RowSerializer(MemberSerializer, prefix='friend_')
+message_rows = RowSerializer(MessageSerializer)
+friend_request_rows = RowSerializer(FriendRequestSerializer)
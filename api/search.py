@@ -0,0 +1,92 @@
+"""
+Member search.
+
+On SQLite builds with FTS5 the api_member_fts virtual table indexes
+username, first_name and last_name (kept in sync with api_member by
+triggers) and searches are ranked bm25 prefix matches. Other backends fall
+back to the original icontains filter.
+"""
+import re
+
+from django.db import connection
+from django.db.models import Q
+
+from api.models import Member
+
+FTS_TABLE = 'api_member_fts'
+
+# The index as migration 0006 creates it; bench_member_search builds it from here
+CREATE_FTS_SQL = [
+    f"""
+    CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(
+        username, first_name, last_name,
+        content='api_member', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )
+    """,
+    f"""
+    CREATE TRIGGER {FTS_TABLE}_ai AFTER INSERT ON api_member BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, username, first_name, last_name)
+        VALUES (new.id, new.username, new.first_name, new.last_name);
+    END
+    """,
+    f"""
+    CREATE TRIGGER {FTS_TABLE}_ad AFTER DELETE ON api_member BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, username, first_name, last_name)
+        VALUES ('delete', old.id, old.username, old.first_name, old.last_name);
+    END
+    """,
+    f"""
+    CREATE TRIGGER {FTS_TABLE}_au AFTER UPDATE OF username, first_name, last_name ON api_member BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, username, first_name, last_name)
+        VALUES ('delete', old.id, old.username, old.first_name, old.last_name);
+        INSERT INTO {FTS_TABLE}(rowid, username, first_name, last_name)
+        VALUES (new.id, new.username, new.first_name, new.last_name);
+    END
+    """,
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+]
+
+_fts_available = None
+
+
+def fts_available():
+    global _fts_available
+    if _fts_available is None:
+        _fts_available = (
+            connection.vendor == 'sqlite'
+            and FTS_TABLE in connection.introspection.table_names()
+        )
+    return _fts_available
+
+
+def match_expression(search):
+    """Turn free text into an FTS5 query: every word must prefix-match a column"""
+    terms = re.findall(r'\w+', search)
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def search_members(search, limit, offset):
+    """Return up to `limit` members matching `search`, best matches first"""
+    if fts_available():
+        expression = match_expression(search)
+        if not expression:
+            return []
+        return list(Member.objects.raw(
+            f"""
+            SELECT api_member.* FROM {FTS_TABLE}
+            JOIN api_member ON api_member.id = {FTS_TABLE}.rowid
+            WHERE {FTS_TABLE} MATCH %s
+            ORDER BY {FTS_TABLE}.rank, api_member.id
+            LIMIT %s OFFSET %s
+            """,
+            [expression, limit, offset],
+        ))
+
+    return list(
+        Member.objects.filter(
+            Q(username__icontains=search) |
+            Q(first_name__icontains=search) |
+            Q(last_name__icontains=search)
+        ).order_by('id')[offset:offset + limit]
+    )
@@ -1,9 +1,12 @@
+from django.conf import settings
 from rest_framework import serializers
-from api.models import Member, Post, Comment, Like, FriendRequest, Friendship, Message
-from django.db.models import Q
+from api.models import Member, Post, Comment, Like, FriendRequest, Message
+from django.db import transaction
+from api import conversations, timeline, versions
+from api.instrumentation import TimedSerializerMixin
 
 
-class MemberShortSerializer(serializers.ModelSerializer):
+class MemberShortSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Short user info for nested representation"""
     class Meta:
         model = Member
@@ -11,7 +14,7 @@ class MemberShortSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'username', 'first_name', 'last_name', 'avatar_url']
 
 
-class MemberSerializer(serializers.ModelSerializer):
+class MemberSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Full user profile serializer"""
     class Meta:
         model = Member
@@ -58,25 +61,21 @@ class ProfileUpdateSerializer(serializers.ModelSerializer):
         fields = ['first_name', 'last_name', 'bio', 'avatar_url']
 
 
-class PostSerializer(serializers.ModelSerializer):
+class PostSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Post serializer with nested author and counts"""
     author = MemberShortSerializer(read_only=True)
-    likes_count = serializers.SerializerMethodField()
-    comments_count = serializers.SerializerMethodField()
     is_liked = serializers.SerializerMethodField()
 
     class Meta:
         model = Post
         fields = ['id', 'author', 'content', 'likes_count', 'comments_count', 'is_liked', 'created_at', 'updated_at']
-        read_only_fields = ['id', 'author', 'created_at', 'updated_at']
-
-    def get_likes_count(self, obj):
-        return obj.likes.count()
-
-    def get_comments_count(self, obj):
-        return obj.comments.count()
+        read_only_fields = ['id', 'author', 'likes_count', 'comments_count', 'created_at', 'updated_at']
 
+    # Read paths pass Post.objects.with_stats() rows that already carry
+    # is_liked; the fallback covers freshly created or plain instances.
     def get_is_liked(self, obj):
+        if hasattr(obj, 'is_liked'):
+            return obj.is_liked
         request = self.context.get('request')
         if request and hasattr(request, 'user') and request.user:
             return Like.objects.filter(post=obj, user=request.user).exists()
@@ -92,10 +91,14 @@ class PostCreateSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         request = self.context.get('request')
         validated_data['author'] = request.user
-        return super().create(validated_data)
+        with transaction.atomic():
+            post = super().create(validated_data)
+            timeline.fan_out_post(post)
+            versions.bump(versions.POSTS, post.author_id)
+        return post
 
 
-class CommentSerializer(serializers.ModelSerializer):
+class CommentSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Comment serializer with nested author"""
     author = MemberShortSerializer(read_only=True)
     post_id = serializers.IntegerField(source='post.id', read_only=True)
@@ -120,7 +123,7 @@ class CommentCreateSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
 
-class FriendRequestSerializer(serializers.ModelSerializer):
+class FriendRequestSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Friend request serializer with nested users"""
     from_user = MemberShortSerializer(read_only=True)
     to_user = MemberShortSerializer(read_only=True)
@@ -131,72 +134,18 @@ class FriendRequestSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'from_user', 'to_user', 'status', 'created_at']
 
 
-class FriendshipSerializer(serializers.ModelSerializer):
-    """Friendship serializer - returns friend info"""
-    id = serializers.SerializerMethodField()
-    username = serializers.SerializerMethodField()
-    email = serializers.SerializerMethodField()
-    first_name = serializers.SerializerMethodField()
-    last_name = serializers.SerializerMethodField()
-    bio = serializers.SerializerMethodField()
-    avatar_url = serializers.SerializerMethodField()
-    created_at = serializers.SerializerMethodField()
-
-    class Meta:
-        model = Friendship
-        fields = ['id', 'username', 'email', 'first_name', 'last_name', 'bio', 'avatar_url', 'created_at']
-
-    def get_friend(self, obj):
-        request = self.context.get('request')
-        if request and hasattr(request, 'user'):
-            if obj.user1 == request.user:
-                return obj.user2
-            else:
-                return obj.user1
-        return None
-
-    def get_id(self, obj):
-        friend = self.get_friend(obj)
-        return friend.id if friend else None
-
-    def get_username(self, obj):
-        friend = self.get_friend(obj)
-        return friend.username if friend else None
-
-    def get_email(self, obj):
-        friend = self.get_friend(obj)
-        return friend.email if friend else None
-
-    def get_first_name(self, obj):
-        friend = self.get_friend(obj)
-        return friend.first_name if friend else None
-
-    def get_last_name(self, obj):
-        friend = self.get_friend(obj)
-        return friend.last_name if friend else None
-
-    def get_bio(self, obj):
-        friend = self.get_friend(obj)
-        return friend.bio if friend else None
-
-    def get_avatar_url(self, obj):
-        friend = self.get_friend(obj)
-        return friend.avatar_url if friend else None
-
-    def get_created_at(self, obj):
-        friend = self.get_friend(obj)
-        return friend.created_at if friend else None
-
-
-class MessageSerializer(serializers.ModelSerializer):
+class MessageSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Message serializer with nested sender and recipient"""
     sender = MemberShortSerializer(read_only=True)
     recipient = MemberShortSerializer(read_only=True)
+    # Derived from the recipient's read cursor (Message.objects.with_read_state);
+    # a message that was not annotated, such as one just sent, is unread
+    is_read = serializers.BooleanField(read_only=True, default=False)
 
     class Meta:
         model = Message
         fields = ['id', 'sender', 'recipient', 'content', 'is_read', 'created_at']
-        read_only_fields = ['id', 'sender', 'recipient', 'is_read', 'created_at']
+        read_only_fields = ['id', 'sender', 'recipient', 'created_at']
 
 
 class MessageCreateSerializer(serializers.Serializer):
@@ -205,6 +154,9 @@ class MessageCreateSerializer(serializers.Serializer):
     content = serializers.CharField(required=True)
 
     def validate_recipient_id(self, value):
+        request = self.context.get('request')
+        if request and value == request.user.id:
+            raise serializers.ValidationError("Cannot send message to yourself")
         if not Member.objects.filter(id=value).exists():
             raise serializers.ValidationError("Recipient not found")
         return value
@@ -212,15 +164,27 @@ class MessageCreateSerializer(serializers.Serializer):
     def create(self, validated_data):
         request = self.context.get('request')
         recipient = Member.objects.get(id=validated_data['recipient_id'])
-        message = Message.objects.create(
-            sender=request.user,
-            recipient=recipient,
-            content=validated_data['content']
-        )
+        with transaction.atomic():
+            message = Message.objects.create(
+                sender=request.user,
+                recipient=recipient,
+                content=validated_data['content']
+            )
+            conversations.record_message(message)
         return message
 
 
-class ConversationSerializer(serializers.Serializer):
+class BatchSerializer(serializers.Serializer):
+    """Batch request serializer: GET paths relative to /api/"""
+    requests = serializers.ListField(child=serializers.CharField(), allow_empty=False)
+
+    def validate_requests(self, value):
+        if len(value) > settings.BATCH_MAX_REQUESTS:
+            raise serializers.ValidationError(f"At most {settings.BATCH_MAX_REQUESTS} requests per batch")
+        return value
+
+
+class ConversationSerializer(TimedSerializerMixin, serializers.Serializer):
     """Conversation serializer with partner info and last message"""
     user = MemberShortSerializer()
     last_message = MessageSerializer(allow_null=True)
@@ -0,0 +1,80 @@
+import fcntl
+import mmap
+import os
+import secrets
+import struct
+from pathlib import Path
+
+_SLOT = struct.Struct('Q')
+
+
+class SharedCounters:
+    """
+    Fixed-size array of 64-bit counters in a memory-mapped file, shared by
+    every worker process on the host.
+
+    Reads are a plain load from the mapping. Increments take an flock on
+    the file, so they are atomic across processes. Indexes wrap modulo
+    `slots`; when several keys share a slot, a bump for one is also seen by
+    the others.
+
+    A random `generation` is written after the counters when the file is
+    created. Values derived from the counters should include it, so that
+    deleting the file cannot make new counts collide with old ones.
+    """
+
+    def __init__(self, path, slots):
+        self.path = Path(path)
+        self.slots = slots
+        self._pid = None
+        self._fd = None
+        self._mmap = None
+
+    def _mapping(self):
+        # Reopen after fork: flock on an inherited descriptor would not
+        # exclude the parent or sibling workers.
+        if self._pid != os.getpid():
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o660)
+            size = (self.slots + 1) * _SLOT.size
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                if os.fstat(fd).st_size < size:
+                    os.ftruncate(fd, size)
+                mapping = mmap.mmap(fd, size)
+                if not _SLOT.unpack_from(mapping, self.slots * _SLOT.size)[0]:
+                    _SLOT.pack_into(mapping, self.slots * _SLOT.size, secrets.randbits(63) + 1)
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            self._fd = fd
+            self._mmap = mapping
+            self._pid = os.getpid()
+        return self._mmap
+
+    def close(self):
+        """Unmap the file; the next access maps it again"""
+        if self._mmap is not None and self._pid == os.getpid():
+            self._mmap.close()
+            os.close(self._fd)
+        self._pid = self._fd = self._mmap = None
+
+    def _offset(self, index):
+        return (index % self.slots) * _SLOT.size
+
+    @property
+    def generation(self):
+        return _SLOT.unpack_from(self._mapping(), self.slots * _SLOT.size)[0]
+
+    def get(self, index):
+        return _SLOT.unpack_from(self._mapping(), self._offset(index))[0]
+
+    def increment(self, index, amount=1):
+        mapping = self._mapping()
+        offset = self._offset(index)
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            value = _SLOT.unpack_from(mapping, offset)[0] + amount
+            _SLOT.pack_into(mapping, offset, value)
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        return value
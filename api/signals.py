@@ -0,0 +1,29 @@
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from api import friend_graph, sqlite, versions
+from api.instrumentation import record_query
+from api.authentication import invalidate_member
+from api.models import Friendship, Member
+
+
+@receiver(post_save, sender=Member)
+@receiver(post_delete, sender=Member)
+def invalidate_cached_member(sender, instance, **kwargs):
+    invalidate_member(instance.id)
+    # Drops the entries held by the other workers too
+    versions.bump(versions.MEMBER, instance.id)
+
+
+@receiver(post_save, sender=Friendship)
+@receiver(post_delete, sender=Friendship)
+def invalidate_friend_graph(sender, instance, **kwargs):
+    friend_graph.invalidate(instance.user1_id, instance.user2_id)
+
+
+@receiver(connection_created)
+def configure_connection(sender, connection, **kwargs):
+    sqlite.apply_pragmas(connection)
+    # Installed per connection so queries in any thread reach the request timings
+    connection.execute_wrappers.append(record_query)
@@ -0,0 +1,24 @@
+"""
+Connection profile for SQLite.
+
+WAL lets readers run alongside the single writer, synchronous=NORMAL is
+durable across application crashes in WAL mode, and busy_timeout makes
+writers wait for the lock instead of failing with "database is locked".
+mmap_size, cache_size and temp_store keep hot pages and sort b-trees in
+memory. Values come from settings.SQLITE_PRAGMAS.
+"""
+from django.conf import settings
+
+
+def pragma_statements(pragmas=None):
+    pragmas = settings.SQLITE_PRAGMAS if pragmas is None else pragmas
+    return [f'PRAGMA {name} = {value}' for name, value in pragmas.items()]
+
+
+def apply_pragmas(connection):
+    """Apply settings.SQLITE_PRAGMAS to a new Django connection"""
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for statement in pragma_statements():
+            cursor.execute(statement)
@@ -0,0 +1,54 @@
+import atexit
+import copy
+import logging
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+from django.conf import settings
+from django.test import override_settings
+
+# Test requests are timed like any other (api/instrumentation.py); keep
+# their per-request log lines out of the test output. Through LOGGING too,
+# since importing config.asgi sets Django up again and reapplies it.
+_quiet_logging = copy.deepcopy(settings.LOGGING)
+_quiet_logging['loggers']['api.timing']['level'] = 'CRITICAL'
+override_settings(LOGGING=_quiet_logging).enable()
+logging.getLogger('api.timing').setLevel(logging.CRITICAL)
+
+_shared_state_root = tempfile.mkdtemp(prefix='api-tests-')
+atexit.register(shutil.rmtree, _shared_state_root, True)
+
+
+def isolated_shared_state():
+    """
+    override_settings that move the files shared between workers (version
+    counters, response cache stats, metrics shards) to a new empty directory
+    """
+    directory = Path(tempfile.mkdtemp(dir=_shared_state_root))
+    return override_settings(
+        VERSION_DIR=str(directory / 'versions'),
+        RESPONSE_CACHE_STATS_FILE=str(directory / 'response_cache.stats'),
+        METRICS_DIR=str(directory / 'metrics'),
+    )
+
+
+# Never write the live files under persistent/
+isolated_shared_state().enable()
+
+
+def _test_classes(suite):
+    for test in suite:
+        if isinstance(test, unittest.TestSuite):
+            yield from _test_classes(test)
+        else:
+            yield type(test)
+
+
+def load_tests(loader, tests, pattern):
+    """Discover the package as usual; each test class starts from zeroed counters"""
+    tests.addTests(loader.discover(start_dir=str(Path(__file__).parent), pattern=pattern))
+    for test_class in set(_test_classes(tests)):
+        isolated_shared_state()(test_class)
+    return tests
@@ -0,0 +1,63 @@
+"""
+Request bodies in the ASGI worker (config/asgi_worker.py): chunked framing
+ends exactly at the terminating chunk, ambiguous framing is refused, and
+oversized bodies are refused before they are buffered.
+"""
+import asyncio
+
+from django.test import SimpleTestCase, override_settings
+
+from config.asgi_worker import ASGIWorker, BodyTooLarge
+
+NEXT_REQUEST = b'GET /api/auth/me/ HTTP/1.1\r\n\r\n'
+CHUNKED = {b'transfer-encoding': b'chunked'}
+
+
+def read_body(headers, data):
+    """The body read from `data` and what is left on the connection after it"""
+    async def read():
+        reader = asyncio.StreamReader()
+        reader.feed_data(data)
+        reader.feed_eof()
+        body = await asyncio.wait_for(ASGIWorker.read_body(None, headers, reader, None), 1)
+        return body, await reader.read()
+    return asyncio.run(read())
+
+
+class ReadBodyTests(SimpleTestCase):
+
+    def test_chunked_body_stops_at_the_last_chunk(self):
+        body, rest = read_body(CHUNKED, b'5\r\nhello\r\n6;ext=1\r\n world\r\n0\r\n\r\n' + NEXT_REQUEST)
+        self.assertEqual((body, rest), (b'hello world', NEXT_REQUEST))
+
+    def test_chunked_trailers_are_skipped(self):
+        body, rest = read_body(CHUNKED, b'5\r\nhello\r\n0\r\nX-Checksum: 1\r\n\r\n' + NEXT_REQUEST)
+        self.assertEqual((body, rest), (b'hello', NEXT_REQUEST))
+
+    def test_content_length(self):
+        self.assertEqual(read_body({b'content-length': b'5'}, b'hello' + NEXT_REQUEST), (b'hello', NEXT_REQUEST))
+
+    def test_malformed_chunk(self):
+        with self.assertRaises(ValueError):
+            read_body(CHUNKED, b'5\r\nhello!!0\r\n\r\n')
+
+    def test_ambiguous_framing_is_refused(self):
+        self.assertEqual(read_body({b'transfer-encoding': b'Chunked'}, b'0\r\n\r\n'), (b'', b''))
+        for headers in [
+            {b'transfer-encoding': b'gzip, chunked'},
+            {b'transfer-encoding': b'chunked, identity'},
+            {b'transfer-encoding': b'identity'},
+            {**CHUNKED, b'content-length': b'5'},
+            {b'content-length': b'+5'},
+            {b'content-length': b'-1'},
+        ]:
+            with self.subTest(headers=headers), self.assertRaises(ValueError):
+                read_body(headers, b'5\r\nhello\r\n0\r\n\r\n')
+
+    @override_settings(DATA_UPLOAD_MAX_MEMORY_SIZE=8)
+    def test_oversized_bodies_are_refused(self):
+        with self.assertRaises(BodyTooLarge):
+            read_body({b'content-length': b'9'}, b'x' * 9)
+        with self.assertRaises(BodyTooLarge):
+            read_body(CHUNKED, b'5\r\nhello\r\n5\r\nworld\r\n0\r\n\r\n')
+        self.assertEqual(read_body(CHUNKED, b'4\r\nabcd\r\n4\r\nefgh\r\n0\r\n\r\n')[0], b'abcdefgh')
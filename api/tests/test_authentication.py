@@ -0,0 +1,49 @@
+"""
+The per-worker member cache (api/authentication.py) never serves a member
+whose versions.MEMBER counter has moved, and /api/auth/me/ always reads the
+row itself.
+"""
+from django.test import TestCase
+
+from api import versions
+from api.authentication import member_cache
+from api.models import Member
+from api.tests.utils import client_for, create_member, reset_caches
+
+
+class MemberCacheTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = create_member('alice')
+
+    def setUp(self):
+        reset_caches()
+        self.client = client_for(self.alice)
+
+    def authenticated_first_name(self):
+        # The friends list is served to the cached member without reading its row
+        self.assertEqual(self.client.get('/api/friends/').status_code, 200)
+        member, _ = member_cache.get(self.alice.id)
+        return member.first_name
+
+    def test_save_in_another_worker_is_seen(self):
+        self.assertEqual(self.authenticated_first_name(), 'Alice')
+        # What a save in another worker leaves behind: the row and the
+        # counter change, this worker's entry stays
+        Member.objects.filter(id=self.alice.id).update(first_name='Alicia')
+        self.assertEqual(self.authenticated_first_name(), 'Alice')
+        versions.bump(versions.MEMBER, self.alice.id)
+        self.assertEqual(self.authenticated_first_name(), 'Alicia')
+
+    def test_profile_update_is_seen(self):
+        self.authenticated_first_name()
+        response = self.client.put(f'/api/users/{self.alice.id}/', {'first_name': 'Alicia'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.authenticated_first_name(), 'Alicia')
+
+    def test_me_reads_the_row(self):
+        self.assertEqual(self.client.get('/api/auth/me/').json()['first_name'], 'Alice')
+        Member.objects.filter(id=self.alice.id).update(first_name='Alicia')
+        self.assertEqual(self.client.get('/api/auth/me/').json()['first_name'], 'Alicia')
+        self.assertEqual(member_cache.get(self.alice.id)[0].first_name, 'Alicia')
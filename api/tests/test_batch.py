@@ -0,0 +1,78 @@
+"""
+POST /api/batch/ (api/batch.py) answers each item as its own GET would,
+authenticating the member once for the whole batch.
+"""
+from unittest import mock
+
+from django.test import TestCase, override_settings
+
+from api import conversations
+from api.authentication import CookieAuthentication
+from api.models import FriendRequest, Friendship, Message, Post
+from api.tests.utils import client_for, create_member, reset_caches
+
+PATHS = ['auth/me/', 'posts/?limit=5', 'conversations/', 'friends/requests/', '/api/friends/']
+
+
+class BatchTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = create_member('alice')
+        cls.bob = create_member('bob')
+        cls.carol = create_member('carol')
+        Friendship.objects.create(user1=cls.alice, user2=cls.bob)
+        FriendRequest.objects.create(from_user=cls.carol, to_user=cls.alice)
+        for index in range(3):
+            Post.objects.create(author=cls.bob, content=f'post {index}')
+        conversations.record_message(Message.objects.create(sender=cls.bob, recipient=cls.alice, content='Hello'))
+
+    def setUp(self):
+        reset_caches()
+        self.client = client_for(self.alice)
+
+    def batch(self, paths, **headers):
+        return self.client.post('/api/batch/', {'requests': paths}, format='json', headers=headers)
+
+    def test_items_match_separate_requests(self):
+        response = self.batch(PATHS)
+        self.assertEqual(response.status_code, 200)
+        results = response.json()['results']
+        self.assertEqual([item['path'] for item in results], PATHS)
+
+        for path, item in zip(PATHS, results):
+            single = self.client.get(path if path.startswith('/') else f'/api/{path}')
+            self.assertEqual(item['status'], single.status_code, path)
+            self.assertEqual(item['body'], single.json(), path)
+            self.assertGreaterEqual(item['duration_ms'], 0)
+        self.assertEqual(results[4]['headers']['ETag'], single['ETag'])
+
+    def test_authenticates_once(self):
+        authenticate = CookieAuthentication.authenticate
+        with mock.patch.object(CookieAuthentication, 'authenticate', autospec=True, side_effect=authenticate) as spy:
+            self.assertEqual(self.batch(PATHS).status_code, 200)
+        self.assertEqual(spy.call_count, 1)
+
+    def test_item_errors_do_not_fail_the_batch(self):
+        paths = ['nope/', '/admin/', 'https://example.com/api/auth/me/', 'batch/', 'messages/', f'users/{self.bob.id}/']
+        results = self.batch(paths).json()['results']
+        self.assertEqual([item['status'] for item in results], [404, 400, 400, 400, 405, 200])
+        self.assertEqual(results[5]['body']['username'], 'bob')
+
+    def test_batch_conditional_headers_are_not_applied_to_items(self):
+        etag = self.client.get('/api/friends/')['ETag']
+        self.assertEqual(self.client.get('/api/friends/', headers={'If-None-Match': etag}).status_code, 304)
+        item = self.batch(['friends/'], **{'If-None-Match': etag}).json()['results'][0]
+        self.assertEqual(item['status'], 200)
+        self.assertEqual(len(item['body']), 1)
+
+    @override_settings(BATCH_MAX_REQUESTS=2)
+    def test_fan_in_is_bounded(self):
+        response = self.batch(PATHS[:3])
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('requests', response.json())
+        self.assertEqual(self.batch([]).status_code, 400)
+
+    def test_requires_authentication(self):
+        self.client.cookies.clear()
+        self.assertEqual(self.batch(PATHS).status_code, 403)
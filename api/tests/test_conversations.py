@@ -0,0 +1,105 @@
+"""
+Conversation rows (api/conversations.py) back the inbox: one row per pair
+of members with the last message and each side's unread count, kept by the
+message writes and built for existing messages by migration 0005.
+"""
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+
+from api.models import Conversation
+from api.tests.utils import client_for, create_member, reset_caches
+
+
+class InboxTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.me = create_member('me')
+        cls.others = [create_member(f'other{index}') for index in range(5)]
+        for index, other in enumerate(cls.others):
+            for number in range(index + 1):
+                client_for(other).post('/api/messages/', {'recipient_id': cls.me.id, 'content': f'{index}-{number}'}, format='json')
+        client_for(cls.me).post('/api/messages/', {'recipient_id': cls.others[0].id, 'content': 'reply'}, format='json')
+
+    def setUp(self):
+        reset_caches()
+        self.client = client_for(self.me)
+
+    def test_latest_conversation_first(self):
+        with CaptureQueriesContext(connection) as captured:
+            page = self.client.get('/api/conversations/', {'limit': 3}).data
+        self.assertLessEqual(len(captured), 2)
+        self.assertEqual([row['last_message']['content'] for row in page['results']], ['reply', '4-4', '3-3'])
+        self.assertEqual([row['unread_count'] for row in page['results']], [1, 5, 4])
+
+        rest = self.client.get('/api/conversations/', {'cursor': page['next_cursor']}).data
+        self.assertEqual([row['user']['username'] for row in rest['results']], ['other2', 'other1'])
+        self.assertIsNone(rest['next_cursor'])
+
+    def test_threads_from_both_sides_merge(self):
+        # other0 is user2 in its thread with me and user1 in these
+        member = self.others[0]
+        for other in self.others[3:]:
+            client_for(other).post('/api/messages/', {'recipient_id': member.id, 'content': other.username}, format='json')
+        client = client_for(member)
+        seen, params = [], {'limit': 1}
+        while True:
+            with CaptureQueriesContext(connection) as captured:
+                page = client.get('/api/conversations/', params).data
+            self.assertIn('UNION ALL', captured[-1]['sql'])
+            seen += [row['user']['username'] for row in page['results']]
+            if not page['next_cursor']:
+                break
+            params['cursor'] = page['next_cursor']
+        self.assertEqual(seen, ['other4', 'other3', 'me'])
+
+    def test_reading_clears_the_unread_count(self):
+        self.client.get(f'/api/conversations/{self.others[4].id}/')
+        rows = self.client.get('/api/conversations/').data['results']
+        self.assertEqual([row['unread_count'] for row in rows], [1, 0, 4, 3, 2])
+        # The sender's side never counts its own messages
+        self.assertEqual(client_for(self.others[4]).get('/api/conversations/').data['results'][0]['unread_count'], 0)
+
+    def test_messages_to_oneself_are_refused(self):
+        response = self.client.post('/api/messages/', {'recipient_id': self.me.id, 'content': 'x'}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Conversation.objects.count(), 5)
+
+
+class BackfillMigrationTests(TransactionTestCase):
+    """Migration 0005 builds the rows the message writes would have kept"""
+
+    before = [('api', '0004_conversation')]
+    after = [('api', '0005_backfill_conversations')]
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def tearDown(self):
+        self.migrate(MigrationExecutor(connection).loader.graph.leaf_nodes())
+
+    def test_backfill(self):
+        apps = self.migrate(self.before)
+        Member = apps.get_model('api', 'Member')
+        Message = apps.get_model('api', 'Message')
+        alice, bob, carol = (
+            Member.objects.create(username=name, email=f'{name}@example.com', first_name=name, last_name='Test').id
+            for name in ('alice', 'bob', 'carol')
+        )
+        for content, sender, recipient, is_read in [
+            ('1', alice, bob, True), ('2', bob, alice, False), ('3', carol, alice, True),
+            ('4', bob, alice, False), ('5', alice, carol, False), ('note', bob, bob, False),
+        ]:
+            Message.objects.create(sender_id=sender, recipient_id=recipient, content=content, is_read=is_read)
+
+        apps = self.migrate(self.after)
+        rows = apps.get_model('api', 'Conversation').objects.values_list(
+            'user1_id', 'user2_id', 'last_message__content', 'user1_unread_count', 'user2_unread_count',
+        )
+        # Messages to oneself start no thread
+        self.assertEqual(sorted(rows), [(alice, bob, '4', 2, 0), (alice, carol, '5', 0, 1)])
@@ -0,0 +1,52 @@
+"""
+Conditional GETs (api/etags.py): an unchanged resource answers 304, and
+every write the body depends on changes its ETag.
+"""
+from django.test import TestCase
+
+from api.models import Friendship, Post
+from api.tests.utils import client_for, create_member
+
+CONDITIONAL_PATHS = ['/api/posts/', '/api/friends/', '/api/conversations/', '/api/users/{bob}/']
+
+
+class ETagTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = create_member('alice')
+        cls.bob = create_member('bob')
+        cls.carol = create_member('carol')
+        Friendship.objects.create(user1=cls.alice, user2=cls.bob)
+        cls.post = Post.objects.create(author=cls.bob, content='Hello')
+
+    def setUp(self):
+        self.client = client_for(self.alice)
+
+    def assertChangedBy(self, path, write):
+        etag = self.client.get(path)['ETag']
+        write()
+        response = self.client.get(path, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200, path)
+        return response
+
+    def test_unchanged_resources_answer_304(self):
+        for path in CONDITIONAL_PATHS:
+            path = path.format(bob=self.bob.id)
+            response = self.client.get(path)
+            self.assertEqual(response.status_code, 200, path)
+            self.assertIn('no-cache', response['Cache-Control'])
+            self.assertEqual(self.client.get(path, headers={'If-None-Match': response['ETag']}).status_code, 304, path)
+
+    def test_writes_change_the_etag(self):
+        bob, carol = client_for(self.bob), client_for(self.carol)
+        self.assertChangedBy('/api/posts/', lambda: carol.post(f'/api/posts/{self.post.id}/like/'))
+        self.assertChangedBy('/api/posts/', lambda: bob.put(f'/api/users/{self.bob.id}/', {'bio': 'Hi'}, format='json'))
+        self.assertChangedBy('/api/friends/', lambda: bob.put(f'/api/users/{self.bob.id}/', {'bio': 'Hey'}, format='json'))
+        self.assertChangedBy('/api/conversations/', lambda: bob.post(
+            '/api/messages/', {'recipient_id': self.alice.id, 'content': 'Hi'}, format='json',
+        ))
+        response = self.assertChangedBy(
+            f'/api/users/{self.carol.id}/', lambda: carol.post(f'/api/friends/request/{self.alice.id}/'),
+        )
+        self.assertEqual(response.data['friend_request_status'], 'pending_received')
@@ -0,0 +1,47 @@
+"""
+Keyset cursor pagination (api.pagination.KeysetPagination) over the news
+feed and a member's posts.
+"""
+from django.test import TestCase
+
+from api.models import Friendship, Post
+from api.tests.utils import client_for, create_member
+
+
+class FeedPaginationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = create_member('alice')
+        cls.bob = create_member('bob')
+        cls.carol = create_member('carol')
+        Friendship.objects.create(user1=cls.alice, user2=cls.bob)
+        for index in range(7):
+            Post.objects.create(author=cls.bob, content=f'bob {index}')
+            Post.objects.create(author=cls.carol, content=f'carol {index}')
+        Post.objects.create(author=cls.alice, content='mine')
+
+    def setUp(self):
+        self.client = client_for(self.alice)
+
+    def test_pages_cover_the_feed_once(self):
+        seen, params = [], {'limit': 3}
+        while True:
+            response = self.client.get('/api/posts/', params)
+            self.assertEqual(response.status_code, 200)
+            seen += [post['id'] for post in response.data['results']]
+            if not response.data['next_cursor']:
+                break
+            params['cursor'] = response.data['next_cursor']
+        expected = Post.objects.filter(author__in=[self.alice, self.bob]).order_by('-created_at', '-id')
+        self.assertEqual(seen, list(expected.values_list('id', flat=True)))
+
+    def test_member_posts(self):
+        response = self.client.get(f'/api/users/{self.carol.id}/posts/', {'limit': 5})
+        self.assertEqual([post['content'] for post in response.data['results']], [f'carol {index}' for index in range(6, 1, -1)])
+        rest = self.client.get(f'/api/users/{self.carol.id}/posts/', {'cursor': response.data['next_cursor']})
+        self.assertEqual([post['content'] for post in rest.data['results']], ['carol 1', 'carol 0'])
+        self.assertIsNone(rest.data['next_cursor'])
+
+    def test_invalid_cursor(self):
+        self.assertEqual(self.client.get('/api/posts/', {'cursor': 'zzz'}).status_code, 400)
@@ -0,0 +1,105 @@
+"""
+The per-worker friend-graph cache (api/friend_graph.py): entries follow
+versions.FRIENDS across workers, are bounded by the ids they hold and are
+never filled from inside a transaction.
+
+TransactionTestCase: TestCase runs every test inside an atomic block, where
+the cache deliberately keeps nothing.
+"""
+import os
+from unittest import mock
+
+from django.db import connection, transaction
+from django.test import TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+
+from api import friend_graph, metrics, versions
+from api.lru import LRUCache
+from api.models import Friendship
+from api.tests.utils import create_member, reset_caches
+
+
+class FriendGraphTests(TransactionTestCase):
+
+    def setUp(self):
+        reset_caches()
+        self.alice, self.bob, self.carol, self.dave = (
+            create_member(name) for name in ('alice', 'bob', 'carol', 'dave')
+        )
+        Friendship.objects.create(user1=self.alice, user2=self.bob)
+        Friendship.objects.create(user1=self.alice, user2=self.carol)
+
+    def counts(self):
+        stats = friend_graph.stats()
+        return stats['hits'], stats['misses'], stats['stale']
+
+    def assertLookup(self, member, expected_ids, result):
+        before = self.counts()
+        self.assertEqual(friend_graph.friend_ids(member.id), frozenset(expected_ids))
+        after = self.counts()
+        self.assertEqual(
+            [name for name, old, new in zip(('hits', 'misses', 'stale'), before, after) if new != old], [result],
+        )
+
+    def test_hits_until_the_version_moves(self):
+        self.assertLookup(self.alice, {self.bob.id, self.carol.id}, 'misses')
+        with self.assertNumQueries(0):
+            self.assertLookup(self.alice, {self.bob.id, self.carol.id}, 'hits')
+
+        # What another worker leaves behind when it adds a friendship: the
+        # row and the counter bump, while this worker's entry stays
+        Friendship.objects.bulk_create([Friendship(user1=self.alice, user2=self.dave)])
+        self.assertLookup(self.alice, {self.bob.id, self.carol.id}, 'hits')
+        versions.bump(versions.FRIENDS, self.alice.id, self.dave.id)
+        self.assertLookup(self.alice, {self.bob.id, self.carol.id, self.dave.id}, 'stale')
+        self.assertLookup(self.alice, {self.bob.id, self.carol.id, self.dave.id}, 'hits')
+
+    def test_saves_in_this_worker_invalidate(self):
+        friend_graph.friend_ids(self.bob.id)
+        Friendship.objects.filter(user1=self.alice, user2=self.bob).delete()
+        # Dropped outright here; other workers see the bumped version
+        self.assertLookup(self.bob, set(), 'misses')
+
+    def test_nothing_is_kept_inside_a_transaction(self):
+        with transaction.atomic():
+            self.assertLookup(self.alice, {self.bob.id, self.carol.id}, 'misses')
+            self.assertLookup(self.alice, {self.bob.id, self.carol.id}, 'misses')
+        self.assertEqual(friend_graph.stats()['entries'], 0)
+
+    def test_eviction_by_weight(self):
+        # Each entry weighs its ids plus one
+        small = LRUCache(maxsize=10, maxweight=4, weigher=friend_graph._cache.weigher)
+        with mock.patch.object(friend_graph, '_cache', small):
+            friend_graph.friend_ids(self.alice.id)
+            friend_graph.friend_ids(self.bob.id)
+            self.assertEqual((len(small), small.evictions), (1, 1))
+            self.assertLookup(self.bob, {self.alice.id}, 'hits')
+            self.assertLookup(self.alice, {self.bob.id, self.carol.id}, 'misses')
+            self.assertEqual(friend_graph.stats()['cached_ids'], 2)
+
+    def test_are_friends_probes_one_row_without_a_cached_set(self):
+        with CaptureQueriesContext(connection) as captured:
+            self.assertTrue(friend_graph.are_friends(self.carol.id, self.alice.id))
+            self.assertFalse(friend_graph.are_friends(self.carol.id, self.bob.id))
+        self.assertEqual(len(captured), 2)
+        self.assertTrue(all('LIMIT 1' in query['sql'] for query in captured))
+        self.assertEqual(friend_graph.stats()['entries'], 0)
+
+        friend_graph.friend_ids(self.carol.id)
+        with self.assertNumQueries(0):
+            self.assertTrue(friend_graph.are_friends(self.carol.id, self.alice.id))
+            self.assertFalse(friend_graph.are_friends(self.carol.id, self.bob.id))
+
+    def test_stats_are_exported(self):
+        friend_graph.friend_ids(self.alice.id)
+        friend_graph.friend_ids(self.alice.id)
+        stats = friend_graph.stats()
+        self.assertEqual((stats['entries'], stats['cached_ids']), (1, 2))
+        self.assertEqual(stats['hit_rate'], stats['hits'] / (stats['hits'] + stats['misses'] + stats['stale']))
+        self.assertGreater(stats['memory_bytes'], 0)
+
+        text = metrics.render()
+        worker = os.getpid()
+        self.assertIn(f'api_friend_graph_cache_lookups{{worker="{worker}",result="hits"}} {stats["hits"]}', text)
+        self.assertIn(f'api_friend_graph_cache_memory_bytes{{worker="{worker}"}} {stats["memory_bytes"]}', text)
+        self.assertIn(f'api_member_cache_entries{{worker="{worker}"}}', text)
@@ -0,0 +1,123 @@
+"""
+The friends list (api/friend_list.py) is one query whatever the sort,
+filter or page, and keeps the MemberSerializer array shape.
+"""
+import base64
+import json
+from datetime import timedelta
+from urllib.parse import parse_qs, urlparse
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from api.models import Friendship, Member
+from api.serializers import MemberSerializer
+from api.tests.utils import client_for, reset_caches
+
+NAMES = [('Vera', 'Orlova'), ('anna', 'Petrova'), ('Anna', 'Ivanova'), ('Boris', 'Anikin'), ('Anna', 'Ivanova')]
+
+
+class FriendsListTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.me = Member.objects.create(username='me', email='me@example.com', password='x', first_name='Me', last_name='Test')
+        cls.friends = []
+        started = timezone.now() - timedelta(days=30)
+        for index, (first_name, last_name) in enumerate(NAMES):
+            friend = Member.objects.create(
+                username=f'friend{index}', email=f'friend{index}@example.com', password='x',
+                first_name=first_name, last_name=last_name,
+            )
+            cls.friends.append(friend)
+            friendship = Friendship.objects.create(**dict(zip(('user1', 'user2'), sorted([cls.me, friend], key=lambda m: m.id))))
+            # Befriended in an order unrelated to ids or names
+            Friendship.objects.filter(id=friendship.id).update(created_at=started + timedelta(days=(index * 3) % 5))
+        stranger = Member.objects.create(username='stranger', email='s@example.com', password='x', first_name='Anna', last_name='Zz')
+        Friendship.objects.create(user1=cls.friends[0], user2=stranger)
+
+    def setUp(self):
+        reset_caches()
+        self.client = client_for(self.me)
+
+    def ids(self, response):
+        self.assertEqual(response.status_code, 200, response.content)
+        return [friend['id'] for friend in response.data]
+
+    def walk(self, params):
+        """Follow the Link headers from the first page; ids of every page in order"""
+        ids = []
+        params = dict(params)
+        for _ in range(len(NAMES) + 1):
+            response = self.client.get('/api/friends/', params)
+            ids += self.ids(response)
+            if 'Link' not in response:
+                return ids
+            url = response['Link'].split(';')[0].strip('<>')
+            params = {name: values[0] for name, values in parse_qs(urlparse(url).query).items()}
+        self.fail('pagination did not end')
+
+    def test_body_is_the_member_serializer_array(self):
+        response = self.client.get('/api/friends/')
+        friends = sorted(self.friends, key=lambda member: member.id)
+        self.assertEqual(self.ids(response), [friend.id for friend in friends])
+        self.assertEqual(
+            JSONRenderer().render(response.data), JSONRenderer().render(MemberSerializer(friends, many=True).data),
+        )
+        self.assertNotIn('Link', response)
+
+    def test_sorts_page_through_every_friend_once(self):
+        by_name = sorted(self.friends, key=lambda member: (member.first_name, member.last_name, member.id))
+        friendships = {
+            friendship.user1_id if friendship.user2_id == self.me.id else friendship.user2_id: friendship.created_at
+            for friendship in Friendship.objects.filter(user1=self.me) | Friendship.objects.filter(user2=self.me)
+        }
+        by_date = sorted(self.friends, key=lambda member: (friendships[member.id], member.id), reverse=True)
+        for sort, expected in [('name', by_name), ('date', by_date), ('id', sorted(self.friends, key=lambda m: m.id))]:
+            with self.subTest(sort=sort):
+                self.assertEqual(self.walk({'sort': sort, 'limit': 2}), [friend.id for friend in expected])
+
+    def test_query_filters_names(self):
+        anna = [friend.id for friend in self.friends if friend.first_name.lower() == 'anna']
+        self.assertEqual(sorted(self.ids(self.client.get('/api/friends/', {'q': 'ann'}))), sorted(anna))
+        self.assertEqual(self.walk({'q': 'ann', 'sort': 'name', 'limit': 1}), [
+            friend.id for friend in sorted(
+                (friend for friend in self.friends if friend.id in anna),
+                key=lambda member: (member.first_name, member.last_name, member.id),
+            )
+        ])
+
+    def test_cached_pages_keep_their_link(self):
+        first = self.client.get('/api/friends/', {'limit': 2})
+        again = self.client.get('/api/friends/', {'limit': 2})
+        self.assertEqual(again['Link'], first['Link'])
+        self.assertEqual(again.data, first.data)
+
+    def test_rejects_bad_parameters(self):
+        self.assertEqual(self.client.get('/api/friends/', {'sort': 'email'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/friends/', {'cursor': 'nope'}).status_code, 400)
+        cursor = parse_qs(urlparse(
+            self.client.get('/api/friends/', {'sort': 'name', 'limit': 1})['Link'].split(';')[0].strip('<>')
+        ).query)['cursor'][0]
+        # A cursor only means something under the sort it came from
+        self.assertEqual(self.client.get('/api/friends/', {'sort': 'date', 'cursor': cursor}).status_code, 400)
+
+    def test_rejects_malformed_cursors(self):
+        for sort, values in [
+            ('id', ['abc']), ('id', [True]), ('id', [1.5]), ('id', []),
+            ('name', [{'a': 1}, 'Ivanova', 1]), ('name', ['Anna', ['x'], 1]), ('name', ['Anna', 'Ivanova', '1']),
+            ('date', [5, 1]), ('date', ['yesterday', 1]),
+        ]:
+            cursor = base64.urlsafe_b64encode(json.dumps([sort, *values]).encode()).decode()
+            with self.subTest(sort=sort, values=values):
+                self.assertEqual(self.client.get('/api/friends/', {'sort': sort, 'cursor': cursor}).status_code, 400)
+
+    def test_members_are_read_in_one_query(self):
+        self.client.get('/api/friends/')
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get('/api/friends/', {'sort': 'name', 'limit': 4, 'q': 'a'})
+        self.assertEqual(len(response.data), 4)
+        self.assertEqual(sum('"api_member"' in query['sql'] for query in captured.captured_queries), 1)
@@ -0,0 +1,54 @@
+"""
+Friendships are stored once per pair with user1_id < user2_id. Migration
+0008 brings existing rows into that shape before adding the constraint.
+"""
+from datetime import datetime, timezone
+
+from django.db import IntegrityError, connection, transaction
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TransactionTestCase
+
+
+class CanonicalMigrationTests(TransactionTestCase):
+    """Migration 0008 drops, merges and reorders rows to fit the constraint"""
+
+    before = [('api', '0007_hot_query_indexes')]
+    after = [('api', '0008_canonical_friendships')]
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def tearDown(self):
+        self.migrate(MigrationExecutor(connection).loader.graph.leaf_nodes())
+
+    def test_canonicalize_and_reverse(self):
+        apps = self.migrate(self.before)
+        Member = apps.get_model('api', 'Member')
+        Friendship = apps.get_model('api', 'Friendship')
+        alice, bob, carol = (
+            Member.objects.create(username=name, email=f'{name}@example.com', first_name=name, last_name='Test').id
+            for name in ('alice', 'bob', 'carol')
+        )
+        for day, user1, user2 in [
+            (1, alice, alice), (2, alice, bob), (1, bob, alice), (3, carol, bob), (4, alice, carol),
+        ]:
+            friendship = Friendship.objects.create(user1_id=user1, user2_id=user2)
+            Friendship.objects.filter(id=friendship.id).update(created_at=datetime(2026, 1, day, tzinfo=timezone.utc))
+
+        apps = self.migrate(self.after)
+        Friendship = apps.get_model('api', 'Friendship')
+        rows = Friendship.objects.values_list('user1_id', 'user2_id', 'created_at__day')
+        # The self-friendship is gone and alice and bob keep one row, dated
+        # from the earlier of their two
+        self.assertEqual(sorted(rows), [(alice, bob, 1), (alice, carol, 4), (bob, carol, 3)])
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Friendship.objects.create(user1_id=carol, user2_id=alice)
+
+        # Back on 0007 the rows stay canonical and the constraint is gone
+        apps = self.migrate(self.before)
+        Friendship = apps.get_model('api', 'Friendship')
+        self.assertEqual(Friendship.objects.count(), 3)
+        Friendship.objects.create(user1_id=carol, user2_id=alice)
@@ -0,0 +1,77 @@
+"""
+Request timing (api/instrumentation.py): the Server-Timing header and the
+`api.timing` log record must agree with the queries the request really ran.
+"""
+import re
+
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from api.models import Friendship, Post
+from api.tests.utils import client_for, create_member, reset_caches
+
+METRIC = re.compile(r'([\w-]+)(?:;dur=([\d.]+))?(?:;desc="(\d+)")?')
+
+
+def server_timing(response):
+    return {
+        name: float(duration) if duration else int(description)
+        for name, duration, description in METRIC.findall(response.headers['Server-Timing'])
+    }
+
+
+@override_settings(REQUEST_TIMING_SAMPLE_RATE=1.0, REQUEST_TIMING_HEADER=True)
+class RequestTimingTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = create_member('alice')
+        cls.bob = create_member('bob')
+        Friendship.objects.create(user1=cls.alice, user2=cls.bob)
+        for index in range(3):
+            Post.objects.create(author=cls.bob, content=f'bob {index}')
+
+    def setUp(self):
+        reset_caches()
+        self.client = client_for(self.alice)
+
+    def test_header_counts_the_queries_of_the_request(self):
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(f'/api/users/{self.bob.id}/posts/')
+        self.assertEqual(response.status_code, 200)
+
+        timing = server_timing(response)
+        self.assertEqual(timing['queries'], len(captured.captured_queries))
+        self.assertEqual(timing['duplicate-queries'], 0)
+        for phase in ('db', 'serializer', 'render'):
+            self.assertGreater(timing[phase], 0)
+            self.assertLessEqual(timing[phase], timing['total'])
+
+    def test_async_views_are_measured(self):
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get('/api/posts/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(server_timing(response)['queries'], len(captured.captured_queries))
+
+    def test_log_record_carries_structured_fields(self):
+        with self.assertLogs('api.timing', 'INFO') as logs:
+            response = self.client.get('/api/auth/me/')
+        record = logs.records[0]
+        self.assertEqual(record.timing['path'], '/api/auth/me/')
+        self.assertEqual(record.timing['status'], response.status_code)
+        self.assertEqual(record.timing['queries'], server_timing(response)['queries'])
+        self.assertIn('queries=', record.getMessage())
+
+    @override_settings(REQUEST_TIMING_SAMPLE_RATE=0.0)
+    def test_unsampled_requests_are_left_alone(self):
+        with self.assertNoLogs('api.timing', 'INFO'):
+            response = self.client.get('/api/auth/me/')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('Server-Timing', response.headers)
+
+    @override_settings(REQUEST_TIMING_HEADER=False)
+    def test_header_is_opt_in(self):
+        with self.assertLogs('api.timing', 'INFO'):
+            response = self.client.get('/api/auth/me/')
+        self.assertNotIn('Server-Timing', response.headers)
@@ -0,0 +1,92 @@
+"""
+Badge counts (api/member_counters.py) follow the writes they count and are
+served by /api/me/counters/ from one primary-key read.
+"""
+from importlib import import_module
+from io import StringIO
+
+from django.apps import apps
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from api import conversations
+from api.models import FriendRequest, MemberCounters, Message
+from api.tests.utils import client_for, create_member
+
+backfill = import_module('api.migrations.0010_backfill_member_counters')
+
+
+class MemberCountersTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = create_member('alice')
+        cls.bob = create_member('bob')
+        cls.carol = create_member('carol')
+
+    def counters(self, member):
+        response = client_for(member).get('/api/me/counters/')
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_empty(self):
+        self.assertEqual(self.counters(self.alice), {'unread_messages': 0, 'pending_friend_requests': 0})
+
+    def test_messages(self):
+        for sender in (self.bob, self.bob, self.carol):
+            client_for(sender).post('/api/messages/', {'recipient_id': self.alice.id, 'content': 'Hi'}, format='json')
+        self.assertEqual(self.counters(self.alice)['unread_messages'], 3)
+        self.assertEqual(self.counters(self.bob)['unread_messages'], 0)
+
+        client_for(self.alice).get(f'/api/conversations/{self.bob.id}/')
+        self.assertEqual(self.counters(self.alice)['unread_messages'], 1)
+        # Already read: nothing left to count down
+        client_for(self.alice).get(f'/api/conversations/{self.bob.id}/')
+        self.assertEqual(self.counters(self.alice)['unread_messages'], 1)
+
+    def test_friend_requests(self):
+        bob_request = client_for(self.bob).post(f'/api/friends/request/{self.alice.id}/').json()
+        carol_request = client_for(self.carol).post(f'/api/friends/request/{self.alice.id}/').json()
+        self.assertEqual(self.counters(self.alice)['pending_friend_requests'], 2)
+
+        alice = client_for(self.alice)
+        self.assertEqual(alice.post(f'/api/friends/accept/{bob_request["id"]}/').status_code, 200)
+        self.assertEqual(alice.post(f'/api/friends/reject/{bob_request["id"]}/').status_code, 400)
+        self.assertEqual(self.counters(self.alice)['pending_friend_requests'], 1)
+        self.assertEqual(alice.post(f'/api/friends/reject/{carol_request["id"]}/').status_code, 200)
+        self.assertEqual(self.counters(self.alice)['pending_friend_requests'], 0)
+
+    def test_one_primary_key_read(self):
+        client = client_for(self.alice)
+        client.get('/api/me/counters/')
+        with CaptureQueriesContext(connection) as captured:
+            client.get('/api/me/counters/')
+        self.assertEqual(len(captured), 1)
+        self.assertIn('"api_membercounters"."member_id" =', captured[0]['sql'])
+
+    def expected_rows(self):
+        return {(self.alice.id, 2, 1), (self.bob.id, 1, 0)}
+
+    def create_unrecorded_state(self):
+        """Messages and a request written without touching the counters"""
+        for sender, recipient in [(self.bob, self.alice), (self.bob, self.alice), (self.alice, self.bob)]:
+            conversations.record_message(Message.objects.create(sender=sender, recipient=recipient, content='Hi'))
+        FriendRequest.objects.create(from_user=self.carol, to_user=self.alice)
+        FriendRequest.objects.create(from_user=self.alice, to_user=self.bob, status='rejected')
+        MemberCounters.objects.all().delete()
+
+    def stored_rows(self):
+        return set(MemberCounters.objects.values_list('member_id', 'unread_messages', 'pending_friend_requests'))
+
+    def test_backfill_migration(self):
+        self.create_unrecorded_state()
+        backfill.build_member_counters(apps, None)
+        self.assertEqual(self.stored_rows(), self.expected_rows())
+
+    def test_reconcile_repairs_drift(self):
+        self.create_unrecorded_state()
+        MemberCounters.objects.create(member=self.carol, unread_messages=5)
+        call_command('reconcile_counters', stdout=StringIO())
+        self.assertEqual(self.stored_rows(), self.expected_rows() | {(self.carol.id, 0, 0)})
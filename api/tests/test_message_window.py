@@ -0,0 +1,68 @@
+"""
+GET /api/conversations/{user_id}/ serves id-keyed windows of a thread
+(api.pagination.MessageWindowPagination).
+"""
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from api import conversations
+from api.models import Conversation, Message
+from api.tests.utils import client_for, create_member
+
+
+class MessageWindowTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = create_member('alice')
+        cls.bob = create_member('bob')
+        cls.messages = []
+        for index in range(30):
+            sender, recipient = (cls.alice, cls.bob) if index % 3 else (cls.bob, cls.alice)
+            message = Message.objects.create(sender=sender, recipient=recipient, content=str(index))
+            conversations.record_message(message)
+            cls.messages.append(message)
+
+    def window(self, **params):
+        return client_for(self.alice).get(f'/api/conversations/{self.bob.id}/', params)
+
+    def contents(self, response):
+        self.assertEqual(response.status_code, 200)
+        return [row['content'] for row in response.json()['results']]
+
+    def test_latest_window_oldest_first(self):
+        response = self.window(limit=6)
+        self.assertEqual(self.contents(response), [str(index) for index in range(24, 30)])
+        self.assertTrue(response.json()['has_more'])
+        self.assertEqual(len(self.window().json()['results']), 30)
+
+    def test_paging_back_through_history(self):
+        seen, before_id = [], None
+        while True:
+            response = self.window(limit=7, **({'before_id': before_id} if before_id else {}))
+            seen = self.contents(response) + seen
+            if not response.json()['has_more']:
+                break
+            before_id = response.json()['results'][0]['id']
+        self.assertEqual(seen, [str(index) for index in range(30)])
+
+    def test_after_id_fetches_only_newer_messages(self):
+        response = self.window(after_id=self.messages[24].id, limit=3)
+        self.assertEqual(self.contents(response), ['25', '26', '27'])
+        self.assertTrue(response.json()['has_more'])
+        self.assertEqual(self.contents(self.window(after_id=self.messages[27].id)), ['28', '29'])
+
+        self.window()
+        with CaptureQueriesContext(connection) as captured:
+            response = self.window(after_id=self.messages[-1].id)
+        self.assertEqual(response.json(), {'results': [], 'has_more': False})
+        self.assertFalse([query for query in captured if query['sql'].startswith('UPDATE')])
+
+    def test_invalid_parameters(self):
+        self.assertEqual(self.window(after_id='x').status_code, 400)
+        self.assertEqual(self.window(before_id='x').status_code, 400)
+        response = self.window(before_id=self.messages[20].id, after_id=self.messages[10].id)
+        self.assertEqual(response.status_code, 400)
+        # Rejected before anything is marked read
+        self.assertEqual(Conversation.objects.get().unread_count_for(self.alice), 10)
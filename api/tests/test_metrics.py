@@ -0,0 +1,81 @@
+"""
+Request metrics (api/metrics.py) are summed over every worker's shard, and
+the shards of workers that exited keep counting after they are retired.
+"""
+import re
+import shutil
+import subprocess
+import tempfile
+from pathlib import Path
+
+from django.test import SimpleTestCase, override_settings
+
+from api import metrics
+
+
+def sample(text, name, **labels):
+    pattern = re.escape(name + metrics._labels(**labels)) + r' (\S+)'
+    found = re.search(pattern, text)
+    return float(found[1]) if found else None
+
+
+class MetricsTests(SimpleTestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        settings_override = override_settings(METRICS_DIR=self.directory)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def test_requests_are_counted_per_route_and_status(self):
+        for _ in range(3):
+            self.client.get('/api/auth/me/')
+        self.client.get('/no-such-page')
+
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], metrics.CONTENT_TYPE)
+        text = response.content.decode()
+        self.assertEqual(sample(text, 'api_requests_total', route='me', method='GET', status='4xx'), 3)
+        self.assertEqual(sample(text, 'api_requests_total', route='other', method='GET', status='4xx'), 1)
+        self.assertEqual(sample(text, 'api_request_duration_seconds_count', route='me', method='GET'), 3)
+        self.assertEqual(
+            sample(text, 'api_request_duration_seconds_bucket', route='me', method='GET', le='+Inf'), 3,
+        )
+        self.assertIsNone(sample(text, 'api_request_duration_seconds_count', route='posts-list', method='GET'))
+
+    def test_histogram_buckets_are_cumulative(self):
+        metrics.observe('posts-list', 'GET', 200, 0.003)
+        metrics.observe('posts-list', 'GET', 200, 0.2)
+        metrics.observe('posts-list', 'GET', 500, 30)
+
+        text = metrics.render()
+        buckets = [
+            sample(text, 'api_request_duration_seconds_bucket', route='posts-list', method='GET', le=bound)
+            for bound in metrics.BUCKETS
+        ]
+        self.assertEqual(buckets[0], 1)
+        self.assertEqual(buckets[metrics.BUCKETS.index(0.25)], 2)
+        self.assertEqual(buckets[-1], 2)
+        self.assertEqual(sample(text, 'api_request_duration_seconds_count', route='posts-list', method='GET'), 3)
+        self.assertAlmostEqual(
+            sample(text, 'api_request_duration_seconds_sum', route='posts-list', method='GET'), 30.203,
+        )
+        self.assertEqual(sample(text, 'api_requests_total', route='posts-list', method='GET', status='5xx'), 1)
+
+    def test_shards_of_exited_workers_are_retired_not_lost(self):
+        metrics.observe('login', 'POST', 200, 0.01)
+        shard = next(Path(self.directory).glob('*.metrics'))
+        # A worker that has exited leaves its shard behind
+        exited = subprocess.Popen(['true'])
+        exited.wait()
+        shutil.copy(shard, Path(self.directory) / shard.name.replace(shard.name.split('-')[0], str(exited.pid)))
+
+        for _ in range(2):
+            text = metrics.render()
+            self.assertEqual(sample(text, 'api_requests_total', route='login', method='POST', status='2xx'), 2)
+        self.assertEqual(
+            sorted(path.name.split('-')[0] for path in Path(self.directory).glob('*.metrics')),
+            sorted([shard.name.split('-')[0], 'retired']),
+        )
@@ -0,0 +1,59 @@
+"""
+Post.likes_count and Post.comments_count follow likes and comments as they
+are written, never go below zero, and are repaired by reconcile_counters.
+"""
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from api.models import Like, Post
+from api.tests.utils import client_for, create_member
+
+
+class PostCountersTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = create_member('alice')
+        cls.bob = create_member('bob')
+        cls.post = Post.objects.create(author=cls.bob, content='Hello')
+
+    def like(self, member):
+        return client_for(member).post(f'/api/posts/{self.post.id}/like/').json()
+
+    def comment(self, member):
+        return client_for(member).post(f'/api/posts/{self.post.id}/comments/', {'content': 'Hi'}, format='json').json()
+
+    def counts(self):
+        self.post.refresh_from_db()
+        return self.post.likes_count, self.post.comments_count
+
+    def test_writes_move_the_counts(self):
+        self.assertEqual(self.like(self.alice), {'is_liked': True, 'likes_count': 1})
+        self.assertEqual(self.like(self.bob), {'is_liked': True, 'likes_count': 2})
+        self.assertEqual(self.like(self.alice), {'is_liked': False, 'likes_count': 1})
+
+        comment = self.comment(self.alice)
+        self.comment(self.bob)
+        self.assertEqual(client_for(self.alice).delete(f'/api/comments/{comment["id"]}/').status_code, 204)
+        self.assertEqual(self.counts(), (1, 1))
+
+        data = client_for(self.alice).get(f'/api/posts/{self.post.id}/').json()
+        self.assertEqual((data['likes_count'], data['comments_count'], data['is_liked']), (1, 1, False))
+
+    def test_drifted_counts_stop_at_zero(self):
+        self.like(self.alice)
+        comment = self.comment(self.alice)
+        Post.objects.filter(id=self.post.id).update(likes_count=0, comments_count=0)
+
+        self.assertEqual(self.like(self.alice), {'is_liked': False, 'likes_count': 0})
+        client_for(self.alice).delete(f'/api/comments/{comment["id"]}/')
+        self.assertEqual(self.counts(), (0, 0))
+
+    def test_reconcile_repairs_drift(self):
+        Like.objects.create(post=self.post, user=self.alice)
+        self.comment(self.bob)
+        Post.objects.filter(id=self.post.id).update(likes_count=9, comments_count=0)
+        call_command('reconcile_counters', stdout=StringIO())
+        self.assertEqual(self.counts(), (1, 1))
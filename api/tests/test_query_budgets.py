@@ -0,0 +1,203 @@
+"""
+Query-budget tests.
+
+BUDGETS holds the most SQL queries each endpoint may issue, measured with
+cold per-worker caches (authenticated members, friend sets, responses) so
+that each figure is the worst case a request can hit. Lower a budget when
+an endpoint gets cheaper; raising one needs a reason in the commit.
+
+QueryCountGrowthTests check that the count does not depend on the size of
+the result: an N+1 query shows up as a count that grows with the page.
+
+Savepoint statements are not counted. They come from the test case's
+outer transaction; in production the views' atomic blocks open real
+transactions, which the debug cursor never sees.
+"""
+from django.db import connection, transaction
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve
+from rest_framework.test import APIClient
+
+from api import conversations
+from api.management.commands.bench_endpoints import api_routes
+from api.models import Comment, FriendRequest, Friendship, Like, Member, Message, Post
+from api.tests.utils import PASSWORD_HASH, client_for, create_member, reset_caches
+
+# (method, path, data, most queries allowed); paths are formatted with the
+# fixture ids from QueryBudgetTests.setUpTestData
+BUDGETS = [
+    ('post', '/api/auth/register/', {
+        'username': 'erin', 'email': 'erin@example.com', 'password': 'password123',
+        'first_name': 'Erin', 'last_name': 'Test',
+    }, 4),
+    ('post', '/api/auth/login/', {'username': 'alice', 'password': 'password123'}, 2),
+    ('post', '/api/auth/logout/', None, 1),
+    ('get', '/api/auth/me/', None, 1),
+    ('get', '/api/me/counters/', None, 2),
+    ('get', '/api/users/', {'limit': 20}, 2),
+    ('get', '/api/users/', {'search': 'car'}, 3),
+    ('get', '/api/users/{dave}/', None, 6),
+    ('put', '/api/users/{alice}/', {'first_name': 'Alicia'}, 4),
+    ('get', '/api/posts/', {'limit': 20}, 4),
+    ('post', '/api/posts/', {'content': 'Hello'}, 3),
+    ('get', '/api/posts/{post}/', None, 3),
+    ('delete', '/api/posts/{own_post}/', None, 7),
+    ('get', '/api/users/{bob}/posts/', {'limit': 20}, 3),
+    ('get', '/api/posts/{post}/comments/', None, 3),
+    ('post', '/api/posts/{post}/comments/', {'content': 'Hi'}, 4),
+    ('delete', '/api/comments/{comment}/', None, 6),
+    ('post', '/api/posts/{post}/like/', None, 7),
+    ('get', '/api/friends/', None, 3),
+    ('get', '/api/friends/requests/', None, 2),
+    ('get', '/api/friends/sent/', None, 2),
+    ('post', '/api/friends/request/{frank}/', None, 7),
+    ('post', '/api/friends/accept/{request_from_dave}/', None, 8),
+    ('post', '/api/friends/reject/{request_from_dave}/', None, 6),
+    ('delete', '/api/friends/{bob}/', None, 5),
+    ('get', '/api/conversations/', None, 2),
+    ('get', '/api/conversations/{bob}/', {'limit': 50}, 7),
+    ('post', '/api/messages/', {'recipient_id': '{dave}', 'content': 'Hi'}, 8),
+    ('post', '/api/batch/', {'requests': ['auth/me/', 'posts/?limit=20', 'conversations/', 'friends/requests/']}, 6),
+]
+
+SAVEPOINT_STATEMENTS = ('SAVEPOINT', 'RELEASE SAVEPOINT', 'ROLLBACK TO SAVEPOINT')
+
+
+def count_queries(client, method, path, data=None):
+    reset_caches()
+    with CaptureQueriesContext(connection) as captured:
+        response = getattr(client, method)(path, data, format='json')
+    queries = [query for query in captured.captured_queries if not query['sql'].startswith(SAVEPOINT_STATEMENTS)]
+    return response, len(queries)
+
+
+class QueryBudgetTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = create_member('alice')
+        cls.bob = create_member('bob')
+        cls.carol = create_member('carol')
+        cls.dave = create_member('dave')
+        cls.frank = create_member('frank')
+
+        Friendship.objects.create(user1=cls.alice, user2=cls.bob)
+        Friendship.objects.create(user1=cls.alice, user2=cls.carol)
+        cls.request_from_dave = FriendRequest.objects.create(from_user=cls.dave, to_user=cls.alice)
+        FriendRequest.objects.create(from_user=cls.alice, to_user=cls.carol, status='rejected')
+
+        for author in (cls.alice, cls.bob, cls.carol, cls.dave):
+            for index in range(3):
+                Post.objects.create(author=author, content=f'{author.username} {index}')
+        cls.post = Post.objects.filter(author=cls.bob).first()
+        cls.own_post = Post.objects.filter(author=cls.alice).first()
+        cls.comment = Comment.objects.create(post=cls.post, author=cls.alice, content='Nice')
+        Like.objects.create(post=cls.post, user=cls.carol)
+        Post.objects.filter(id=cls.post.id).update(comments_count=1, likes_count=1)
+
+        for sender, recipient in [(cls.alice, cls.bob), (cls.bob, cls.alice), (cls.carol, cls.alice)]:
+            conversations.record_message(Message.objects.create(sender=sender, recipient=recipient, content='Hello'))
+
+    def fixture_ids(self):
+        return {
+            name: getattr(self, name).id
+            for name in ('alice', 'bob', 'carol', 'dave', 'frank', 'post', 'own_post', 'comment', 'request_from_dave')
+        }
+
+    def test_every_endpoint_stays_within_budget(self):
+        ids = self.fixture_ids()
+        for method, path, data, budget in BUDGETS:
+            path = path.format(**ids)
+            if data:
+                data = {key: value.format(**ids) if isinstance(value, str) else value for key, value in data.items()}
+            with self.subTest(method=method, path=path, data=data), transaction.atomic():
+                client = APIClient()
+                client.cookies['session_id'] = str(self.alice.id)
+                response, queries = count_queries(client, method, path, data)
+                self.assertLess(response.status_code, 400, response.content)
+                self.assertLessEqual(queries, budget)
+                transaction.set_rollback(True)
+
+    def test_every_route_has_a_budget(self):
+        ids = self.fixture_ids()
+        budgeted = {(method.upper(), resolve(path.format(**ids)).url_name) for method, path, _, _ in BUDGETS}
+        self.assertEqual(api_routes() - budgeted, set())
+
+
+class QueryCountGrowthTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = create_member('alice')
+
+    def setUp(self):
+        self.client = client_for(self.alice)
+
+    def create_members(self, count):
+        start = Member.objects.count()
+        return Member.objects.bulk_create([
+            Member(
+                username=f'member{index}', email=f'member{index}@example.com', password=PASSWORD_HASH,
+                first_name='Member', last_name=f'Test{index}',
+            )
+            for index in range(start, start + count)
+        ])
+
+    def befriend(self, members):
+        Friendship.objects.bulk_create([
+            Friendship(user1_id=min(self.alice.id, member.id), user2_id=max(self.alice.id, member.id))
+            for member in members
+        ])
+
+    def assertFlat(self, path, data, grow, small, large, size):
+        grow(small)
+        response, queries_small = count_queries(self.client, 'get', path, data)
+        self.assertEqual(size(response.data), small)
+
+        grow(large - small)
+        response, queries_large = count_queries(self.client, 'get', path, data)
+        self.assertEqual(size(response.data), large)
+        self.assertEqual(queries_large, queries_small)
+
+    def test_feed(self):
+        friend = create_member('bob')
+        self.befriend([friend])
+
+        def grow(count):
+            Post.objects.bulk_create([Post(author=friend, content=f'post {index}') for index in range(count)])
+
+        self.assertFlat('/api/posts/', {'limit': 100}, grow, 5, 50, lambda data: len(data['results']))
+
+    def test_post_comments(self):
+        post = Post.objects.create(author=self.alice, content='post')
+
+        def grow(count):
+            Comment.objects.bulk_create([
+                Comment(post=post, author=member, content='Hi') for member in self.create_members(count)
+            ])
+
+        self.assertFlat(f'/api/posts/{post.id}/comments/', None, grow, 2, 40, len)
+
+    def test_inbox(self):
+        def grow(count):
+            for partner in self.create_members(count):
+                conversations.record_message(
+                    Message.objects.create(sender=partner, recipient=self.alice, content='Hello')
+                )
+
+        self.assertFlat('/api/conversations/', {'limit': 100}, grow, 2, 40, lambda data: len(data['results']))
+
+    def test_friends_list(self):
+        def grow(count):
+            self.befriend(self.create_members(count))
+
+        self.assertFlat('/api/friends/', None, grow, 3, 300, len)
+
+    def test_incoming_friend_requests(self):
+        def grow(count):
+            FriendRequest.objects.bulk_create([
+                FriendRequest(from_user=member, to_user=self.alice) for member in self.create_members(count)
+            ])
+
+        self.assertFlat('/api/friends/requests/', None, grow, 2, 30, len)
@@ -0,0 +1,173 @@
+"""
+Query-plan regression tests.
+
+Every endpoint is called with CaptureQueriesContext and each SELECT, UPDATE
+and DELETE it issued is run again under EXPLAIN QUERY PLAN. A plan step that
+scans a whole table (`SCAN <table>` with no index) fails the test, so a
+query that stops matching an index is caught before it reaches a large
+database. Ordered index walks (`SCAN <table> USING INDEX`) are allowed:
+every such query in the API is bounded by a LIMIT. Tests may also name the
+indexes an endpoint is expected to use, which guards the composite indexes
+that exist to avoid sorting (`USE TEMP B-TREE`).
+"""
+import re
+
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from api import conversations, search
+from api.models import Comment, FriendRequest, Friendship, Like, Message, Post
+from api.tests.utils import client_for, create_member, reset_caches
+
+EXPLAINED_STATEMENTS = ('SELECT', 'UPDATE', 'DELETE')
+
+FULL_SCAN = re.compile(r'^SCAN (\w+)$')
+
+
+class QueryPlanTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = create_member('alice')
+        cls.bob = create_member('bob')
+        cls.carol = create_member('carol')
+        cls.dave = create_member('dave')
+
+        Friendship.objects.create(user1=cls.alice, user2=cls.bob)
+        Friendship.objects.create(user1=cls.alice, user2=cls.carol)
+        cls.request_from_dave = FriendRequest.objects.create(from_user=cls.dave, to_user=cls.alice)
+        FriendRequest.objects.create(from_user=cls.bob, to_user=cls.carol)
+
+        for author in (cls.alice, cls.bob, cls.carol, cls.dave):
+            for index in range(3):
+                Post.objects.create(author=author, content=f'{author.username} {index}')
+        cls.post = Post.objects.filter(author=cls.bob).first()
+        cls.comment = Comment.objects.create(post=cls.post, author=cls.alice, content='Nice')
+        Like.objects.create(post=cls.post, user=cls.carol)
+        Post.objects.filter(id=cls.post.id).update(comments_count=1, likes_count=1)
+
+        for sender, recipient in [(cls.alice, cls.bob), (cls.bob, cls.alice), (cls.carol, cls.alice)]:
+            conversations.record_message(
+                Message.objects.create(sender=sender, recipient=recipient, content='Hello')
+            )
+
+        # Probe FTS5 once up front: the one-off sqlite_master lookup is not
+        # part of any request's steady-state plan
+        search.fts_available()
+
+    def setUp(self):
+        reset_caches()
+        self.client = client_for(self.alice)
+
+    def assertIndexed(self, method, path, data=None, status_code=None, uses=()):
+        with CaptureQueriesContext(connection) as captured:
+            response = getattr(self.client, method)(path, data, format='json')
+        if status_code is not None:
+            self.assertEqual(response.status_code, status_code, response.content)
+        else:
+            self.assertLess(response.status_code, 400, response.content)
+
+        explained = 0
+        plan = []
+        with connection.cursor() as cursor:
+            for query in captured.captured_queries:
+                sql = query['sql']
+                if not sql.lstrip().upper().startswith(EXPLAINED_STATEMENTS):
+                    continue
+                cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+                for row in cursor.fetchall():
+                    detail = row[-1]
+                    plan.append(detail)
+                    self.assertIsNone(
+                        FULL_SCAN.match(detail),
+                        f'{method.upper()} {path} scans a whole table ({detail}):\n{sql}',
+                    )
+                explained += 1
+        self.assertGreater(explained, 0, f'{method.upper()} {path} issued no queries to explain')
+        for index in uses:
+            self.assertTrue(
+                any(index in detail for detail in plan),
+                f'{method.upper()} {path} does not use {index}:\n' + '\n'.join(plan),
+            )
+
+    def test_me(self):
+        self.assertIndexed('get', '/api/auth/me/')
+
+    def test_user_list(self):
+        self.assertIndexed('get', '/api/users/', {'limit': 2}, uses=['member_recent_idx'])
+
+    def test_user_search(self):
+        self.assertIndexed('get', '/api/users/', {'search': 'car'})
+
+    def test_user_detail(self):
+        self.assertIndexed('get', f'/api/users/{self.dave.id}/', uses=['friendrequest_outgoing_idx'])
+
+    def test_profile_update(self):
+        self.assertIndexed('put', f'/api/users/{self.alice.id}/', {'first_name': 'Alicia'})
+
+    def test_feed(self):
+        self.assertIndexed('get', '/api/posts/', {'limit': 2}, uses=['post_author_recent_idx'])
+
+    @override_settings(FEED_FANOUT='write')
+    def test_materialized_feed(self):
+        self.assertIndexed('get', '/api/posts/', {'limit': 2}, uses=['timeline_owner_recent_idx'])
+
+    @override_settings(FEED_FANOUT='write')
+    def test_create_post_with_fan_out(self):
+        self.assertIndexed('post', '/api/posts/', {'content': 'Hello'}, status_code=201)
+
+    def test_post_detail(self):
+        self.assertIndexed('get', f'/api/posts/{self.post.id}/')
+
+    def test_user_posts(self):
+        self.assertIndexed('get', f'/api/users/{self.bob.id}/posts/', {'limit': 2}, uses=['post_author_recent_idx'])
+
+    def test_comments(self):
+        self.assertIndexed('get', f'/api/posts/{self.post.id}/comments/', uses=['comment_post_created_idx'])
+
+    def test_create_comment(self):
+        self.assertIndexed('post', f'/api/posts/{self.post.id}/comments/', {'content': 'Hi'}, status_code=201)
+
+    def test_delete_comment(self):
+        self.assertIndexed('delete', f'/api/comments/{self.comment.id}/')
+
+    def test_like_toggle(self):
+        self.assertIndexed('post', f'/api/posts/{self.post.id}/like/')
+        self.assertIndexed('post', f'/api/posts/{self.post.id}/like/')
+
+    def test_friends(self):
+        self.assertIndexed('get', '/api/friends/', uses=['friendship_user2_idx'])
+
+    def test_incoming_requests(self):
+        self.assertIndexed('get', '/api/friends/requests/', uses=['friendrequest_incoming_idx'])
+
+    def test_sent_requests(self):
+        self.assertIndexed('get', '/api/friends/sent/', uses=['friendrequest_outgoing_idx'])
+
+    def test_send_friend_request(self):
+        FriendRequest.objects.all().delete()
+        self.assertIndexed('post', f'/api/friends/request/{self.dave.id}/', status_code=201)
+
+    @override_settings(FEED_FANOUT='write')
+    def test_accept_friend_request(self):
+        self.assertIndexed('post', f'/api/friends/accept/{self.request_from_dave.id}/')
+
+    def test_reject_friend_request(self):
+        self.assertIndexed('post', f'/api/friends/reject/{self.request_from_dave.id}/')
+
+    @override_settings(FEED_FANOUT='write')
+    def test_remove_friend(self):
+        self.assertIndexed('delete', f'/api/friends/{self.bob.id}/')
+
+    def test_conversations(self):
+        self.assertIndexed('get', '/api/conversations/', uses=['conversation_user1_recent_idx', 'conversation_user2_recent_idx'])
+
+    def test_conversation_messages(self):
+        self.assertIndexed('get', f'/api/conversations/{self.bob.id}/', {'limit': 1}, uses=['message_pair_idx'])
+        latest = Message.objects.filter(recipient=self.alice).order_by('-id').first()
+        self.assertIndexed('get', f'/api/conversations/{self.bob.id}/', {'before_id': latest.id})
+        self.assertIndexed('get', f'/api/conversations/{self.bob.id}/', {'after_id': 0})
+
+    def test_send_message(self):
+        self.assertIndexed('post', '/api/messages/', {'recipient_id': self.dave.id, 'content': 'Hi'}, status_code=201)
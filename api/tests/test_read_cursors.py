@@ -0,0 +1,135 @@
+"""
+Reading a thread moves the reader's cursor in its Conversation row
+(api.conversations.mark_read); message rows are never written, and a
+thread that is already read is served without any write. Migration 0012
+builds the cursors from the old per-message read flags.
+"""
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+
+from api import conversations
+from api.models import Conversation, MemberCounters, Message
+from api.tests.utils import client_for, create_member
+
+WRITES = ('INSERT', 'UPDATE', 'DELETE')
+
+
+class ReadCursorTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = create_member('alice')
+        cls.bob = create_member('bob')
+        cls.messages = []
+        for sender, recipient in [(cls.alice, cls.bob)] + [(cls.bob, cls.alice)] * 5:
+            message = Message.objects.create(sender=sender, recipient=recipient, content='Hi')
+            conversations.record_message(message)
+            cls.messages.append(message)
+
+    def thread(self):
+        return Conversation.objects.get()
+
+    def read(self, member, partner, **params):
+        response = client_for(member).get(f'/api/conversations/{partner.id}/', params)
+        self.assertEqual(response.status_code, 200)
+        return response.data['results']
+
+    def test_reading_moves_the_cursor(self):
+        results = self.read(self.alice, self.bob, limit=2)
+        self.assertTrue(all(row['is_read'] for row in results))
+        thread = self.thread()
+        self.assertEqual(thread.read_cursors()[self.alice.id], self.messages[-1].id)
+        self.assertEqual(thread.unread_count_for(self.alice), 0)
+        self.assertEqual(MemberCounters.objects.get(member=self.alice).unread_messages, 0)
+
+        # Everything up to the cursor is read, including history not yet shown
+        older = self.read(self.alice, self.bob, before_id=results[0]['id'])
+        self.assertTrue(all(row['is_read'] for row in older if row['recipient']['id'] == self.alice.id))
+
+    def test_history_does_not_move_the_cursor(self):
+        self.read(self.alice, self.bob, before_id=self.messages[3].id)
+        thread = self.thread()
+        self.assertEqual(thread.read_cursors()[self.alice.id], self.messages[2].id)
+        self.assertEqual(thread.unread_count_for(self.alice), 3)
+        self.assertEqual(MemberCounters.objects.get(member=self.alice).unread_messages, 3)
+
+        self.read(self.alice, self.bob, before_id=self.messages[2].id)
+        self.assertEqual(self.thread().read_cursors()[self.alice.id], self.messages[2].id)
+
+    def test_sender_sees_the_partners_cursor(self):
+        sent = self.read(self.alice, self.bob)[0]
+        self.assertEqual(sent['id'], self.messages[0].id)
+        self.assertFalse(sent['is_read'])
+
+        self.read(self.bob, self.alice)
+        self.assertTrue(self.read(self.alice, self.bob)[0]['is_read'])
+        inbox = client_for(self.alice).get('/api/conversations/').data['results']
+        self.assertTrue(inbox[0]['last_message']['is_read'])
+
+    def test_reading_a_read_thread_writes_nothing(self):
+        client = client_for(self.alice)
+        client.get(f'/api/conversations/{self.bob.id}/')
+        with CaptureQueriesContext(connection) as captured:
+            response = client.get(f'/api/conversations/{self.bob.id}/')
+        self.assertEqual(len(response.data['results']), len(self.messages))
+        self.assertEqual([query['sql'] for query in captured if query['sql'].startswith(WRITES)], [])
+
+
+class BackfillMigrationTests(TransactionTestCase):
+    """Migration 0012 turns Message.is_read into cursors, and back"""
+
+    before = [('api', '0011_conversation_read_cursors')]
+    after = [('api', '0012_backfill_read_cursors')]
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def tearDown(self):
+        self.migrate(MigrationExecutor(connection).loader.graph.leaf_nodes())
+
+    def test_backfill_and_reverse(self):
+        # Conversation rows and counters come from the earlier backfills
+        apps = self.migrate([('api', '0004_conversation')])
+        Member = apps.get_model('api', 'Member')
+        Message = apps.get_model('api', 'Message')
+        alice, bob, carol = (
+            Member.objects.create(username=name, email=f'{name}@example.com', first_name=name, last_name='Test').id
+            for name in ('alice', 'bob', 'carol')
+        )
+        ids = {}
+        for content, sender, recipient, is_read in [
+            ('b1', bob, alice, True), ('a1', alice, bob, True), ('b2', bob, alice, False),
+            ('b3', bob, alice, True), ('a2', alice, bob, True), ('b4', bob, alice, False), ('c1', carol, alice, True),
+        ]:
+            ids[content] = Message.objects.create(
+                sender_id=sender, recipient_id=recipient, content=content, is_read=is_read,
+            ).id
+
+        apps = self.migrate(self.before)
+        MemberCounters = apps.get_model('api', 'MemberCounters')
+        self.assertEqual(MemberCounters.objects.get(member_id=alice).unread_messages, 2)
+        # Drift for the upsert to repair: a missing row and a wrong one
+        MemberCounters.objects.filter(member_id=alice).delete()
+        MemberCounters.objects.create(member_id=carol, unread_messages=5)
+
+        apps = self.migrate(self.after)
+        Conversation = apps.get_model('api', 'Conversation')
+        rows = Conversation.objects.order_by('user2_id').values_list(
+            'user1_last_read_message_id', 'user1_unread_count', 'user2_last_read_message_id', 'user2_unread_count',
+        )
+        # Alice stops before b2, her first unread message; b3, read out of
+        # order after it, counts as unread again
+        self.assertEqual(list(rows), [(ids['b2'] - 1, 3, ids['a2'], 0), (ids['c1'], 0, 0, 0)])
+        counters = apps.get_model('api', 'MemberCounters').objects.values_list('member_id', 'unread_messages')
+        self.assertEqual(sorted(counters), [(alice, 3), (carol, 0)])
+
+        # Alice reads the rest before the migration is undone
+        Conversation.objects.filter(user2_id=bob).update(user1_last_read_message_id=ids['b4'])
+        apps = self.migrate(self.before)
+        unread = apps.get_model('api', 'Message').objects.filter(is_read=False)
+        self.assertEqual(list(unread), [])
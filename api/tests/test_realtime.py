@@ -0,0 +1,109 @@
+"""
+Pushed messages (api/realtime.py): a message sent over the API reaches the
+recipient's WebSocket, and a publish in one worker reaches the sockets held
+by another.
+"""
+import asyncio
+import json
+import runpy
+import socket
+import tempfile
+import threading
+from pathlib import Path
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.test import SimpleTestCase, TransactionTestCase
+
+from api.management.commands.realtime_loadtest import FakeSocket
+from api.realtime import UnixDatagramBroker
+from api.tests.utils import client_for, create_member
+from config.asgi import application
+
+
+class WebSocketTests(TransactionTestCase):
+
+    def test_sent_message_is_pushed_to_the_recipient(self):
+        alice, bob = create_member('alice'), create_member('bob')
+
+        def send():
+            return client_for(alice).post('/api/messages/', {'recipient_id': bob.id, 'content': 'Hi'}, format='json')
+
+        async def deliver():
+            socket = FakeSocket(bob.id)
+            scope = {'type': 'websocket', 'path': '/api/ws/', 'headers': [(b'cookie', f'session_id={bob.id}'.encode())]}
+            connection = asyncio.create_task(application(scope, socket.receive, socket.send))
+            socket.incoming.put_nowait({'type': 'websocket.connect'})
+            await asyncio.wait_for(socket.accepted.wait(), 2)
+            self.assertEqual((await sync_to_async(send)()).status_code, 201)
+            for _ in range(200):
+                if socket.frames:
+                    break
+                await asyncio.sleep(0.01)
+            socket.incoming.put_nowait({'type': 'websocket.disconnect'})
+            await connection
+            return [json.loads(text) for _, text in socket.frames]
+
+        frames = asyncio.run(deliver())
+        self.assertEqual([(frame['type'], frame['data']['content']) for frame in frames], [('message', 'Hi')])
+
+
+class UnixDatagramBrokerTests(SimpleTestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def subscribe(self, broker, member_id):
+        received = []
+        delivered = threading.Event()
+
+        def callback(payload):
+            received.append(payload)
+            delivered.set()
+
+        broker.subscribe(member_id, callback)
+        return received, delivered
+
+    def test_brokers_deliver_to_each_other(self):
+        first, second = UnixDatagramBroker(self.directory), UnixDatagramBroker(self.directory)
+        first_received, first_delivered = self.subscribe(first, 1)
+        second_received, second_delivered = self.subscribe(second, 2)
+
+        first.publish(2, 'to two')
+        second.publish(1, 'to one')
+        self.assertTrue(second_delivered.wait(2))
+        self.assertTrue(first_delivered.wait(2))
+        self.assertEqual((first_received, second_received), (['to one'], ['to two']))
+
+    def test_publisher_without_subscriptions_reaches_subscribers(self):
+        subscriber = UnixDatagramBroker(self.directory)
+        received, delivered = self.subscribe(subscriber, 7)
+        UnixDatagramBroker(self.directory).publish(7, 'hello')
+        self.assertTrue(delivered.wait(2))
+        self.assertEqual(received, ['hello'])
+
+    def test_listener_survives_bad_datagrams_and_failing_callbacks(self):
+        broker = UnixDatagramBroker(self.directory)
+        received, delivered = self.subscribe(broker, 7)
+
+        def fail(payload):
+            raise RuntimeError(payload)
+
+        broker.subscribe(8, fail)
+        path = str(next(Path(self.directory).glob('*.sock')))
+        with self.assertLogs('api.realtime', 'ERROR') as logs:
+            broker.publish(8, 'boom')
+            with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as sender:
+                for datagram in (b'not json', b'7', b'[7]'):
+                    sender.sendto(datagram, path)
+            # Datagrams are handled in order, so this one comes last
+            broker.publish(7, 'hello')
+            self.assertTrue(delivered.wait(2))
+        self.assertEqual(received, ['hello'])
+        self.assertEqual(len(logs.records), 1)
+        self.assertIn('member 8', logs.output[0])
+
+    def test_asgi_workers_share_the_broker(self):
+        config = runpy.run_path(str(Path(settings.BASE_DIR) / 'gunicorn.asgi.conf.py'))
+        if config['workers'] > 1:
+            self.assertIn('REALTIME_BROKER=api.realtime.UnixDatagramBroker', config['raw_env'])
@@ -0,0 +1,65 @@
+"""
+Cached GET bodies (api/response_cache.py) are reused until a write the body
+depends on moves its version counters, on either cache backend.
+"""
+import tempfile
+
+from django.conf import settings
+from django.test import TestCase, override_settings
+
+from api import response_cache
+from api.models import Friendship, Post
+from api.tests.utils import client_for, create_member, reset_caches
+
+
+class ResponseCacheTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = create_member('alice')
+        cls.bob = create_member('bob')
+        Friendship.objects.create(user1=cls.alice, user2=cls.bob)
+        cls.post = Post.objects.create(author=cls.bob, content='Hello')
+
+    def setUp(self):
+        reset_caches()
+        self.client = client_for(self.alice)
+
+    def get(self, path):
+        response = self.client.get(path)
+        self.assertEqual(response.status_code, 200, path)
+        return response.data
+
+    def assertServesFreshBodies(self):
+        post_path, posts_path = f'/api/posts/{self.post.id}/', f'/api/users/{self.bob.id}/posts/'
+        hits = response_cache.stats()['post-detail']['hits']
+        self.assertEqual(self.get(post_path), self.get(post_path))
+        self.assertEqual(response_cache.stats()['post-detail']['hits'], hits + 1)
+
+        self.client.post(f'/api/posts/{self.post.id}/like/')
+        self.assertTrue(self.get(post_path)['is_liked'])
+        client_for(self.bob).put(f'/api/users/{self.bob.id}/', {'first_name': 'Robert'}, format='json')
+        self.assertEqual(self.get(post_path)['author']['first_name'], 'Robert')
+        self.assertEqual(self.get(posts_path)['results'][0]['author']['first_name'], 'Robert')
+        self.assertEqual(self.get('/api/friends/')[0]['first_name'], 'Robert')
+        self.client.post(f'/api/posts/{self.post.id}/comments/', {'content': 'Hi'}, format='json')
+        self.assertEqual(self.get(post_path)['comments_count'], 1)
+        self.assertEqual(self.get(posts_path)['results'][0]['comments_count'], 1)
+
+        self.assertTrue(self.get(f'/api/users/{self.bob.id}/')['is_friend'])
+        self.client.delete(f'/api/friends/{self.bob.id}/')
+        self.assertFalse(self.get(f'/api/users/{self.bob.id}/')['is_friend'])
+        self.assertEqual(self.get('/api/friends/'), [])
+        client_for(self.bob).delete(post_path)
+        self.assertEqual(self.client.get(post_path).status_code, 404)
+
+    def test_local_memory(self):
+        self.assertServesFreshBodies()
+
+    def test_files(self):
+        caches_setting = {
+            **settings.CACHES,
+            settings.RESPONSE_CACHE_ALIAS: {**settings.RESPONSE_CACHE_BACKENDS['file'], 'LOCATION': tempfile.mkdtemp()},
+        }
+        with override_settings(CACHES=caches_setting):
+            self.assertServesFreshBodies()
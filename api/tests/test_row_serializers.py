@@ -0,0 +1,88 @@
+"""
+Row serializers (api/row_serializers.py) must render exactly the JSON of
+the DRF serializers they replace.
+"""
+from datetime import datetime, timezone as dt_timezone
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from api import conversations
+from api.models import Conversation, FriendRequest, Member, Message
+from api.row_serializers import friend_request_rows, member_rows, member_short_rows, message_rows
+from api.serializers import FriendRequestSerializer, MemberSerializer, MemberShortSerializer, MessageSerializer
+
+
+def render(data):
+    return JSONRenderer().render(data)
+
+
+class RowSerializerTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = Member.objects.create(
+            username='alice', email='alice@example.com', password='x', first_name='Алиса', last_name='Test',
+            bio='Says "hi" \\ <b>', avatar_url='https://example.com/a.png',
+        )
+        cls.bob = Member.objects.create(
+            username='bob', email='bob@example.com', password='x', first_name='Bob', last_name='',
+        )
+        # Microseconds and a whole second both keep DRF's ISO 8601 form
+        Member.objects.filter(id=cls.bob.id).update(created_at=datetime(2024, 2, 29, 23, 59, 59, tzinfo=dt_timezone.utc))
+        messages = [
+            Message.objects.create(sender=sender, recipient=recipient, content=f'Привет {index} ✓')
+            for index, (sender, recipient) in enumerate([(cls.alice, cls.bob), (cls.bob, cls.alice)] * 3)
+        ]
+        for message in messages:
+            conversations.record_message(message)
+        # Each side has read the first message it received
+        cls.thread = Conversation.objects.get()
+        setattr(cls.thread, Conversation.last_read_field(cls.bob.id, cls.alice.id), messages[0].id)
+        setattr(cls.thread, Conversation.last_read_field(cls.alice.id, cls.bob.id), messages[1].id)
+        cls.thread.save()
+        FriendRequest.objects.create(from_user=cls.alice, to_user=cls.bob)
+        FriendRequest.objects.create(from_user=cls.bob, to_user=cls.alice, status='rejected')
+
+    def assertSameJSON(self, serializer_class, rows, queryset):
+        instances = list(queryset.order_by('id'))
+        values = list(queryset.order_by('id').values(*rows.columns))
+        self.assertEqual(len(values), len(instances))
+        self.assertEqual(render(rows.many(values)), render(serializer_class(instances, many=True).data))
+        self.assertEqual(render(rows.to_representation(values[0])), render(serializer_class(instances[0]).data))
+
+    def test_member(self):
+        self.assertSameJSON(MemberSerializer, member_rows, Member.objects.all())
+
+    def test_member_short(self):
+        self.assertSameJSON(MemberShortSerializer, member_short_rows, Member.objects.all())
+
+    def test_message(self):
+        self.assertSameJSON(
+            MessageSerializer, message_rows,
+            Message.objects.select_related('sender', 'recipient').with_read_state(self.thread.read_cursors()),
+        )
+
+    def test_friend_request(self):
+        self.assertSameJSON(
+            FriendRequestSerializer, friend_request_rows, FriendRequest.objects.select_related('from_user', 'to_user'),
+        )
+
+    @override_settings(TIME_ZONE='Europe/Moscow')
+    def test_datetimes_follow_the_current_timezone(self):
+        with timezone.override('Asia/Kolkata'):
+            self.assertSameJSON(MemberSerializer, member_rows, Member.objects.all())
+
+    def test_message_window_matches_the_serializer_after_marking_read(self):
+        client = APIClient()
+        client.cookies['session_id'] = str(self.alice.id)
+        response = client.get(f'/api/conversations/{self.bob.id}/')
+        self.assertEqual(response.status_code, 200)
+
+        self.thread.refresh_from_db()
+        self.assertEqual(self.thread.unread_count_for(self.alice), 0)
+        messages = Message.objects.select_related('sender', 'recipient').with_read_state(self.thread.read_cursors())
+        self.assertFalse(messages.filter(recipient=self.alice, is_read=False).exists())
+        self.assertEqual(render(response.data['results']), render(MessageSerializer(messages.order_by('id'), many=True).data))
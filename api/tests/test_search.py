@@ -0,0 +1,70 @@
+"""
+Member search (api/search.py): ranked prefix matches from the FTS5 index,
+which triggers keep in step with api_member.
+"""
+from django.test import TestCase
+
+from api import search
+from api.models import Member
+from api.tests.utils import client_for, create_member
+
+MEMBERS = [
+    ('ivan_p', 'Иван', 'Петров'),
+    ('petya', 'Пётр', 'Иванов'),
+    ('zed', 'Anna', 'Smith'),
+    ('annabel', 'Bel', 'Jones'),
+    ('anna', 'Anna', 'Anna'),
+]
+
+
+class MemberSearchTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.searcher = create_member('searcher')
+        for username, first_name, last_name in MEMBERS:
+            Member.objects.create(
+                username=username, email=f'{username}@example.com', password='x',
+                first_name=first_name, last_name=last_name,
+            )
+
+    def setUp(self):
+        self.client = client_for(self.searcher)
+
+    def found(self, query, **params):
+        response = self.client.get('/api/users/', {'search': query, **params})
+        self.assertEqual(response.status_code, 200)
+        return [row['username'] for row in response.data['results']]
+
+    def test_uses_the_index(self):
+        self.assertTrue(search.fts_available())
+
+    def test_prefix_matches_in_any_column(self):
+        self.assertEqual(set(self.found('ива')), {'ivan_p', 'petya'})
+        self.assertEqual(set(self.found('ann')), {'anna', 'annabel', 'zed'})
+        # Every word has to match
+        self.assertEqual(self.found('иван петр'), ['ivan_p'])
+        self.assertEqual(self.found('"*'), [])
+
+    def test_best_matches_first(self):
+        self.assertEqual(self.found('anna')[0], 'anna')
+
+    def test_paging(self):
+        first = self.client.get('/api/users/', {'search': 'ann', 'limit': 2}).data
+        rest = self.client.get('/api/users/', {'search': 'ann', 'limit': 2, 'cursor': first['next_cursor']}).data
+        usernames = [row['username'] for row in first['results'] + rest['results']]
+        self.assertEqual(sorted(usernames), ['anna', 'annabel', 'zed'])
+        self.assertIsNone(rest['next_cursor'])
+
+    def test_index_follows_renames_and_deletes(self):
+        member = Member.objects.get(username='zed')
+        member.first_name, member.last_name = 'Zoe', 'Quinn'
+        member.save()
+        self.assertEqual(self.found('zo'), ['zed'])
+        self.assertNotIn('zed', self.found('ann'))
+
+        Member.objects.filter(username='petya').update(username='pyotr')
+        self.assertEqual(self.found('pyo'), ['pyotr'])
+
+        Member.objects.get(username='anna').delete()
+        self.assertEqual(self.found('ann'), ['annabel'])
@@ -0,0 +1,87 @@
+"""
+The synthetic dataset must look like one the API produced itself, or the
+load tests measure states the application can never reach.
+"""
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db.models import Count, F, Max, Q
+from django.test import TestCase
+
+from api.management.commands.bench_endpoints import SCENARIOS, api_routes
+from api import member_counters
+from api.models import (
+    Comment, Conversation, FriendRequest, Friendship, Like, Member, MemberCounters, Message, Post,
+)
+
+
+class SeedSocialGraphTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command('seed_social_graph', members=80, friends=3, seed=7, stdout=StringIO())
+
+    def test_friend_graph_is_canonical_and_heavy_tailed(self):
+        self.assertEqual(Member.objects.count(), 80)
+        # Every member after the first three makes exactly three friendships
+        self.assertEqual(Friendship.objects.count(), (80 - 3) * 3)
+        self.assertFalse(Friendship.objects.filter(user1__gte=F('user2')).exists())
+
+        degrees = sorted(
+            Member.objects.annotate(
+                degree=Count('friendships_as_user1', distinct=True) + Count('friendships_as_user2', distinct=True)
+            ).values_list('degree', flat=True)
+        )
+        self.assertGreater(degrees[-1], 4 * degrees[len(degrees) // 2])
+
+    def test_post_counters_match_rows(self):
+        self.assertTrue(Post.objects.exists())
+        drifted = Post.objects.annotate(
+            like_rows=Count('likes', distinct=True), comment_rows=Count('comments', distinct=True),
+        ).exclude(likes_count=F('like_rows'), comments_count=F('comment_rows'))
+        self.assertFalse(drifted.exists())
+        self.assertFalse(Like.objects.filter(user=F('post__author')).exists())
+        self.assertTrue(Comment.objects.exists())
+
+    def test_pending_requests_are_between_strangers(self):
+        for request in FriendRequest.objects.all():
+            self.assertEqual(request.status, 'pending')
+            user1_id, user2_id = Friendship.ordered_pair(request.from_user_id, request.to_user_id)
+            self.assertFalse(Friendship.objects.filter(user1_id=user1_id, user2_id=user2_id).exists())
+
+    def test_conversations_summarize_their_messages(self):
+        self.assertTrue(Conversation.objects.exists())
+        for conversation in Conversation.objects.all():
+            messages = Message.objects.filter(
+                Q(sender_id=conversation.user1_id, recipient_id=conversation.user2_id)
+                | Q(sender_id=conversation.user2_id, recipient_id=conversation.user1_id)
+            )
+            self.assertEqual(conversation.last_message_id, messages.aggregate(last=Max('id'))['last'])
+            self.assertEqual(conversation.last_message_at, conversation.last_message.created_at)
+            self.assertEqual(
+                conversation.user1_unread_count,
+                messages.filter(recipient_id=conversation.user1_id, id__gt=conversation.user1_last_read_message_id).count(),
+            )
+            self.assertEqual(
+                conversation.user2_unread_count,
+                messages.filter(recipient_id=conversation.user2_id, id__gt=conversation.user2_last_read_message_id).count(),
+            )
+
+    def test_badge_counters_match_rows(self):
+        stored = MemberCounters.objects.in_bulk()
+        self.assertTrue(stored)
+        member_ids = list(Member.objects.values_list('id', flat=True))
+        for member_id, counters in member_counters.actual(member_ids).items():
+            current = stored.get(member_id, MemberCounters(member_id=member_id))
+            self.assertEqual(
+                (current.unread_messages, current.pending_friend_requests),
+                (counters.unread_messages, counters.pending_friend_requests),
+            )
+
+    def test_refuses_to_mix_with_existing_members(self):
+        with self.assertRaises(CommandError):
+            call_command('seed_social_graph', members=10, friends=2, stdout=StringIO())
+
+    def test_benchmark_covers_every_route(self):
+        self.assertEqual(api_routes() - {(method, route) for method, route, _ in SCENARIOS}, set())
@@ -0,0 +1,88 @@
+"""
+Fan-out-on-write timelines (api/timeline.py) serve the same news feed as
+the pull model assembled from Friendship and Post, through friend changes
+and `manage.py rebuild_timelines`.
+"""
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from api.models import FriendRequest, Post, TimelineEntry
+from api.tests.utils import client_for, create_member, reset_caches
+
+
+@override_settings(FEED_FANOUT='write')
+class TimelineTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = create_member('alice')
+        cls.bob = create_member('bob')
+        cls.carol = create_member('carol')
+        cls.members = [cls.alice, cls.bob, cls.carol]
+
+    def setUp(self):
+        reset_caches()
+
+    def post(self, member, content):
+        response = client_for(member).post('/api/posts/', {'content': content}, format='json')
+        self.assertEqual(response.status_code, 201)
+
+    def befriend(self, member, other):
+        friend_request = FriendRequest.objects.create(from_user=member, to_user=other)
+        self.assertEqual(client_for(other).post(f'/api/friends/accept/{friend_request.id}/').status_code, 200)
+
+    def feed(self, member, limit=2):
+        """Every post id in `member`'s feed, paged through"""
+        client = client_for(member)
+        ids, params = [], {'limit': limit}
+        while True:
+            response = client.get('/api/posts/', params)
+            self.assertEqual(response.status_code, 200)
+            ids += [post['id'] for post in response.data['results']]
+            if not response.data['next_cursor']:
+                return ids
+            params['cursor'] = response.data['next_cursor']
+
+    def entries(self):
+        return set(TimelineEntry.objects.values_list('owner_id', 'post_id'))
+
+    def assertFeedsMatchPullModel(self):
+        pushed = {member.username: self.feed(member) for member in self.members}
+        with override_settings(FEED_FANOUT='read'):
+            pulled = {member.username: self.feed(member) for member in self.members}
+        self.assertEqual(pushed, pulled)
+        return pushed
+
+    def test_feeds_match_the_pull_model(self):
+        # Written before the friendship: copied in when it is accepted
+        self.post(self.bob, 'bob 1')
+        self.post(self.carol, 'carol 1')
+        self.assertEqual(self.assertFeedsMatchPullModel()['alice'], [])
+
+        self.befriend(self.alice, self.bob)
+        self.post(self.bob, 'bob 2')
+        self.post(self.alice, 'alice 1')
+        feeds = self.assertFeedsMatchPullModel()
+        contents = Post.objects.in_bulk(feeds['alice'])
+        self.assertEqual([contents[id].content for id in feeds['alice']], ['alice 1', 'bob 2', 'bob 1'])
+
+        self.assertEqual(client_for(self.alice).delete(f'/api/friends/{self.bob.id}/').status_code, 204)
+        self.assertEqual(len(self.assertFeedsMatchPullModel()['alice']), 1)
+
+    def test_rebuild_restores_the_entries(self):
+        self.befriend(self.alice, self.bob)
+        self.befriend(self.bob, self.carol)
+        self.post(self.bob, 'bob 1')
+        self.post(self.carol, 'carol 1')
+        entries = self.entries()
+        TimelineEntry.objects.all().delete()
+        call_command('rebuild_timelines', stdout=StringIO())
+        self.assertEqual(self.entries(), entries)
+
+        # Written before fan-out was switched on: only a rebuild adds it
+        post = Post.objects.create(author=self.bob, content='not fanned out')
+        call_command('rebuild_timelines', stdout=StringIO())
+        self.assertEqual(self.entries(), entries | {(self.alice.id, post.id), (self.bob.id, post.id), (self.carol.id, post.id)})
+        self.assertFeedsMatchPullModel()
@@ -0,0 +1,32 @@
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.cache import caches
+from rest_framework.test import APIClient
+
+from api import friend_graph
+from api.authentication import member_cache
+from api.models import Member
+
+# Hashed once: hashing per member would dominate fixture setup
+PASSWORD_HASH = make_password('password123')
+
+
+def create_member(username):
+    """A member who can log in with 'password123'"""
+    return Member.objects.create(
+        username=username, email=f'{username}@example.com', password=PASSWORD_HASH,
+        first_name=username.title(), last_name='Test',
+    )
+
+
+def client_for(member):
+    client = APIClient()
+    client.cookies['session_id'] = str(member.id)
+    return client
+
+
+def reset_caches():
+    """Empty the per-worker caches, so that a request starts cold"""
+    member_cache.clear()
+    friend_graph.clear()
+    caches[settings.RESPONSE_CACHE_ALIAS].clear()
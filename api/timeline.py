@@ -0,0 +1,70 @@
+"""
+Fan-out-on-write news feed.
+
+With settings.FEED_FANOUT == 'write' every post is copied into the timeline
+of its author and of each of the author's friends when it is created, so the
+feed read is a single range scan over TimelineEntry. With 'read' (the
+default) nothing is materialized and the feed is assembled from Friendship
+and Post at request time. Switching to 'write' on an existing database
+requires `manage.py rebuild_timelines`.
+"""
+from django.conf import settings
+
+from api.friend_graph import friend_ids
+from api.models import Post, TimelineEntry
+
+BATCH_SIZE = 1000
+
+
+def is_enabled():
+    return settings.FEED_FANOUT == 'write'
+
+
+def _entries(owner_ids, posts):
+    return [
+        TimelineEntry(owner_id=owner_id, post_id=post_id, author_id=author_id, created_at=created_at)
+        for owner_id in owner_ids
+        for post_id, author_id, created_at in posts
+    ]
+
+
+def fan_out_post(post):
+    """Push a new post into the timelines of its author and the author's friends"""
+    if not is_enabled():
+        return
+    owner_ids = [post.author_id, *friend_ids(post.author_id)]
+    TimelineEntry.objects.bulk_create(
+        _entries(owner_ids, [(post.id, post.author_id, post.created_at)]),
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def backfill(owner_id, author_id):
+    """Copy all of `author_id`'s posts into `owner_id`'s timeline"""
+    if not is_enabled():
+        return
+    posts = Post.objects.filter(author_id=author_id).values_list('id', 'author_id', 'created_at')
+    TimelineEntry.objects.bulk_create(
+        _entries([owner_id], posts.iterator(chunk_size=BATCH_SIZE)),
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def prune(owner_id, author_id):
+    """Remove `author_id`'s posts from `owner_id`'s timeline"""
+    if not is_enabled():
+        return
+    TimelineEntry.objects.filter(owner_id=owner_id, author_id=author_id).delete()
+
+
+def rebuild_member(member_id):
+    """Replace a member's timeline with their own and their friends' posts"""
+    TimelineEntry.objects.filter(owner_id=member_id).delete()
+    posts = Post.objects.filter(
+        author_id__in=[member_id, *friend_ids(member_id)]
+    ).values_list('id', 'author_id', 'created_at')
+    entries = _entries([member_id], posts.iterator(chunk_size=BATCH_SIZE))
+    TimelineEntry.objects.bulk_create(entries, batch_size=BATCH_SIZE)
+    return len(entries)
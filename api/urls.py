@@ -4,16 +4,13 @@ from .views import (
     LoginView,
     LogoutView,
     MeView,
+    MeCountersView,
     UserListView,
     UserDetailView,
-    UserUpdateView,
     PostListView,
-    PostCreateView,
     PostDetailView,
-    PostDeleteView,
     UserPostsView,
     CommentListView,
-    CommentCreateView,
     CommentDeleteView,
     LikeToggleView,
     FriendsListView,
@@ -26,6 +23,7 @@ from .views import (
     ConversationsListView,
     ConversationMessagesView,
     SendMessageView,
+    BatchView,
 )
 
 urlpatterns = [
@@ -34,6 +32,7 @@ urlpatterns = [
     path("auth/login/", LoginView.as_view(), name="login"),
     path("auth/logout/", LogoutView.as_view(), name="logout"),
     path("auth/me/", MeView.as_view(), name="me"),
+    path("me/counters/", MeCountersView.as_view(), name="me-counters"),
 
     # Users endpoints - list and detail
     path("users/", UserListView.as_view(), name="users-list"),
@@ -64,4 +63,7 @@ urlpatterns = [
     path("conversations/", ConversationsListView.as_view(), name="conversations-list"),
     path("conversations/<int:user_id>/", ConversationMessagesView.as_view(), name="conversation-messages"),
     path("messages/", SendMessageView.as_view(), name="send-message"),
+
+    # Batch endpoint - several GET requests in one
+    path("batch/", BatchView.as_view(), name="batch"),
 ]
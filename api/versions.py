@@ -0,0 +1,77 @@
+"""
+Per-id change counters shared by every worker on the host.
+
+Each space is a SharedCounters file in settings.VERSION_DIR. Writers bump
+the counters of whatever they changed and readers combine counters into
+tags (ETags, cache keys) without touching the database:
+
+- FRIENDS: a member's friendships (kept by api.friend_graph)
+- MEMBER: a member's profile fields (friend requests are not versioned;
+  api.etags.profile probes the pending ones itself)
+- POSTS: a member's posts, including their like and comment counts
+- POST: a single post
+- INBOX: a member's conversations and unread counts
+"""
+import hashlib
+from pathlib import Path
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import transaction
+from django.dispatch import receiver
+
+from api.shared_counters import SharedCounters
+
+FRIENDS = 'friends'
+MEMBER = 'member'
+POSTS = 'posts'
+POST = 'post'
+INBOX = 'inbox'
+
+SPACES = (FRIENDS, MEMBER, POSTS, POST, INBOX)
+
+
+def _open_counters():
+    return {
+        space: SharedCounters(Path(settings.VERSION_DIR) / f'{space}.versions', settings.VERSION_SLOTS)
+        for space in SPACES
+    }
+
+
+_counters = _open_counters()
+
+
+@receiver(setting_changed)
+def _reopen_counters(setting, **kwargs):
+    # Tests move the files with override_settings
+    if setting in ('VERSION_DIR', 'VERSION_SLOTS'):
+        for counters in _counters.values():
+            counters.close()
+        _counters.update(_open_counters())
+
+
+def get(space, key):
+    return _counters[space].get(key)
+
+
+def get_many(space, keys):
+    counters = _counters[space]
+    return [counters.get(key) for key in keys]
+
+
+def bump(space, *keys):
+    """Advance the counters of `keys` now and again when the transaction commits"""
+    def increment():
+        for key in keys:
+            _counters[space].increment(key)
+
+    increment()
+    # A read between the first bump and the commit may have tagged the
+    # pre-commit state with the new counter value.
+    transaction.on_commit(increment)
+
+
+def tag(*parts):
+    """Short digest of `parts` and of the counter files' generations"""
+    generations = [counters.generation for counters in _counters.values()]
+    return hashlib.blake2b(repr((generations, parts)).encode(), digest_size=12).hexdigest()
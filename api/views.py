@@ -1,12 +1,26 @@
+from asgiref.sync import sync_to_async
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from rest_framework.authentication import BaseAuthentication
-from rest_framework.exceptions import AuthenticationFailed
 from rest_framework.permissions import AllowAny, IsAuthenticated
-from django.db.models import Q, Count, Exists, OuterRef, Max
-from django.shortcuts import get_object_or_404
-from api.models import Member, Post, Comment, Like, FriendRequest, Friendship, Message
+from django.db import transaction
+from django.db.models import F, Q, Count, Exists, OuterRef, Max
+from django.db.models.functions import Greatest
+from django.shortcuts import aget_object_or_404, get_object_or_404
+from api.models import Member, Post, Comment, Like, FriendRequest, Friendship, Message, TimelineEntry, Conversation
+from api.pagination import (
+    KeysetPagination,
+    TimelinePagination,
+    ConversationPagination,
+    MessageWindowPagination,
+    OffsetCursorPagination,
+    FriendListPagination,
+)
+from api import batch, conversations, etags, friend_graph, member_counters, realtime, search, timeline, versions
+from api.async_views import AsyncAPIView
+from api.authentication import FreshCookieAuthentication
+from api.response_cache import cached
+from api.row_serializers import friend_request_rows, friend_rows, member_rows, message_rows
 from api.serializers import (
     MemberSerializer,
     RegisterSerializer,
@@ -17,33 +31,15 @@ from api.serializers import (
     CommentSerializer,
     CommentCreateSerializer,
     FriendRequestSerializer,
-    FriendshipSerializer,
     MessageSerializer,
     MessageCreateSerializer,
     ConversationSerializer,
     MemberShortSerializer,
+    BatchSerializer,
 )
 import uuid
 
 
-class CookieAuthentication(BaseAuthentication):
-    """
-    Custom authentication class that reads member_id from HttpOnly cookie 'session_id'
-    """
-
-    def authenticate(self, request):
-        session_id = request.COOKIES.get('session_id')
-        if not session_id:
-            return None
-
-        try:
-            member_id = int(session_id)
-            member = Member.objects.get(id=member_id)
-            return (member, None)
-        except (ValueError, Member.DoesNotExist):
-            raise AuthenticationFailed('Invalid session')
-
-
 class RegisterView(APIView):
     """
     POST /api/auth/register/
@@ -120,38 +116,50 @@ class LogoutView(APIView):
         return response
 
 
-class MeView(APIView):
+class MeView(AsyncAPIView):
     """
     GET /api/auth/me/
     Get current user
     """
+    authentication_classes = [FreshCookieAuthentication]
     permission_classes = [IsAuthenticated]
 
-    def get(self, request):
+    async def get(self, request):
         serializer = MemberSerializer(request.user)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
+class MeCountersView(AsyncAPIView):
+    """
+    GET /api/me/counters/
+    Get the current user's unread message and pending friend request counts
+    """
+    permission_classes = [IsAuthenticated]
+
+    async def get(self, request):
+        return Response(await member_counters.aget(request.user.id), status=status.HTTP_200_OK)
+
+
 class UserListView(APIView):
     """
-    GET /api/users/
-    Get list of users with optional search
+    GET /api/users/?search=&cursor=&limit=
+    Get list of users, newest first, or ranked search results
     """
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        search = request.query_params.get('search', '')
-        users = Member.objects.all()
-
-        if search:
-            users = users.filter(
-                Q(username__icontains=search) |
-                Q(first_name__icontains=search) |
-                Q(last_name__icontains=search)
+        query = request.query_params.get('search', '').strip()
+
+        if query:
+            paginator = OffsetCursorPagination()
+            users = paginator.paginate_results(
+                lambda limit, offset: search.search_members(query, limit, offset), request
             )
+            return paginator.get_paginated_response(MemberSerializer(users, many=True).data)
 
-        serializer = MemberSerializer(users, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        paginator = KeysetPagination()
+        rows = paginator.paginate_queryset(Member.objects.values(*member_rows.columns), request, view=self)
+        return paginator.get_paginated_response(member_rows.many(rows))
 
 
 class UserDetailView(APIView):
@@ -164,6 +172,8 @@ class UserDetailView(APIView):
     """
     permission_classes = [IsAuthenticated]
 
+    @etags.conditional(etags.profile)
+    @cached('user-detail', etags.profile)
     def get(self, request, id):
         user = get_object_or_404(Member, id=id)
         serializer = MemberSerializer(user)
@@ -171,10 +181,7 @@ class UserDetailView(APIView):
 
         # Check friendship status
         current_user = request.user
-        is_friend = Friendship.objects.filter(
-            Q(user1=current_user, user2=user) | Q(user1=user, user2=current_user)
-        ).exists()
-        data['is_friend'] = is_friend
+        data['is_friend'] = friend_graph.are_friends(current_user.id, user.id)
 
         # Check friend request status
         friend_request_status = None
@@ -206,37 +213,54 @@ class UserDetailView(APIView):
         serializer = ProfileUpdateSerializer(user, data=request.data, partial=True)
         if serializer.is_valid():
             serializer.save()
+            # Profiles are embedded in posts, friend lists and inboxes;
+            # saving the member has bumped versions.MEMBER (api/signals.py)
+            versions.bump(versions.INBOX, user.id, *conversations.partner_ids(user.id))
             return Response(MemberSerializer(user).data, status=status.HTTP_200_OK)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class PostListView(APIView):
+class PostListView(AsyncAPIView):
     """
-    GET /api/posts/
-    Get news feed (posts from friends and own posts)
+    GET /api/posts/?cursor=&limit=
+    Get news feed (posts from friends and own posts), newest first
     
     POST /api/posts/
     Create a new post
     """
     permission_classes = [IsAuthenticated]
 
-    def get(self, request):
+    @etags.conditional(etags.feed)
+    async def get(self, request):
         current_user = request.user
 
+        if timeline.is_enabled():
+            # Fan-out-on-write: one range read over the materialized timeline
+            entries = TimelineEntry.objects.filter(owner=current_user).only('created_at', 'post_id')
+            paginator = TimelinePagination()
+            post_ids = [entry.post_id for entry in await paginator.apaginate_queryset(entries, request, view=self)]
+            posts = await Post.objects.with_stats(current_user).ain_bulk(post_ids)
+            page = [posts[post_id] for post_id in post_ids if post_id in posts]
+            serializer = PostSerializer(page, many=True, context={'request': request})
+            return paginator.get_paginated_response(serializer.data)
+
         # Get list of friends
-        friends_as_user1 = Friendship.objects.filter(user1=current_user).values_list('user2_id', flat=True)
-        friends_as_user2 = Friendship.objects.filter(user2=current_user).values_list('user1_id', flat=True)
-        friend_ids = list(friends_as_user1) + list(friends_as_user2)
+        friend_ids = await sync_to_async(friend_graph.friend_ids)(current_user.id)
 
         # Get posts from friends and self
-        posts = Post.objects.filter(
+        posts = Post.objects.with_stats(current_user).filter(
             Q(author_id__in=friend_ids) | Q(author=current_user)
-        ).order_by('-created_at')
+        )
 
-        serializer = PostSerializer(posts, many=True, context={'request': request})
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        paginator = KeysetPagination()
+        page = await paginator.apaginate_queryset(posts, request, view=self)
+        serializer = PostSerializer(page, many=True, context={'request': request})
+        return paginator.get_paginated_response(serializer.data)
 
-    def post(self, request):
+    async def post(self, request):
+        return await sync_to_async(self.create)(request)
+
+    def create(self, request):
         serializer = PostCreateSerializer(data=request.data, context={'request': request})
         if serializer.is_valid():
             post = serializer.save()
@@ -257,8 +281,10 @@ class PostDetailView(APIView):
     """
     permission_classes = [IsAuthenticated]
 
+    @etags.conditional(etags.post)
+    @cached('post-detail', etags.post)
     def get(self, request, id):
-        post = get_object_or_404(Post, id=id)
+        post = get_object_or_404(Post.objects.with_stats(request.user), id=id)
         serializer = PostSerializer(post, context={'request': request})
         return Response(serializer.data, status=status.HTTP_200_OK)
 
@@ -272,21 +298,28 @@ class PostDetailView(APIView):
             )
 
         post.delete()
+        versions.bump(versions.POSTS, post.author_id)
+        versions.bump(versions.POST, id)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
 class UserPostsView(APIView):
     """
-    GET /api/users/{user_id}/posts/
-    Get all posts by specific user
+    GET /api/users/{user_id}/posts/?cursor=&limit=
+    Get posts by specific user, newest first
     """
     permission_classes = [IsAuthenticated]
 
+    @etags.conditional(etags.user_posts)
+    @cached('user-posts', etags.user_posts)
     def get(self, request, user_id):
         user = get_object_or_404(Member, id=user_id)
-        posts = Post.objects.filter(author=user).order_by('-created_at')
-        serializer = PostSerializer(posts, many=True, context={'request': request})
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        posts = Post.objects.with_stats(request.user).filter(author=user)
+
+        paginator = KeysetPagination()
+        page = paginator.paginate_queryset(posts, request, view=self)
+        serializer = PostSerializer(page, many=True, context={'request': request})
+        return paginator.get_paginated_response(serializer.data)
 
 
 class CommentListView(APIView):
@@ -301,7 +334,8 @@ class CommentListView(APIView):
 
     def get(self, request, post_id):
         post = get_object_or_404(Post, id=post_id)
-        comments = Comment.objects.filter(post=post).order_by('created_at')
+        # Through the reverse manager every comment already holds `post`
+        comments = post.comments.select_related('author').order_by('created_at')
         serializer = CommentSerializer(comments, many=True)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
@@ -309,11 +343,15 @@ class CommentListView(APIView):
         post = get_object_or_404(Post, id=post_id)
         serializer = CommentCreateSerializer(data=request.data, context={'request': request, 'post_id': post_id})
         if serializer.is_valid():
-            comment = Comment.objects.create(
-                post=post,
-                author=request.user,
-                content=serializer.validated_data['content']
-            )
+            with transaction.atomic():
+                comment = Comment.objects.create(
+                    post=post,
+                    author=request.user,
+                    content=serializer.validated_data['content']
+                )
+                Post.objects.filter(id=post.id).update(comments_count=F('comments_count') + 1)
+                versions.bump(versions.POST, post.id)
+                versions.bump(versions.POSTS, post.author_id)
             return Response(
                 CommentSerializer(comment).data,
                 status=status.HTTP_201_CREATED
@@ -337,7 +375,12 @@ class CommentDeleteView(APIView):
                 status=status.HTTP_403_FORBIDDEN
             )
 
-        comment.delete()
+        with transaction.atomic():
+            comment.delete()
+            # Floored: a count that drifted low must not go negative
+            Post.objects.filter(id=comment.post_id).update(comments_count=Greatest(F('comments_count') - 1, 0))
+            versions.bump(versions.POST, comment.post_id)
+            versions.bump(versions.POSTS, comment.post.author_id)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
@@ -350,37 +393,41 @@ class LikeToggleView(APIView):
 
     def post(self, request, post_id):
         post = get_object_or_404(Post, id=post_id)
-        like = Like.objects.filter(post=post, user=request.user).first()
-
-        if like:
-            like.delete()
-            is_liked = False
-        else:
-            Like.objects.create(post=post, user=request.user)
-            is_liked = True
 
-        likes_count = Like.objects.filter(post=post).count()
+        with transaction.atomic():
+            deleted, _ = Like.objects.filter(post=post, user=request.user).delete()
+            if deleted:
+                is_liked = False
+                Post.objects.filter(id=post.id).update(likes_count=Greatest(F('likes_count') - 1, 0))
+            else:
+                _, created = Like.objects.get_or_create(post=post, user=request.user)
+                is_liked = True
+                if created:
+                    Post.objects.filter(id=post.id).update(likes_count=F('likes_count') + 1)
+            post.refresh_from_db(fields=['likes_count'])
+            versions.bump(versions.POST, post.id)
+            versions.bump(versions.POSTS, post.author_id)
 
         return Response(
-            {"is_liked": is_liked, "likes_count": likes_count},
+            {"is_liked": is_liked, "likes_count": post.likes_count},
             status=status.HTTP_200_OK
         )
 
 
 class FriendsListView(APIView):
     """
-    GET /api/friends/
-    Get list of current user's friends
+    GET /api/friends/?q=&sort=&cursor=&limit=
+    Get list of current user's friends, optionally filtered by name and paged
     """
     permission_classes = [IsAuthenticated]
 
+    @etags.conditional(etags.friends)
+    @cached('friends-list', etags.friends)
     def get(self, request):
-        current_user = request.user
-        friendships = Friendship.objects.filter(
-            Q(user1=current_user) | Q(user2=current_user)
-        )
-        serializer = FriendshipSerializer(friendships, many=True, context={'request': request})
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        paginator = FriendListPagination()
+        query = request.query_params.get('q', '').strip()
+        rows = paginator.paginate_friends(request.user.id, request, query)
+        return paginator.get_paginated_response(friend_rows.many(rows))
 
 
 class FriendRequestsView(APIView):
@@ -394,9 +441,8 @@ class FriendRequestsView(APIView):
         requests = FriendRequest.objects.filter(
             to_user=request.user,
             status='pending'
-        ).order_by('-created_at')
-        serializer = FriendRequestSerializer(requests, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        ).order_by('-created_at').values(*friend_request_rows.columns)
+        return Response(friend_request_rows.many(requests), status=status.HTTP_200_OK)
 
 
 class SentRequestsView(APIView):
@@ -410,9 +456,8 @@ class SentRequestsView(APIView):
         requests = FriendRequest.objects.filter(
             from_user=request.user,
             status='pending'
-        ).order_by('-created_at')
-        serializer = FriendRequestSerializer(requests, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        ).order_by('-created_at').values(*friend_request_rows.columns)
+        return Response(friend_request_rows.many(requests), status=status.HTTP_200_OK)
 
 
 class SendFriendRequestView(APIView):
@@ -433,9 +478,7 @@ class SendFriendRequestView(APIView):
             )
 
         # Check if already friends
-        if Friendship.objects.filter(
-            Q(user1=current_user, user2=to_user) | Q(user1=to_user, user2=current_user)
-        ).exists():
+        if friend_graph.are_friends(current_user.id, to_user.id):
             return Response(
                 {"error": "Already friends"},
                 status=status.HTTP_400_BAD_REQUEST
@@ -451,11 +494,13 @@ class SendFriendRequestView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        friend_request = FriendRequest.objects.create(
-            from_user=current_user,
-            to_user=to_user,
-            status='pending'
-        )
+        with transaction.atomic():
+            friend_request = FriendRequest.objects.create(
+                from_user=current_user,
+                to_user=to_user,
+                status='pending'
+            )
+            member_counters.add(to_user.id, member_counters.PENDING_FRIEND_REQUESTS, 1)
         serializer = FriendRequestSerializer(friend_request)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
@@ -482,14 +527,21 @@ class AcceptFriendRequestView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        friend_request.status = 'accepted'
-        friend_request.save()
+        with transaction.atomic():
+            # Only the first of two racing answers counts the request down
+            if not FriendRequest.objects.filter(id=friend_request.id, status='pending').update(status='accepted'):
+                return Response(
+                    {"error": "Request is not pending"},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            friend_request.status = 'accepted'
+            member_counters.add(friend_request.to_user_id, member_counters.PENDING_FRIEND_REQUESTS, -1)
 
-        # Create friendship
-        Friendship.objects.create(
-            user1=friend_request.from_user,
-            user2=friend_request.to_user
-        )
+            # Create friendship
+            user1_id, user2_id = Friendship.ordered_pair(friend_request.from_user_id, friend_request.to_user_id)
+            Friendship.objects.get_or_create(user1_id=user1_id, user2_id=user2_id)
+            timeline.backfill(friend_request.from_user_id, friend_request.to_user_id)
+            timeline.backfill(friend_request.to_user_id, friend_request.from_user_id)
 
         serializer = FriendRequestSerializer(friend_request)
         return Response(serializer.data, status=status.HTTP_200_OK)
@@ -517,8 +569,14 @@ class RejectFriendRequestView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        friend_request.status = 'rejected'
-        friend_request.save()
+        with transaction.atomic():
+            if not FriendRequest.objects.filter(id=friend_request.id, status='pending').update(status='rejected'):
+                return Response(
+                    {"error": "Request is not pending"},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            friend_request.status = 'rejected'
+            member_counters.add(friend_request.to_user_id, member_counters.PENDING_FRIEND_REQUESTS, -1)
 
         serializer = FriendRequestSerializer(friend_request)
         return Response(serializer.data, status=status.HTTP_200_OK)
@@ -535,88 +593,85 @@ class RemoveFriendView(APIView):
         friend = get_object_or_404(Member, id=user_id)
         current_user = request.user
 
-        friendship = Friendship.objects.filter(
-            Q(user1=current_user, user2=friend) | Q(user1=friend, user2=current_user)
-        ).first()
-
-        if not friendship:
+        if not friend_graph.are_friends(current_user.id, friend.id):
             return Response(
                 {"error": "Friendship not found"},
                 status=status.HTTP_404_NOT_FOUND
             )
 
-        friendship.delete()
+        with transaction.atomic():
+            user1_id, user2_id = Friendship.ordered_pair(current_user.id, friend.id)
+            Friendship.objects.filter(user1_id=user1_id, user2_id=user2_id).delete()
+            timeline.prune(current_user.id, friend.id)
+            timeline.prune(friend.id, current_user.id)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class ConversationsListView(APIView):
+class ConversationsListView(AsyncAPIView):
     """
-    GET /api/conversations/
-    Get list of all conversations
+    GET /api/conversations/?cursor=&limit=
+    Get conversations, most recent first
     """
     permission_classes = [IsAuthenticated]
 
-    def get(self, request):
+    @etags.conditional(etags.inbox)
+    async def get(self, request):
         current_user = request.user
 
-        # Get all users with whom current user has messages
-        sent_to = Message.objects.filter(sender=current_user).values_list('recipient_id', flat=True).distinct()
-        received_from = Message.objects.filter(recipient=current_user).values_list('sender_id', flat=True).distinct()
-        conversation_user_ids = set(list(sent_to) + list(received_from))
-
-        conversations = []
-        for user_id in conversation_user_ids:
-            user = Member.objects.get(id=user_id)
-
-            # Get last message
-            last_message = Message.objects.filter(
-                Q(sender=current_user, recipient=user) | Q(sender=user, recipient=current_user)
-            ).order_by('-created_at').first()
-
-            # Count unread messages
-            unread_count = Message.objects.filter(
-                sender=user,
-                recipient=current_user,
-                is_read=False
-            ).count()
-
-            conversations.append({
-                'user': user,
-                'last_message': last_message,
-                'unread_count': unread_count
+        related = ('user1', 'user2', 'last_message__sender', 'last_message__recipient')
+        sides = [
+            Conversation.objects.filter(user1=current_user).select_related(*related),
+            Conversation.objects.filter(user2=current_user).select_related(*related),
+        ]
+
+        paginator = ConversationPagination()
+        page = await paginator.apaginate_queryset(sides, request, view=self)
+        conversations_data = []
+        for thread in page:
+            if thread.last_message is not None:
+                thread.last_message.is_read = (
+                    thread.last_message_id <= thread.read_cursors()[thread.last_message.recipient_id]
+                )
+            conversations_data.append({
+                'user': thread.partner_of(current_user),
+                'last_message': thread.last_message,
+                'unread_count': thread.unread_count_for(current_user),
             })
 
-        # Sort by last message time
-        conversations.sort(key=lambda x: x['last_message'].created_at if x['last_message'] else None, reverse=True)
-
-        serializer = ConversationSerializer(conversations, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        serializer = ConversationSerializer(conversations_data, many=True)
+        return paginator.get_paginated_response(serializer.data)
 
 
-class ConversationMessagesView(APIView):
+class ConversationMessagesView(AsyncAPIView):
     """
-    GET /api/conversations/{user_id}/
-    Get all messages in conversation with a specific user
+    GET /api/conversations/{user_id}/?before_id=&after_id=&limit=
+    Get a window of messages in conversation with a specific user
     """
     permission_classes = [IsAuthenticated]
 
-    def get(self, request, user_id):
-        user = get_object_or_404(Member, id=user_id)
+    async def get(self, request, user_id):
+        user = await aget_object_or_404(Member, id=user_id)
         current_user = request.user
 
+        user1_id, user2_id = Conversation.ordered_pair(current_user.id, user.id)
+        thread = await Conversation.objects.filter(user1_id=user1_id, user2_id=user2_id).afirst()
+        read_cursors = thread.read_cursors() if thread else {}
+
         messages = Message.objects.filter(
             Q(sender=current_user, recipient=user) | Q(sender=user, recipient=current_user)
-        ).order_by('created_at')
+        ).with_read_state(read_cursors).values(*message_rows.columns)
 
-        # Mark messages as read
-        Message.objects.filter(
-            sender=user,
-            recipient=current_user,
-            is_read=False
-        ).update(is_read=True)
+        paginator = MessageWindowPagination()
+        page = await paginator.apaginate_queryset(messages, request, view=self)
 
-        serializer = MessageSerializer(messages, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        # Delivered messages are read now: move the cursor past the newest one
+        received = [row for row in page if row['recipient__id'] == current_user.id]
+        if received and received[-1]['id'] > read_cursors.get(current_user.id, 0):
+            await sync_to_async(conversations.mark_read)(current_user, user, received[-1]['id'])
+            for row in received:
+                row['is_read'] = True
+
+        return paginator.get_paginated_response(message_rows.many(page))
 
 
 class SendMessageView(APIView):
@@ -630,8 +685,22 @@ class SendMessageView(APIView):
         serializer = MessageCreateSerializer(data=request.data, context={'request': request})
         if serializer.is_valid():
             message = serializer.save()
-            return Response(
-                MessageSerializer(message).data,
-                status=status.HTTP_201_CREATED
-            )
+            data = MessageSerializer(message).data
+            realtime.publish(message.recipient_id, 'message', data)
+            return Response(data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+class BatchView(APIView):
+    """
+    POST /api/batch/
+    Run several GET requests in one: {"requests": ["auth/me/", "posts/?limit=20", ...]}
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        serializer = BatchSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        results = [batch.run(request, path) for path in serializer.validated_data['requests']]
+        return Response({'results': results}, status=status.HTTP_200_OK)
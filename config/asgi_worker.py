@@ -0,0 +1,459 @@
+"""
+Gunicorn worker class that serves an ASGI application.
+
+gunicorn.asgi.conf.py runs config.asgi:application with it:
+
+    gunicorn --config gunicorn.asgi.conf.py config.asgi:application
+
+Each worker runs one asyncio event loop, so a request waiting on the
+database or a WebSocket client waiting for messages holds a coroutine
+instead of a whole worker process. The worker speaks HTTP/1.1 with
+keep-alive (what nginx sends upstream) and WebSocket upgrades for
+/api/ws/; process management, signals, the heartbeat, max_requests and
+access logging are gunicorn's own.
+"""
+import asyncio
+import base64
+import hashlib
+import os
+import struct
+from datetime import timedelta
+from http import HTTPStatus
+from time import monotonic
+from types import SimpleNamespace
+from urllib.parse import unquote
+
+from gunicorn.util import http_date
+from gunicorn.workers.base import Worker
+
+ASGI_VERSION = {'version': '3.0', 'spec_version': '2.3'}
+WEBSOCKET_GUID = b'258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
+WEBSOCKET_MAX_MESSAGE = 1024 * 1024
+
+# WebSocket opcodes (RFC 6455 section 5.2)
+CONTINUATION, TEXT, BINARY, CLOSE, PING, PONG = 0x0, 0x1, 0x2, 0x8, 0x9, 0xA
+
+
+class BadRequest(Exception):
+    pass
+
+
+class BodyTooLarge(Exception):
+    pass
+
+
+def max_body_size():
+    """Largest request body a worker buffers, or None for no limit"""
+    # Imported here: the worker module is loaded before Django is set up
+    from django.conf import settings
+    return settings.DATA_UPLOAD_MAX_MEMORY_SIZE
+
+
+class ASGIWorker(Worker):
+
+    def run(self):
+        asyncio.run(self.serve())
+
+    async def serve(self):
+        self.connections = set()
+        servers = []
+        for listener in self.sockets:
+            listener.sock.setblocking(False)
+            servers.append(await asyncio.start_server(self.handle_connection, sock=listener.sock))
+
+        while self.alive:
+            self.notify()
+            if self.ppid != os.getppid():
+                self.log.info("Parent changed, shutting down: %s", self)
+                break
+            if self.nr >= self.max_requests:
+                self.log.info("Autorestarting worker after current request.")
+                break
+            await asyncio.sleep(1)
+
+        for server in servers:
+            server.close()
+        # Connections stop after their current request once alive is False
+        self.alive = False
+        if self.connections:
+            await asyncio.wait(self.connections, timeout=self.cfg.graceful_timeout)
+
+    async def handle_connection(self, reader, writer):
+        task = asyncio.current_task()
+        self.connections.add(task)
+        try:
+            await self.serve_connection(reader, writer)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except Exception:
+            self.log.exception("Error handling request")
+        finally:
+            self.connections.discard(task)
+            writer.close()
+
+    async def serve_connection(self, reader, writer):
+        peer = writer.get_extra_info('peername')
+        client = tuple(peer[:2]) if isinstance(peer, tuple) else None
+        sockname = writer.get_extra_info('sockname')
+        server = tuple(sockname[:2]) if isinstance(sockname, tuple) else None
+
+        idle_timeout = self.cfg.timeout
+        while self.alive:
+            try:
+                head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), idle_timeout)
+            except (asyncio.TimeoutError, asyncio.IncompleteReadError):
+                return
+            except asyncio.LimitOverrunError:
+                await self.reject(writer, HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE)
+                return
+
+            try:
+                scope = self.parse_head(head, client, server)
+            except BadRequest:
+                await self.reject(writer, HTTPStatus.BAD_REQUEST)
+                return
+
+            headers = dict(scope['headers'])
+            if headers.get(b'upgrade', b'').lower() == b'websocket':
+                await WebSocketConnection(self, scope, reader, writer).run()
+                return
+
+            keep_alive = await self.serve_http(scope, headers, reader, writer)
+            self.nr += 1
+            if not keep_alive or self.cfg.keepalive <= 0:
+                return
+            idle_timeout = self.cfg.keepalive
+
+    def parse_head(self, head, client, server):
+        lines = head[:-4].split(b'\r\n')
+        if len(lines[0]) > self.cfg.limit_request_line > 0 or len(lines) - 1 > self.cfg.limit_request_fields:
+            raise BadRequest()
+        try:
+            method, target, version = lines[0].decode('latin-1').split(' ')
+        except ValueError:
+            raise BadRequest()
+        if version not in ('HTTP/1.0', 'HTTP/1.1'):
+            raise BadRequest()
+
+        headers = []
+        for line in lines[1:]:
+            name, separator, value = line.partition(b':')
+            if not separator or len(line) > self.cfg.limit_request_field_size > 0:
+                raise BadRequest()
+            headers.append((name.strip().lower(), value.strip()))
+
+        path, _, query = target.partition('?')
+        return {
+            'asgi': ASGI_VERSION,
+            'http_version': version[5:],
+            'method': method,
+            'scheme': 'http',
+            'path': unquote(path),
+            'raw_path': path.encode('latin-1'),
+            'query_string': query.encode('latin-1'),
+            'root_path': '',
+            'headers': headers,
+            'client': client,
+            'server': server,
+        }
+
+    async def read_body(self, headers, reader, writer):
+        """
+        The whole request body. Bodies over settings.DATA_UPLOAD_MAX_MEMORY_SIZE
+        raise BodyTooLarge before they are buffered; malformed framing raises
+        ValueError.
+
+        Transfer-Encoding must be exactly `chunked` and must not come with a
+        Content-Length: a proxy in front may frame such a request otherwise
+        and smuggle the rest of the body through as a second request.
+        """
+        limit = max_body_size()
+        encoding = headers.get(b'transfer-encoding')
+        if encoding is not None and (encoding.strip().lower() != b'chunked' or b'content-length' in headers):
+            raise ValueError(encoding)
+        chunked = encoding is not None
+        content_length = headers.get(b'content-length', b'0').strip()
+        if not content_length.isdigit():
+            raise ValueError(content_length)
+        length = 0 if chunked else int(content_length)
+        if limit is not None and length > limit:
+            raise BodyTooLarge()
+
+        if headers.get(b'expect', b'').lower() == b'100-continue':
+            writer.write(b'HTTP/1.1 100 Continue\r\n\r\n')
+        if not chunked:
+            return await reader.readexactly(length) if length else b''
+
+        chunks = []
+        total = 0
+        while True:
+            size = int((await reader.readuntil(b'\r\n')).split(b';')[0], 16)
+            if size < 0:
+                raise ValueError(size)
+            if size == 0:
+                # Trailers, if any, end with an empty line
+                while (await reader.readuntil(b'\r\n')) != b'\r\n':
+                    pass
+                return b''.join(chunks)
+            total += size
+            if limit is not None and total > limit:
+                raise BodyTooLarge()
+            chunk = await reader.readexactly(size + 2)
+            if chunk[-2:] != b'\r\n':
+                raise ValueError(chunk[-2:])
+            chunks.append(chunk[:-2])
+
+    async def serve_http(self, scope, headers, reader, writer):
+        """Run one request through the app; return whether to keep the connection"""
+        started = monotonic()
+        scope['type'] = 'http'
+        try:
+            body = await self.read_body(headers, reader, writer)
+        except BodyTooLarge:
+            await self.reject(writer, HTTPStatus.REQUEST_ENTITY_TOO_LARGE)
+            return False
+        except (ValueError, asyncio.LimitOverrunError):
+            await self.reject(writer, HTTPStatus.BAD_REQUEST)
+            return False
+
+        connection = headers.get(b'connection', b'').lower()
+        if scope['http_version'] == '1.1':
+            keep_alive = b'close' not in connection
+        else:
+            keep_alive = b'keep-alive' in connection
+        keep_alive = keep_alive and self.alive
+
+        response = SimpleNamespace(status=None, headers=[], sent=0, chunked=False)
+        finished = asyncio.Event()
+        body_sent = False
+
+        async def receive():
+            nonlocal body_sent
+            if not body_sent:
+                body_sent = True
+                return {'type': 'http.request', 'body': body, 'more_body': False}
+            # The body is read up front, so the client is only "gone" once
+            # the response is complete
+            await finished.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(event):
+            nonlocal keep_alive
+            if event['type'] == 'http.response.start':
+                response.status = event['status']
+                response.headers = list(event.get('headers', []))
+                return
+            if event['type'] != 'http.response.body' or finished.is_set():
+                return
+
+            content = event.get('body', b'')
+            more_body = event.get('more_body', False)
+            if response.status is not None:
+                names = {name.lower() for name, _ in response.headers}
+                if b'content-length' not in names:
+                    if not more_body:
+                        response.headers.append((b'content-length', str(len(content)).encode()))
+                    elif scope['http_version'] == '1.1':
+                        response.headers.append((b'transfer-encoding', b'chunked'))
+                        response.chunked = True
+                    else:
+                        keep_alive = False
+                writer.write(self.status_head(response.status, response.headers, keep_alive))
+                response.headers = [(name.decode('latin-1'), value.decode('latin-1'))
+                                    for name, value in response.headers]
+                response.status = str(response.status)
+
+            if scope['method'] != 'HEAD':
+                if response.chunked and content:
+                    writer.write(b'%x\r\n%s\r\n' % (len(content), content))
+                elif not response.chunked:
+                    writer.write(content)
+                response.sent += len(content)
+            if not more_body:
+                if response.chunked and scope['method'] != 'HEAD':
+                    writer.write(b'0\r\n\r\n')
+                finished.set()
+            await writer.drain()
+
+        try:
+            await self.wsgi(scope, receive, send)
+        except Exception:
+            self.log.exception("Error handling request %s", scope['path'])
+            if not isinstance(response.status, str):
+                await self.reject(writer, HTTPStatus.INTERNAL_SERVER_ERROR)
+            return False
+        finally:
+            finished.set()
+
+        if not isinstance(response.status, str):
+            # The app returned without sending a response
+            await self.reject(writer, HTTPStatus.INTERNAL_SERVER_ERROR)
+            return False
+        self.log_access(scope, response, started)
+        return keep_alive
+
+    def status_head(self, status, headers, keep_alive):
+        try:
+            reason = HTTPStatus(status).phrase
+        except ValueError:
+            reason = ''
+        lines = [f'HTTP/1.1 {status} {reason}'.encode('latin-1'), b'Server: gunicorn', b'Date: ' + http_date().encode()]
+        lines.append(b'Connection: keep-alive' if keep_alive else b'Connection: close')
+        lines.extend(name + b': ' + value for name, value in headers)
+        return b'\r\n'.join(lines) + b'\r\n\r\n'
+
+    async def reject(self, writer, status):
+        body = status.phrase.encode()
+        writer.write(self.status_head(
+            status, [(b'content-type', b'text/plain'), (b'content-length', str(len(body)).encode())], False,
+        ) + body)
+        await writer.drain()
+
+    def log_access(self, scope, response, started):
+        query = scope['query_string'].decode('latin-1')
+        raw_uri = scope['raw_path'].decode('latin-1') + (f'?{query}' if query else '')
+        headers = [(name.decode('latin-1').upper(), value.decode('latin-1')) for name, value in scope['headers']]
+        environ = {
+            'REMOTE_ADDR': scope['client'][0] if scope['client'] else '-',
+            'REQUEST_METHOD': scope['method'],
+            'RAW_URI': raw_uri,
+            'PATH_INFO': scope['path'],
+            'QUERY_STRING': query,
+            'SERVER_PROTOCOL': f"HTTP/{scope['http_version']}",
+            **{f"HTTP_{name.replace('-', '_')}": value for name, value in headers},
+        }
+        self.log.access(response, SimpleNamespace(headers=headers), environ, timedelta(seconds=monotonic() - started))
+
+
+class WebSocketConnection:
+    """One upgraded connection: RFC 6455 framing under the ASGI websocket protocol"""
+
+    def __init__(self, worker, scope, reader, writer):
+        headers = dict(scope['headers'])
+        protocols = headers.get(b'sec-websocket-protocol', b'').decode('latin-1')
+        self.scope = dict(
+            scope,
+            type='websocket',
+            scheme='ws',
+            subprotocols=[protocol.strip() for protocol in protocols.split(',') if protocol.strip()],
+        )
+        self.key = headers.get(b'sec-websocket-key')
+        self.worker = worker
+        self.reader = reader
+        self.writer = writer
+        self.events = asyncio.Queue()
+        self.accepted = False
+        self.closed = False
+        self.reader_task = None
+
+    async def run(self):
+        if not self.key:
+            await self.worker.reject(self.writer, HTTPStatus.BAD_REQUEST)
+            return
+        self.events.put_nowait({'type': 'websocket.connect'})
+        try:
+            await self.worker.wsgi(self.scope, self.events.get, self.send)
+        except Exception:
+            self.worker.log.exception("Error handling WebSocket %s", self.scope['path'])
+        finally:
+            if self.reader_task is not None:
+                self.reader_task.cancel()
+            if not self.accepted:
+                await self.worker.reject(self.writer, HTTPStatus.FORBIDDEN)
+            elif not self.closed:
+                await self.write_close(1000)
+
+    async def send(self, event):
+        if self.closed:
+            return
+        if event['type'] == 'websocket.accept':
+            accept = base64.b64encode(hashlib.sha1(self.key + WEBSOCKET_GUID).digest())
+            lines = [b'HTTP/1.1 101 Switching Protocols', b'Upgrade: websocket', b'Connection: Upgrade',
+                     b'Sec-WebSocket-Accept: ' + accept]
+            if event.get('subprotocol'):
+                lines.append(b'Sec-WebSocket-Protocol: ' + event['subprotocol'].encode('latin-1'))
+            lines.extend(name + b': ' + value for name, value in event.get('headers', []))
+            self.writer.write(b'\r\n'.join(lines) + b'\r\n\r\n')
+            self.accepted = True
+            self.reader_task = asyncio.create_task(self.read_frames())
+        elif event['type'] == 'websocket.send':
+            if event.get('text') is not None:
+                self.write_frame(TEXT, event['text'].encode())
+            else:
+                self.write_frame(BINARY, event.get('bytes') or b'')
+        elif event['type'] == 'websocket.close':
+            if self.accepted:
+                await self.write_close(event.get('code', 1000))
+            else:
+                self.closed = True
+            return
+        await self.writer.drain()
+
+    def write_frame(self, opcode, payload):
+        length = len(payload)
+        if length < 126:
+            header = struct.pack('!BB', 0x80 | opcode, length)
+        elif length < 1 << 16:
+            header = struct.pack('!BBH', 0x80 | opcode, 126, length)
+        else:
+            header = struct.pack('!BBQ', 0x80 | opcode, 127, length)
+        self.writer.write(header + payload)
+
+    async def write_close(self, code):
+        self.closed = True
+        self.write_frame(CLOSE, struct.pack('!H', code))
+        await self.writer.drain()
+
+    async def read_frames(self):
+        message, message_opcode, code = [], None, 1005
+        try:
+            while True:
+                first, second = await self.reader.readexactly(2)
+                opcode, length = first & 0x0F, second & 0x7F
+                if length == 126:
+                    length, = struct.unpack('!H', await self.reader.readexactly(2))
+                elif length == 127:
+                    length, = struct.unpack('!Q', await self.reader.readexactly(8))
+                if length > WEBSOCKET_MAX_MESSAGE:
+                    code = 1009
+                    break
+                mask = await self.reader.readexactly(4) if second & 0x80 else None
+                payload = await self.reader.readexactly(length)
+                if mask:
+                    payload = unmask(payload, mask)
+
+                if opcode == CLOSE:
+                    code = struct.unpack('!H', payload[:2])[0] if len(payload) >= 2 else 1005
+                    break
+                if opcode == PING:
+                    self.write_frame(PONG, payload)
+                    await self.writer.drain()
+                    continue
+                if opcode == PONG:
+                    continue
+
+                if opcode != CONTINUATION:
+                    message, message_opcode = [], opcode
+                message.append(payload)
+                if sum(map(len, message)) > WEBSOCKET_MAX_MESSAGE:
+                    code = 1009
+                    break
+                if first & 0x80:
+                    data = b''.join(message)
+                    if message_opcode == TEXT:
+                        self.events.put_nowait({'type': 'websocket.receive', 'text': data.decode()})
+                    else:
+                        self.events.put_nowait({'type': 'websocket.receive', 'bytes': data})
+        except (asyncio.IncompleteReadError, ConnectionError):
+            code = 1006
+        except UnicodeDecodeError:
+            code = 1007
+        if not self.closed and code != 1006:
+            await self.write_close(1000 if code == 1005 else code)
+        self.events.put_nowait({'type': 'websocket.disconnect', 'code': code})
+
+
+def unmask(payload, mask):
+    length = len(payload)
+    key = int.from_bytes((mask * (length // 4 + 1))[:length], 'big')
+    return (int.from_bytes(payload, 'big') ^ key).to_bytes(length, 'big')
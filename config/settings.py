@@ -75,14 +75,80 @@ INSTALLED_APPS = [
 REST_FRAMEWORK = {
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "api.views.CookieAuthentication",
+        "api.authentication.CookieAuthentication",
     ],
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.IsAuthenticated",
     ],
+    "DEFAULT_RENDERER_CLASSES": [
+        "api.instrumentation.TimedJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
     "UNAUTHENTICATED_USER": None,
 }
 
+# Request counters and latency histograms per route (api/metrics.py): one
+# memory-mapped shard per worker process, summed by the /metrics endpoint.
+METRICS_DIR = os.environ.get("METRICS_DIR", str(BASE_DIR / "persistent" / "metrics"))
+
+# Per-request query counts and DB/serializer/render timings
+# (api/instrumentation.py): the fraction of requests measured, and whether
+# they get a Server-Timing header. Each measured request logs one
+# "api.timing" line at REQUEST_TIMING_LOG_LEVEL. Off the header by default:
+# it tells any client how long the database took, so only turn it on where
+# the clients are trusted (benchmarks, staging).
+REQUEST_TIMING_SAMPLE_RATE = float(os.environ.get("REQUEST_TIMING_SAMPLE_RATE", "0.01"))
+REQUEST_TIMING_HEADER = os.environ.get("REQUEST_TIMING_HEADER", "0") == "1"
+
+# Most GET paths one /api/batch/ request may carry (api/batch.py)
+BATCH_MAX_REQUESTS = int(os.environ.get("BATCH_MAX_REQUESTS", "10"))
+
+# Per-worker cache of authenticated members (api/authentication.py)
+AUTH_MEMBER_CACHE_SIZE = int(os.environ.get("AUTH_MEMBER_CACHE_SIZE", "10000"))
+AUTH_MEMBER_CACHE_TTL = float(os.environ.get("AUTH_MEMBER_CACHE_TTL", "60"))
+
+# Per-id change counters shared by all workers on the host (api/versions.py),
+# used for cache invalidation and ETags. Ids beyond VERSION_SLOTS share slots.
+VERSION_DIR = os.environ.get("VERSION_DIR", str(BASE_DIR / "persistent" / "versions"))
+VERSION_SLOTS = int(os.environ.get("VERSION_SLOTS", "65536"))
+
+# Response cache for per-member GET bodies (api/response_cache.py).
+# RESPONSE_CACHE picks the backend: "locmem" (per worker), "file" (shared
+# by all workers on the host) or "dummy" (off).
+RESPONSE_CACHE = os.environ.get("RESPONSE_CACHE", "locmem")
+RESPONSE_CACHE_ALIAS = "responses"
+RESPONSE_CACHE_TIMEOUT = int(os.environ.get("RESPONSE_CACHE_TIMEOUT", "300"))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.environ.get("RESPONSE_CACHE_MAX_ENTRIES", "10000"))
+RESPONSE_CACHE_STATS_FILE = os.environ.get(
+    "RESPONSE_CACHE_STATS_FILE", str(BASE_DIR / "persistent" / "response_cache.stats")
+)
+RESPONSE_CACHE_BACKENDS = {
+    "locmem": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "responses",
+        "OPTIONS": {"MAX_ENTRIES": RESPONSE_CACHE_MAX_ENTRIES},
+    },
+    "file": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": os.environ.get("RESPONSE_CACHE_DIR", str(BASE_DIR / "persistent" / "response_cache")),
+        "OPTIONS": {"MAX_ENTRIES": RESPONSE_CACHE_MAX_ENTRIES},
+    },
+    "dummy": {
+        "BACKEND": "django.core.cache.backends.dummy.DummyCache",
+    },
+}
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    RESPONSE_CACHE_ALIAS: RESPONSE_CACHE_BACKENDS[RESPONSE_CACHE],
+}
+
+# Per-worker friend-graph cache (api/friend_graph.py), bounded by entries
+# and by the total number of friend ids held
+FRIEND_GRAPH_CACHE_SIZE = int(os.environ.get("FRIEND_GRAPH_CACHE_SIZE", "50000"))
+FRIEND_GRAPH_CACHE_MAX_IDS = int(os.environ.get("FRIEND_GRAPH_CACHE_MAX_IDS", "2000000"))
+
 # drf-spectacular configuration
 SPECTACULAR_SETTINGS = {
     "TITLE": "Easyapp API",
@@ -92,6 +158,8 @@ SPECTACULAR_SETTINGS = {
 }
 
 MIDDLEWARE = [
+    "api.metrics.MetricsMiddleware",
+    "api.instrumentation.RequestTimingMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -119,6 +187,15 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = "config.wsgi.application"
+ASGI_APPLICATION = "config.asgi.application"
+
+# Pub/sub used to push events to WebSocket clients (see api/realtime.py).
+# InProcessBroker reaches only sockets held by the publishing process;
+# UnixDatagramBroker relays between processes on the same host.
+REALTIME_BROKER = os.environ.get("REALTIME_BROKER", "api.realtime.InProcessBroker")
+REALTIME_SOCKET_DIR = os.environ.get(
+    "REALTIME_SOCKET_DIR", str(BASE_DIR / "persistent" / "realtime")
+)
 
 
 # Database
@@ -128,9 +205,35 @@ DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": BASE_DIR / "persistent" / "db" / "db.sqlite3",
+        # Keep one connection per worker across requests
+        "CONN_MAX_AGE": int(os.environ.get("DB_CONN_MAX_AGE", "600")),
+        "CONN_HEALTH_CHECKS": True,
+        "OPTIONS": {
+            # Writers take the lock at BEGIN and queue on the busy timeout;
+            # upgrading a deferred read to a write fails at once when busy
+            "transaction_mode": os.environ.get("SQLITE_TRANSACTION_MODE", "IMMEDIATE"),
+            "timeout": int(os.environ.get("SQLITE_BUSY_TIMEOUT_MS", "5000")) / 1000,
+        },
     }
 }
 
+# Pragmas applied to every new SQLite connection (api/sqlite.py)
+SQLITE_PRAGMAS = {
+    "journal_mode": os.environ.get("SQLITE_JOURNAL_MODE", "WAL"),
+    "synchronous": os.environ.get("SQLITE_SYNCHRONOUS", "NORMAL"),
+    "busy_timeout": int(os.environ.get("SQLITE_BUSY_TIMEOUT_MS", "5000")),
+    "mmap_size": int(os.environ.get("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024))),
+    # Negative values are KiB
+    "cache_size": int(os.environ.get("SQLITE_CACHE_SIZE", "-65536")),
+    "temp_store": os.environ.get("SQLITE_TEMP_STORE", "MEMORY"),
+}
+
+
+# News feed strategy: "read" assembles the feed from friendships at request
+# time, "write" materializes per-member timelines when posts are created.
+# Run `manage.py rebuild_timelines` after switching to "write".
+FEED_FANOUT = os.environ.get("FEED_FANOUT", "read")
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -172,3 +275,25 @@ STATIC_URL = "django_static/"
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
+
+
+# Logging
+# https://docs.djangoproject.com/en/5.2/topics/logging/
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "formatters": {
+        "plain": {"format": "%(asctime)s %(name)s %(message)s"},
+    },
+    "handlers": {
+        "console": {"class": "logging.StreamHandler", "formatter": "plain"},
+    },
+    "loggers": {
+        "api.timing": {
+            "handlers": ["console"],
+            "level": os.environ.get("REQUEST_TIMING_LOG_LEVEL", "INFO"),
+            "propagate": False,
+        },
+    },
+}
@@ -0,0 +1,57 @@
+"""
+Gunicorn configuration for serving the ASGI application:
+
+    gunicorn --config gunicorn.asgi.conf.py config.asgi:application
+
+Same socket, worker count and limits as gunicorn.conf.py, but each worker
+is an event loop (config.asgi_worker) that also serves /api/ws/.
+"""
+
+# Server socket - bind to different port for nginx upstream
+bind = "127.0.0.1:8001"
+
+# Worker processes
+workers = 2
+worker_class = "config.asgi_worker.ASGIWorker"
+max_requests = 10000
+max_requests_jitter = 1000
+
+# Timeouts - the worker heartbeats from its event loop, so a slow request
+# no longer needs a long worker timeout
+timeout = 30
+keepalive = 5
+graceful_timeout = 30
+
+# Django runs each ASGI request's sync code in a fresh thread, and a
+# persistent connection would be stranded with it. With more than one
+# worker a message may be posted in one process and awaited by a socket in
+# another, so publishes go through the cross-process broker.
+raw_env = ["DB_CONN_MAX_AGE=0", "REALTIME_BROKER=api.realtime.UnixDatagramBroker"]
+
+# Logging to stdout/stderr
+accesslog = "-"
+errorlog = "-"
+loglevel = "info"
+access_log_format = '%(h)s %(l)s %(u)s %(t)s "%(r)s" %(s)s %(b)s "%(f)s" "%(a)s" %(D)s'
+
+# Process naming
+proc_name = "django_api_asgi"
+
+# Server mechanics
+daemon = False
+umask = 0o007
+tmp_upload_dir = None
+
+# Security
+limit_request_line = 8190
+limit_request_fields = 100
+limit_request_field_size = 8190
+
+# Preload app for better performance
+preload_app = True
+
+
+def post_fork(server, worker):
+    # Never share a connection opened while preloading with the forked workers
+    from django.db import connections
+    connections.close_all()
@@ -36,3 +36,10 @@ limit_request_field_size = 8190
 
 # Preload app for better performance
 preload_app = True
+
+
+def post_fork(server, worker):
+    # Connections are persistent (CONN_MAX_AGE); never share one opened
+    # while preloading with the forked workers
+    from django.db import connections
+    connections.close_all()
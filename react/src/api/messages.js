@@ -1,17 +1,23 @@
 import instance from './axios';
 
-export const getConversations = async () => {
-  const response = await instance.get('/api/messages/conversations/');
+export const getConversations = async (cursor = null, limit = 20) => {
+  const params = { limit };
+  if (cursor) params.cursor = cursor;
+  const response = await instance.get('/api/conversations/', { params });
   return response.data;
 };
 
-export const getMessages = async (userId) => {
-  const response = await instance.get(`/api/messages/conversation/${userId}/`);
+export const getMessages = async (userId, { beforeId, afterId, limit } = {}) => {
+  const params = {};
+  if (beforeId) params.before_id = beforeId;
+  if (afterId) params.after_id = afterId;
+  if (limit) params.limit = limit;
+  const response = await instance.get(`/api/conversations/${userId}/`, { params });
   return response.data;
 };
 
 export const sendMessage = async (recipientId, content) => {
-  const response = await instance.post('/api/messages/send/', {
+  const response = await instance.post('/api/messages/', {
     recipient_id: recipientId,
     content: content
   });
@@ -1,7 +1,9 @@
 import axios from './axios';
 
-export const getFeed = async () => {
-  const response = await axios.get('/api/posts/');
+export const getFeed = async (cursor = null, limit = 20) => {
+  const params = { limit };
+  if (cursor) params.cursor = cursor;
+  const response = await axios.get('/api/posts/', { params });
   return response.data;
 };
 
@@ -15,7 +17,9 @@ export const deletePost = async (postId) => {
   return response.data;
 };
 
-export const getUserPosts = async (userId) => {
-  const response = await axios.get(`/api/posts/user/${userId}/`);
+export const getUserPosts = async (userId, cursor = null, limit = 20) => {
+  const params = { limit };
+  if (cursor) params.cursor = cursor;
+  const response = await axios.get(`/api/users/${userId}/posts/`, { params });
   return response.data;
 };
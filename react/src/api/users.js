@@ -10,9 +10,9 @@ export const updateUser = async (userId, userData) => {
   return response.data;
 };
 
-export const searchUsers = async (searchQuery) => {
-  const response = await axios.get('/api/users/', {
-    params: { search: searchQuery }
-  });
+export const searchUsers = async (searchQuery, cursor = null, limit = 20) => {
+  const params = { search: searchQuery, limit };
+  if (cursor) params.cursor = cursor;
+  const response = await axios.get('/api/users/', { params });
   return response.data;
 };
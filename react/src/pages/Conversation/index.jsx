@@ -5,26 +5,71 @@ import { getUserById } from '../../api/users';
 import { useAuth } from '../../context/AuthContext';
 import './styles.css';
 
+const POLL_INTERVAL_MS = 5000;
+// While the socket is open polling only catches what it may have dropped
+const SOCKET_POLL_INTERVAL_MS = 30000;
+
+const appendNew = (prev, incoming) => {
+  const known = new Set(prev.map((m) => m.id));
+  const fresh = incoming.filter((m) => !known.has(m.id));
+  return fresh.length > 0 ? [...prev, ...fresh] : prev;
+};
+
 const Conversation = () => {
   const { userId } = useParams();
   const navigate = useNavigate();
   const { user: currentUser } = useAuth();
   const [messages, setMessages] = useState([]);
+  const [hasOlder, setHasOlder] = useState(false);
   const [recipient, setRecipient] = useState(null);
   const [newMessage, setNewMessage] = useState('');
   const [loading, setLoading] = useState(true);
   const [sending, setSending] = useState(false);
   const [error, setError] = useState(null);
   const messagesEndRef = useRef(null);
+  const socketOpenRef = useRef(false);
+  const messagesRef = useRef([]);
+  const lastPollRef = useRef(0);
 
   useEffect(() => {
     loadConversation();
   }, [userId]);
 
   useEffect(() => {
+    messagesRef.current = messages;
     scrollToBottom();
   }, [messages]);
 
+  useEffect(() => {
+    const protocol = window.location.protocol === 'https:' ? 'wss' : 'ws';
+    const socket = new WebSocket(`${protocol}://${window.location.host}/api/ws/`);
+    socket.onopen = () => {
+      socketOpenRef.current = true;
+      // Catch up on anything sent while the socket was down
+      pollNewMessages();
+    };
+    socket.onclose = () => {
+      socketOpenRef.current = false;
+    };
+    socket.onmessage = (event) => {
+      const payload = JSON.parse(event.data);
+      if (payload.type === 'message' && payload.data.sender.id === parseInt(userId)) {
+        setMessages((prev) => appendNew(prev, [payload.data]));
+      }
+    };
+    return () => socket.close();
+  }, [userId]);
+
+  // Fallback for when the WebSocket is unavailable, and a slower safety net
+  // for messages the socket missed while it is open
+  useEffect(() => {
+    const interval = setInterval(() => {
+      if (socketOpenRef.current && Date.now() - lastPollRef.current < SOCKET_POLL_INTERVAL_MS) return;
+      pollNewMessages();
+    }, POLL_INTERVAL_MS);
+    return () => clearInterval(interval);
+  }, [userId]);
+
   const scrollToBottom = () => {
     messagesEndRef.current?.scrollIntoView({ behavior: 'smooth' });
   };
@@ -37,7 +82,8 @@ const Conversation = () => {
         getMessages(userId),
         getUserById(userId)
       ]);
-      setMessages(messagesData);
+      setMessages(messagesData.results);
+      setHasOlder(messagesData.has_more);
       setRecipient(userData);
     } catch (err) {
       setError('Не удалось загрузить диалог');
@@ -47,6 +93,34 @@ const Conversation = () => {
     }
   };
 
+  const pollNewMessages = async () => {
+    const current = messagesRef.current;
+    const lastMessage = current[current.length - 1];
+    if (!lastMessage) return;
+    lastPollRef.current = Date.now();
+
+    try {
+      const data = await getMessages(userId, { afterId: lastMessage.id });
+      if (data.results.length > 0) {
+        setMessages((prev) => appendNew(prev, data.results));
+      }
+    } catch (err) {
+      console.error('Error polling messages:', err);
+    }
+  };
+
+  const loadOlderMessages = async () => {
+    if (messages.length === 0) return;
+
+    try {
+      const data = await getMessages(userId, { beforeId: messages[0].id });
+      setMessages((prev) => [...data.results, ...prev]);
+      setHasOlder(data.has_more);
+    } catch (err) {
+      console.error('Error loading older messages:', err);
+    }
+  };
+
   const handleSendMessage = async (e) => {
     e.preventDefault();
     if (!newMessage.trim() || sending) return;
@@ -54,7 +128,7 @@ const Conversation = () => {
     try {
       setSending(true);
       const sentMessage = await sendMessage(parseInt(userId), newMessage.trim());
-      setMessages([...messages, sentMessage]);
+      setMessages((prev) => appendNew(prev, [sentMessage]));
       setNewMessage('');
     } catch (err) {
       setError('Не удалось отправить сообщение');
@@ -120,6 +194,11 @@ const Conversation = () => {
             </div>
           ) : (
             <div className="messages-list">
+              {hasOlder && (
+                <button className="btn-load-older" onClick={loadOlderMessages}>
+                  Показать предыдущие сообщения
+                </button>
+              )}
               {messages.map((message) => {
                 const isOwn = message.sender.id === currentUser?.id;
                 return (
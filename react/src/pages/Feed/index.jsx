@@ -6,6 +6,8 @@ import './styles.css';
 
 const Feed = () => {
   const [posts, setPosts] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
   const [postText, setPostText] = useState('');
@@ -16,7 +18,8 @@ const Feed = () => {
       setLoading(true);
       setError(null);
       const data = await getFeed();
-      setPosts(data);
+      setPosts(data.results);
+      setNextCursor(data.next_cursor);
     } catch (err) {
       console.error('Error loading feed:', err);
       setError('Не удалось загрузить ленту новостей');
@@ -25,6 +28,21 @@ const Feed = () => {
     }
   };
 
+  const loadMorePosts = async () => {
+    if (!nextCursor) return;
+
+    try {
+      setLoadingMore(true);
+      const data = await getFeed(nextCursor);
+      setPosts((prev) => [...prev, ...data.results]);
+      setNextCursor(data.next_cursor);
+    } catch (err) {
+      console.error('Error loading more posts:', err);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   useEffect(() => {
     loadPosts();
   }, []);
@@ -108,6 +126,15 @@ const Feed = () => {
                   onPostDeleted={handlePostDeleted}
                 />
               ))}
+              {nextCursor && (
+                <button
+                  onClick={loadMorePosts}
+                  disabled={loadingMore}
+                  className="retry-btn"
+                >
+                  {loadingMore ? 'Загрузка...' : 'Показать ещё'}
+                </button>
+              )}
             </div>
           )}
         </div>
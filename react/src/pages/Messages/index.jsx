@@ -18,7 +18,7 @@ const Messages = () => {
       setLoading(true);
       setError(null);
       const data = await getConversations();
-      setConversations(data);
+      setConversations(data.results);
     } catch (err) {
       setError('Не удалось загрузить диалоги');
       console.error('Error loading conversations:', err);
@@ -33,7 +33,7 @@ const Profile = () => {
       setUser(userData);
       
       const userPosts = await getUserPosts(id);
-      setPosts(userPosts);
+      setPosts(userPosts.results);
       
       setFriendsCount(0);
     } catch (err) {
@@ -20,8 +20,8 @@ const Search = () => {
     try {
       setLoading(true);
       setSearched(true);
-      const results = await searchUsers(searchQuery.trim());
-      setUsers(results);
+      const data = await searchUsers(searchQuery.trim());
+      setUsers(data.results);
     } catch (err) {
       console.error('Error searching users:', err);
       setUsers([]);